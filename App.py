@@ -1,216 +1,137 @@
 
 
 import streamlit as st
-import base64
-from agno.agent import Agent, RunResponse
-from agno.models.openai import OpenAIChat
+from agno.agent import RunResponse
 import os
+import re
+import time
+import uuid
 from agno.tools.arxiv import ArxivTools
-from agno.utils.pprint import pprint_run_response
-from agno.tools.serpapi import SerpApiTools
+from static_assets import asset_src, build_variant, prewarm_assets
+from theming import stylesheet_html
+from panels import is_open, panel, set_panel_hook, stateful_tabs
+from agent_registry import build_summarizer_agent, get_team
+from fake_backend import fake_backend_config
+from chat_memory import ConversationMemory, count_tokens, make_agent_summarizer
+from streaming import ThrottledRenderer, stream_to_placeholder
+from agent_orchestrator import DEFAULT_MAX_CONCURRENCY, DEFAULT_AGENT_TIMEOUT
+from pipeline import topic_prompt
+from team_view import AGENT_LABELS, show_catalog_suggestions, show_job_progress, show_run_stats
+from job_queue import get_job_queue
+from topic_catalog import get_topic_catalog
+from instrumentation import metrics_registry
+from model_router import route_stats
+from document_ingestion import start_extraction
+from assignment_feedback import SINGLE_PASS_TOKENS, chunk_document, review_document
+from learner_store import ARTIFACT_KEYS, get_learner_store, persist_profile, restore_profile
+from chat_view import CHAT_PAGE_SIZE, append_message, render_transcript, visible_start
+from semantic_cache import get_semantic_cache
+from report_view import echo_to_terminal, show_report
 
 # --- Glassmorphism & Neon Dark Theme CSS ---
-st.markdown('''
-<style>
-body, .stApp {
-    background: linear-gradient(135deg, #181c2b 0%, #23243a 100%) !important;
-    color: #f3f3f3 !important;
-}
-.stApp {
-    font-family: 'Poppins', 'Segoe UI', 'Roboto', 'Arial', sans-serif;
-}
-.main, .block-container {
-    background: transparent !important;
-}
-.glass-card {
-    background: rgba(30, 34, 54, 0.65);
-    border-radius: 18px;
-    box-shadow: 0 8px 32px 0 #1f26875e;
-    backdrop-filter: blur(8px);
-    border: 1.5px solid rgba(106,130,251,0.25);
-    padding: 1.5em 1.2em 1.2em 1.2em;
-    margin-bottom: 1.2em;
-    transition: box-shadow 0.2s, border 0.2s;
-}
-.glass-card:hover {
-    box-shadow: 0 12px 40px 0 #6a82fb55;
-    border: 1.5px solid #6a82fb;
-}
-.stTextInput>div>div>input, .stTextArea textarea, .stSelectbox>div>div>div>div {
-    background: rgba(36, 40, 60, 0.85) !important;
-    color: #f3f3f3 !important;
-    border: 1.5px solid #00ffe7 !important;
-    border-radius: 10px !important;
-    font-size: 1.08em;
-}
-.stButton>button {
-    background: linear-gradient(90deg, #00ffe7 0%, #6a82fb 100%) !important;
-    color: #181c2b !important;
-    border: none !important;
-    border-radius: 10px !important;
-    font-weight: bold;
-    font-size: 1.08em;
-    box-shadow: 0 2px 16px 0 #00ffe755;
-    transition: 0.2s;
-}
-.stButton>button:hover {
-    background: linear-gradient(90deg, #6a82fb 0%, #00ffe7 100%) !important;
-    color: #fff !important;
-    transform: scale(1.05);
-}
-.stProgress>div>div>div>div {
-    background: linear-gradient(90deg, #00ffe7 0%, #6a82fb 100%) !important;
-}
-.stSlider>div>div>div>div {
-    background: #00ffe7 !important;
-}
-.stSelectbox>div>div>div>div {
-    background: rgba(36, 40, 60, 0.85) !important;
-    color: #f3f3f3 !important;
-}
-.stInfo, .stSuccess, .stWarning, .stError {
-    border-radius: 12px !important;
-    font-weight: 500;
-    font-size: 1.08em;
-    background: rgba(0,255,231,0.08) !important;
-    color: #00ffe7 !important;
-    border: 1.5px solid #00ffe7 !important;
-}
-.stSuccess { color: #00ffb0 !important; border-color: #00ffb0 !important; }
-.stWarning { color: #ffe700 !important; border-color: #ffe700 !important; }
-.stError { color: #ff007a !important; border-color: #ff007a !important; }
-.stTabs [data-baseweb="tab"] {
-    background: rgba(36, 40, 60, 0.85) !important;
-    color: #fff !important;
-    border-radius: 10px 10px 0 0 !important;
-    font-weight: bold;
-    margin-right: 2px;
-    font-size: 1.08em;
-}
-.stTabs [aria-selected="true"] {
-    background: linear-gradient(90deg, #00ffe7 0%, #6a82fb 100%) !important;
-    color: #181c2b !important;
-}
-.stMarkdown h1, .stMarkdown h2, .stMarkdown h3, .stMarkdown h4 {
-    color: #00ffe7 !important;
-    text-shadow: 0 2px 8px #6a82fb44;
-}
-.stMarkdown ul, .stMarkdown ol {
-    color: #f3f3f3 !important;
-}
-.stSidebar {
-    background: linear-gradient(135deg, #181c2b 0%, #6a82fb 100%) !important;
-    color: #fff !important;
-}
-.stSidebar .stTextInput>div>div>input, .stSidebar .stTextArea textarea, .stSidebar .stSelectbox>div>div>div>div {
-    background: rgba(36, 40, 60, 0.85) !important;
-    color: #f3f3f3 !important;
-    border: 1.5px solid #00ffe7 !important;
-    border-radius: 10px !important;
-}
-.stSidebar .stButton>button {
-    background: linear-gradient(90deg, #00ffe7 0%, #6a82fb 100%) !important;
-    color: #181c2b !important;
-    border: none !important;
-    border-radius: 10px !important;
-    font-weight: bold;
-    font-size: 1.08em;
-    box-shadow: 0 2px 16px 0 #00ffe755;
-    transition: 0.2s;
-}
-.stSidebar .stButton>button:hover {
-    background: linear-gradient(90deg, #6a82fb 0%, #00ffe7 100%) !important;
-    color: #fff !important;
-    transform: scale(1.05);
-}
-.stDivider {
-    border-top: 2px solid #00ffe7 !important;
-    margin: 1.5em 0;
-}
-.stFileUploader>div>div {
-    background: rgba(36, 40, 60, 0.85) !important;
-    color: #f3f3f3 !important;
-    border: 1.5px solid #00ffe7 !important;
-    border-radius: 10px !important;
-}
-.stColumns>div {
-    background: rgba(36, 40, 60, 0.35) !important;
-    border-radius: 12px;
-    margin-bottom: 0.5em;
-}
-.stMarkdown code {
-    background: #181c2b !important;
-    color: #00ffe7 !important;
-    border-radius: 8px;
-    padding: 2px 8px;
-    font-size: 1.08em;
-}
-</style>
-''', unsafe_allow_html=True)
+# All page styles live in styles/*.css; they are minified and fingerprinted once per process and
+# each rerun only sends a small link tag (or one minified style block without static serving)
+st.markdown(stylesheet_html('app', st.get_option("server.enableStaticServing")), unsafe_allow_html=True)
 
 # Set page configuration
 st.set_page_config(page_title="👨‍🏫 AI Teaching Agent Team", layout="centered")
 
 
 
+def secret(name: str, default=''):
+    """`st.secrets[name]`, or `default` when the app has no secrets file (local .env setups)."""
+    try:
+        return st.secrets.get(name, default)
+    except FileNotFoundError:
+        return default
+
+
 # --- Fetch API keys from Streamlit secrets (for Streamlit Cloud) or environment as fallback ---
 if 'openai_api_key' not in st.session_state or not st.session_state['openai_api_key']:
-    st.session_state['openai_api_key'] = st.secrets.get('OPENAI_API_KEY', os.getenv('OPENAI_API_KEY', ''))
+    st.session_state['openai_api_key'] = secret('OPENAI_API_KEY', os.getenv('OPENAI_API_KEY', ''))
 if 'composio_api_key' not in st.session_state or not st.session_state['composio_api_key']:
-    st.session_state['composio_api_key'] = st.secrets.get('COMPOSIO_API_KEY', os.getenv('COMPOSIO_API_KEY', ''))
+    st.session_state['composio_api_key'] = secret('COMPOSIO_API_KEY', os.getenv('COMPOSIO_API_KEY', ''))
 if 'serpapi_api_key' not in st.session_state or not st.session_state['serpapi_api_key']:
-    st.session_state['serpapi_api_key'] = st.secrets.get('SERP_API_KEY', os.getenv('SERP_API_KEY', ''))
+    st.session_state['serpapi_api_key'] = secret('SERP_API_KEY', os.getenv('SERP_API_KEY', ''))
 if 'topic' not in st.session_state:
     st.session_state['topic'] = ''
 
+# --- Concurrency settings for the Start flow (Streamlit secrets or environment) ---
+AGENT_MAX_CONCURRENCY = int(secret('AGENT_MAX_CONCURRENCY', os.getenv('AGENT_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)))
+AGENT_TIMEOUT_SECONDS = float(secret('AGENT_TIMEOUT_SECONDS', os.getenv('AGENT_TIMEOUT_SECONDS', DEFAULT_AGENT_TIMEOUT)))
+SHOW_AGENT_METRICS = str(secret('SHOW_AGENT_METRICS', os.getenv('SHOW_AGENT_METRICS', ''))).lower() in ('1', 'true', 'yes')
+
+# Answers to Live Q&A and chatbot questions, matched by meaning and shared by all sessions
+semantic_cache = get_semantic_cache()
+# Start-flow generation jobs, shared by all sessions (identical topics run once)
+job_queue = get_job_queue()
+# Popular topics with ready-made reports, for autocomplete and instant course packs
+topic_catalog = get_topic_catalog()
+# Stale catalog reports are regenerated in the background with the server's keys, never a visitor's
+topic_catalog.start_refresh(secret('OPENAI_API_KEY', ''), secret('SERP_API_KEY', ''))
+
+# --- Learner profile: points, badges, progress and reports persist per user id ---
+# The id is kept in the URL (?uid=...) so a refresh or bookmark finds the same profile
+learner_store = get_learner_store()
+if 'user_id' not in st.session_state:
+    uid = st.query_params.get('uid', '')
+    st.session_state['user_id'] = uid if re.fullmatch(r"[\w-]{8,64}", uid) else uuid.uuid4().hex
+    st.query_params['uid'] = st.session_state['user_id']
+    restore_profile(st.session_state, st.session_state['user_id'], learner_store)
+    saved_reports = learner_store.list_artifacts(st.session_state['user_id'])
+    if saved_reports:
+        st.session_state['started'] = True
+        st.session_state['saved_topic'] = next(iter(saved_reports.values()))['topic']
+# Changes from a run that ended in st.rerun() are flushed here; the rest at the end of the script
+persist_profile(st.session_state, st.session_state['user_id'], learner_store)
+# Panel-only reruns skip the end of the script, so they flush the profile themselves
+set_panel_hook(lambda: persist_profile(st.session_state, st.session_state['user_id'], learner_store))
+
+
+def take_reports(topic, results, from_catalog=False):
+    """Put a topic's reports into the session and the learner's saved reports."""
+    # Failed agents are stored as None
+    for key in AGENT_LABELS:
+        st.session_state[key] = RunResponse(content=results[key]) if key in results else None
+    if results:
+        learner_store.save_artifacts(st.session_state['user_id'], topic, results)
+    st.session_state['started'] = True
+    st.session_state['saved_topic'] = topic
+    st.session_state['catalog_pack'] = from_catalog
+
+
+def collect_reports(job):
+    """Take a finished job's reports into the session."""
+    take_reports(job.topic, job.results)
+
+
+def show_catalog_topic(entry):
+    """A catalog topic was picked: fill the topic box and show its ready-made reports right away."""
+    st.session_state['topic_input'] = entry.name
+    if entry.ready:
+        take_reports(entry.name, entry.outputs, from_catalog=True)
 
 
 # --- Sidebar Logo with Unique Style and Animation ---
-logo_path = os.path.join(os.path.dirname(__file__), "Logo.png")
-ai_logo_path = os.path.join(os.path.dirname(__file__), "AI.png")
-encoded_logo = None
-encoded_ai_logo = None
-if os.path.exists(logo_path):
-    with open(logo_path, "rb") as image_file:
-        encoded_logo = base64.b64encode(image_file.read()).decode()
-if os.path.exists(ai_logo_path):
-    with open(ai_logo_path, "rb") as image_file:
-        encoded_ai_logo = base64.b64encode(image_file.read()).decode()
+# Downscaled variants are built once per process (and at deploy time via `python static_assets.py`)
+# and served as static files instead of re-inlining megabytes of base64 on every rerun
+prewarm_assets()
+static_serving = st.get_option("server.enableStaticServing")
+logo_src = asset_src('logo', static_serving)
+ai_logo_src = asset_src('ai_logo', static_serving)
 
 with st.sidebar:
     # Logo and animated style
-    if encoded_logo:
+    if logo_src:
         st.markdown(
             f"""
-            <style>
-            @keyframes colorfulGlow {{
-                0% {{ box-shadow: 0 0 24px #ffd200, 0 0 0px #00c6ff; filter: hue-rotate(0deg); }}
-                25% {{ box-shadow: 0 0 32px #00c6ff, 0 0 12px #f7971e; filter: hue-rotate(90deg); }}
-                50% {{ box-shadow: 0 0 40px #f7971e, 0 0 24px #ffd200; filter: hue-rotate(180deg); }}
-                75% {{ box-shadow: 0 0 32px #00c6ff, 0 0 12px #ffd200; filter: hue-rotate(270deg); }}
-                100% {{ box-shadow: 0 0 24px #ffd200, 0 0 0px #00c6ff; filter: hue-rotate(360deg); }}
-            }}
-            .colorful-animated-logo {{
-                animation: colorfulGlow 2.5s linear infinite;
-                transition: box-shadow 0.3s, filter 0.3s;
-                border-radius: 30%;
-                box-shadow: 0 2px 12px #00c6ff;
-                border: 2px solid #ffd200;
-                background: #232526;
-                object-fit: cover;
-            }}
-            .sidebar-logo {{
-                text-align: center;
-                margin-bottom: 12px;
-            }}
-            </style>
             <div class='sidebar-logo'>
-                <img class='colorful-animated-logo' src='data:image/png;base64,{encoded_logo}' alt='Logo' style='width:150px;height:150px;'>
+                <img class='colorful-animated-logo' src='{logo_src}' alt='Logo' style='width:150px;height:150px;'>
                 <div style='color:#00c6ff;font-size:1.1em;font-family:sans-serif;font-weight:bold;text-shadow:0 1px 6px #ffd200;margin-top:8px;'>Professor.Team.Agent</div>
             </div>
             <!-- Second logo below the first -->
             <div class='sidebar-AI' style='margin-top:0;'>
-                {f"<img src='data:image/png;base64,{encoded_ai_logo}' alt='AI' style='width:210px;height:220px;border-radius:30%;box-shadow:0 2px 12px #00c6ff;border:2px solid #ffd200;margin-bottom:8px;background:#232526;object-fit:cover;'>" if encoded_ai_logo else "<div style='color:#ff4b4b;'>AI.png not found</div>"}
+                {f"<img src='{ai_logo_src}' alt='AI' style='width:210px;height:220px;border-radius:30%;box-shadow:0 2px 12px #00c6ff;border:2px solid #ffd200;margin-bottom:8px;background:#232526;object-fit:cover;'>" if ai_logo_src else "<div style='color:#ff4b4b;'>AI.png not found</div>"}
                 <div style='color:#00c6ff;font-size:1.1em;font-family:sans-serif;font-weight:bold;text-shadow:0 1px 6px #ffd200;margin-top:8px;'></div>
             </div>
             """,
@@ -218,9 +139,8 @@ with st.sidebar:
         )
         # Developer info and image below the logos
         st.markdown("<div style='text-align:center;font-size:1.1em;margin-top:10px;'>👨👨‍💻<b>Developer:</b> <br>Abhishek💖Yadav</br></div>", unsafe_allow_html=True)
-        developer_path = os.path.join(os.path.dirname(__file__), "pic.jpg")
-        developer_path = os.path.join(os.path.dirname(__file__), "pic.jpg")
-        if os.path.exists(developer_path):
+        developer_path = build_variant('developer')
+        if developer_path:
             st.image(developer_path, caption="Abhishek Yadav", use_container_width=True)
         else:
             st.warning("pic.jpg file not found. Please check the file path.")
@@ -236,8 +156,8 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
     st.selectbox("Preferred Learning Style", ["Visual", "Auditory", "Reading/Writing", "Kinesthetic"], key="learning_style")
-    st.slider("Your Progress (%)", 0, 100, st.session_state.get('progress', 0), key="progress_slider")
-    st.text_input("Current Section", st.session_state.get('current_section', ''), key="current_section")
+    st.slider("Your Progress (%)", 0, 100, key="progress_slider")
+    st.text_input("Current Section", key="current_section")
     # --- Gamification ---
     if 'points' not in st.session_state:
         st.session_state['points'] = 0
@@ -252,6 +172,11 @@ with st.sidebar:
     st.markdown("<div style='color:#fff; text-align:center;'>Your progress and preferences will be used to personalize your learning path.</div>", unsafe_allow_html=True)
 
 
+# The offline stand-in (FAKE_BACKEND) answers without real keys
+if fake_backend_config():
+    for key_name in ('openai_api_key', 'serpapi_api_key'):
+        st.session_state[key_name] = st.session_state[key_name] or 'offline'
+
 # Validate API keys (only OpenAI and SerpAPI needed now)
 if not st.session_state['openai_api_key'] or not st.session_state['serpapi_api_key']:
     st.error("Please enter OpenAI and SerpAPI keys in the sidebar.")
@@ -260,151 +185,83 @@ if not st.session_state['openai_api_key'] or not st.session_state['serpapi_api_k
 # Set the OpenAI API key from session state
 os.environ["OPENAI_API_KEY"] = st.session_state['openai_api_key']
 
-# Create the Professor agent (formerly KnowledgeBuilder)
-professor_agent = Agent(
-    name="Professor",
-    role="Research and Knowledge Specialist", 
-    model=OpenAIChat(id="gpt-3.5-turbo", api_key=st.session_state['openai_api_key'], temperature=0.1),
-    tools=[],
-    instructions=[
-        "Create a comprehensive knowledge base that covers fundamental concepts, advanced topics, and current developments of the given topic.",
-        "Explain the topic from first principles first. Include key terminology, core principles, and practical applications and make it as a detailed report that anyone who's starting out can read and get maximum value out of it.",
-        "Make sure it is formatted in a way that is easy to read and understand.",
-    ],
-    show_tool_calls=True,
-    markdown=True,
-)
-
-# Create the Academic Advisor agent (formerly RoadmapArchitect)
-academic_advisor_agent = Agent(
-    name="Academic Advisor",
-    role="Learning Path Designer",
-    model=OpenAIChat(id="gpt-3.5-turbo", api_key=st.session_state['openai_api_key'], temperature=0.1),
-    tools=[],
-    instructions=[
-        "Using the knowledge base for the given topic, create a detailed learning roadmap.",
-        "Break down the topic into logical subtopics and arrange them in order of progression, a detailed report of roadmap that includes all the subtopics in order to be an expert in this topic.",
-        "Include estimated time commitments for each section.",
-        "Present the roadmap in a clear, structured format.",
-    ],
-    show_tool_calls=True,
-    markdown=True
-)
-
-# Create the Research Librarian agent (formerly ResourceCurator)
-research_librarian_agent = Agent(
-    name="Research Librarian",
-    role="Learning Resource Specialist",
-    model=OpenAIChat(id="gpt-3.5-turbo", api_key=st.session_state['openai_api_key'], temperature=0.1),
-    tools=[SerpApiTools(api_key=st.session_state['serpapi_api_key'])],
-    instructions=[
-        "Make a list of high-quality learning resources for the given topic.",
-        "Use the SerpApi search tool to find current and relevant learning materials.",
-        "Include technical blogs, GitHub repositories, official documentation, video tutorials, and courses.",
-        "Present the resources in a curated list with descriptions and quality assessments.",
-    ],
-    show_tool_calls=True,
-    markdown=True,
-)
-
-# Create the Teaching Assistant agent (formerly PracticeDesigner)
-teaching_assistant_agent = Agent(
-    name="Teaching Assistant",
-    role="Exercise Creator",
-    model=OpenAIChat(id="gpt-3.5-turbo", api_key=st.session_state['openai_api_key'], temperature=0.1),
-    tools=[SerpApiTools(api_key=st.session_state['serpapi_api_key'])],
-    instructions=[
-        "Create comprehensive practice materials for the given topic.",
-        "Use the SerpApi search tool to find example problems and real-world applications.",
-        "Include progressive exercises, quizzes, hands-on projects, and real-world application scenarios.",
-        "Ensure the materials align with the roadmap progression.",
-        "Provide detailed solutions and explanations for all practice materials.",
-    ],
-    show_tool_calls=True,
-    markdown=True,
+# Build the agent team once per session and API-key fingerprint; the HTTP pool is shared process-wide.
+# Agents keep this model unless a MODEL_ROUTES override sets one; the default routes only add fallbacks and timeouts.
+agent_team = get_team(
+    st.session_state['openai_api_key'],
+    st.session_state['serpapi_api_key'],
+    model_id="gpt-3.5-turbo",
+    temperature=0.1,
+    store=st.session_state,
 )
+professor_agent = agent_team['professor']
+academic_advisor_agent = agent_team['academic_advisor']
+research_librarian_agent = agent_team['research_librarian']
+teaching_assistant_agent = agent_team['teaching_assistant']
 
 st.title("👨‍🏫 AI Teaching Agent Team")
 
 # --- Tabs for main app and AI Support Assistant Chatbot ---
-tab1, tab2 = st.tabs(["Learning Team", "AI Support Assistant Chatbot"])
+tab1, tab2 = stateful_tabs(["Learning Team", "AI Support Assistant Chatbot"], key="main_tab")
 
-with tab1:
-    st.markdown("""
-    <div class='glass-card' style='border-left: 5px solid #00ffe7;'>
-        <h2 style='color:#00ffe7; text-align:center; margin-bottom:0.7em; letter-spacing:1px;'>✨ Enter a topic to generate a detailed learning path and resources</h2>
-    </div>
-    """, unsafe_allow_html=True)
-    st.info("The agents will generate detailed learning content, roadmaps, resources, and exercises for your topic.")
-    # Query bar for topic input
-    st.session_state['topic'] = st.text_input("Enter the topic you want to learn about:", placeholder="e.g., Machine Learning, LoRA, etc.")
-
-    # --- Ensure 'started' is initialized in session state ---
-    if 'started' not in st.session_state:
-        st.session_state['started'] = False
-
-    # --- Start Button for Answer Response ---
-    if st.button("Start / Get Answer Response", key="start_topic"):
-        if not st.session_state['topic']:
-            st.error("Please enter a topic.")
-        else:
-            st.session_state['started'] = True
-            # Display loading animations while generating responses
-            with st.spinner("Generating Knowledge Base..."):
-                professor_response: RunResponse = professor_agent.run(
-                    f"the topic is: {st.session_state['topic']}, user learning style: {st.session_state['learning_style']}, user progress: {st.session_state['progress_slider']}%.",
-                    stream=False
-                )
-            with st.spinner("Generating Learning Roadmap..."):
-                academic_advisor_response: RunResponse = academic_advisor_agent.run(
-                    f"the topic is: {st.session_state['topic']}, user learning style: {st.session_state['learning_style']}, user progress: {st.session_state['progress_slider']}%.",
-                    stream=False
-                )
-            with st.spinner("Curating Learning Resources..."):
-                research_librarian_response: RunResponse = research_librarian_agent.run(
-                    f"the topic is: {st.session_state['topic']}, user learning style: {st.session_state['learning_style']}, user progress: {st.session_state['progress_slider']}%.",
-                    stream=False
-                )
-            with st.spinner("Creating Practice Materials..."):
-                teaching_assistant_response: RunResponse = teaching_assistant_agent.run(
-                    f"the topic is: {st.session_state['topic']}, user learning style: {st.session_state['learning_style']}, user progress: {st.session_state['progress_slider']}%.",
-                    stream=False
-                )
-            # Debug output: print the actual responses to the UI
-            st.info(f"Professor response: {getattr(professor_response, 'content', professor_response)}")
-            st.info(f"Academic Advisor response: {getattr(academic_advisor_response, 'content', academic_advisor_response)}")
-            st.info(f"Research Librarian response: {getattr(research_librarian_response, 'content', research_librarian_response)}")
-            st.info(f"Teaching Assistant response: {getattr(teaching_assistant_response, 'content', teaching_assistant_response)}")
-            # Store responses in session state for later use
-            st.session_state['professor_response'] = professor_response
-            st.session_state['academic_advisor_response'] = academic_advisor_response
-            st.session_state['research_librarian_response'] = research_librarian_response
-            st.session_state['teaching_assistant_response'] = teaching_assistant_response
-            # Use st.rerun() for newer Streamlit versions; fallback to experimental_rerun for older
-            try:
-                st.rerun()
-            except AttributeError:
-                # For older Streamlit versions
-                st.experimental_rerun()
-
-    # --- Progress Tracker & Smart Reminders ---
-    def show_progress_tracker():
-        st.markdown("---")
+if is_open(tab1):
+    with tab1:
         st.markdown("""
-        <div class='glass-card' style='border-left: 5px solid #6a82fb;'>
-            <h3 style='color:#6a82fb; text-align:center; margin-bottom:0.7em; letter-spacing:1px;'>📈 Progress Tracker</h3>
+        <div class='glass-card' style='border-left: 5px solid #00ffe7;'>
+            <h2 style='color:#00ffe7; text-align:center; margin-bottom:0.7em; letter-spacing:1px;'>✨ Enter a topic to generate a detailed learning path and resources</h2>
         </div>
         """, unsafe_allow_html=True)
-        progress = st.session_state.get('progress_slider', 0)
-        st.progress(progress)
-        completed_sections = st.session_state.get('completed_sections', [])
-        st.markdown(f"<div style='color:#fff; font-size:1.08em;'><b>Completed Sections:</b> {', '.join(completed_sections) if completed_sections else 'None yet.'}</div>", unsafe_allow_html=True)
-        if progress < 30:
-            st.warning("Keep going! Every step counts. 💪")
-        elif progress < 70:
-            st.info("Great progress! Stay consistent for best results.")
-        else:
-            st.success("Amazing! You're close to mastering this topic.")
+        st.info("The agents will generate detailed learning content, roadmaps, resources, and exercises for your topic.")
+        # Query bar for topic input
+        st.session_state['topic'] = st.text_input("Enter the topic you want to learn about:", placeholder="e.g., Machine Learning, LoRA, etc.", key="topic_input")
+        # Catalog topics matching what was typed; picking one with ready-made reports shows them without running the agents
+        show_catalog_suggestions(topic_catalog, st.session_state['topic'], show_catalog_topic)
+        if st.session_state.get('catalog_pack'):
+            st.caption("⚡ Ready-made course pack. Press Start for reports tailored to your learning style and progress.")
+
+        # --- Ensure 'started' is initialized in session state ---
+        if 'started' not in st.session_state:
+            st.session_state['started'] = False
+
+        # --- Start Button for Answer Response ---
+        force_refresh = st.checkbox("Force refresh (ignore cached answers)", key="force_refresh")
+        show_run_stats()
+        if st.button("Start / Get Answer Response", key="start_topic"):
+            if not st.session_state['topic']:
+                st.error("Please enter a topic.")
+            else:
+                topic = st.session_state['topic']
+                base_prompt = topic_prompt(topic, st.session_state['learning_style'], st.session_state['progress_slider'])
+                # Generation runs as a background job; reruns, tab switches and reloads do not interrupt it
+                job_queue.submit(
+                    st.session_state['user_id'],
+                    topic,
+                    base_prompt,
+                    agent_team,
+                    force_refresh,
+                    max_concurrency=AGENT_MAX_CONCURRENCY,
+                    timeout=AGENT_TIMEOUT_SECONDS,
+                )
+        show_job_progress(job_queue, st.session_state['user_id'], agent_team, collect_reports)
+
+        # --- Progress Tracker & Smart Reminders ---
+        def show_progress_tracker():
+            st.markdown("---")
+            st.markdown("""
+            <div class='glass-card' style='border-left: 5px solid #6a82fb;'>
+                <h3 style='color:#6a82fb; text-align:center; margin-bottom:0.7em; letter-spacing:1px;'>📈 Progress Tracker</h3>
+            </div>
+            """, unsafe_allow_html=True)
+            progress = st.session_state.get('progress_slider', 0)
+            st.progress(progress)
+            completed_sections = st.session_state.get('completed_sections', [])
+            st.markdown(f"<div style='color:#fff; font-size:1.08em;'><b>Completed Sections:</b> {', '.join(completed_sections) if completed_sections else 'None yet.'}</div>", unsafe_allow_html=True)
+            if progress < 30:
+                st.warning("Keep going! Every step counts. 💪")
+            elif progress < 70:
+                st.info("Great progress! Stay consistent for best results.")
+            else:
+                st.success("Amazing! You're close to mastering this topic.")
 
 # --- Adaptive Learning Path and Quiz Section ---
 def show_quiz_and_update_progress():
@@ -414,25 +271,34 @@ def show_quiz_and_update_progress():
     </div>
     """, unsafe_allow_html=True)
     quiz_question = st.session_state.get('quiz_question', 'What is the most important concept you learned so far?')
-    user_answer = st.text_input("Your Answer", key="quiz_answer")
-    if st.button("Submit Quiz Answer"):
-        # For demo, just increment progress and add a completed section
-        st.session_state['progress_slider'] = min(100, st.session_state.get('progress_slider', 0) + 10)
-        completed_sections = st.session_state.get('completed_sections', [])
-        current_section = st.session_state.get('current_section', 'Section ' + str(len(completed_sections) + 1))
-        if current_section not in completed_sections:
-            completed_sections.append(current_section)
-        st.session_state['completed_sections'] = completed_sections
+    st.text_input("Your Answer", key="quiz_answer")
+    # Progress is a widget value, so it is updated from the click callback (before widgets are drawn)
+    if st.button("Submit Quiz Answer", on_click=submit_quiz_answer):
         st.success("Progress updated! Your learning path will adapt accordingly.")
-        st.session_state['quiz_answer'] = user_answer
-        # --- Gamification: Add points and badges ---
-        st.session_state['points'] += 10
-        if st.session_state['points'] >= 100 and 'Quiz Master' not in st.session_state['badges']:
-            st.session_state['badges'].append('🏆 Quiz Master')
-        # Level up for every 50 points
-        st.session_state['level'] = 1 + st.session_state['points'] // 50
+
+def submit_quiz_answer():
+    # For demo, just increment progress and add a completed section
+    st.session_state['progress_slider'] = min(100, st.session_state.get('progress_slider', 0) + 10)
+    completed_sections = st.session_state.get('completed_sections', [])
+    current_section = st.session_state.get('current_section', 'Section ' + str(len(completed_sections) + 1))
+    if current_section not in completed_sections:
+        completed_sections.append(current_section)
+    st.session_state['completed_sections'] = completed_sections
+    # --- Gamification: Add points and badges ---
+    st.session_state['points'] += 10
+    if st.session_state['points'] >= 100 and 'Quiz Master' not in st.session_state['badges']:
+        st.session_state['badges'].append('🏆 Quiz Master')
+    # Level up for every 50 points
+    st.session_state['level'] = 1 + st.session_state['points'] // 50
+
+# Tracker and quiz share one panel, so a quiz answer refreshes the tracker without a full rerun
+@panel
+def show_progress_and_quiz():
+    show_progress_tracker()
+    show_quiz_and_update_progress()
 
 # --- Smart Reminders (Motivational Nudge) ---
+@panel
 def show_smart_reminder():
     import random
     reminders = [
@@ -451,6 +317,7 @@ def show_smart_reminder():
         st.info(random.choice(reminders))
 
 # --- Collaborative Study Groups & Peer Review ---
+@panel
 def show_study_groups():
     st.markdown("---")
     st.markdown("""
@@ -478,7 +345,25 @@ def show_study_groups():
         if st.session_state['points'] >= 75 and 'Reviewer' not in st.session_state['badges']:
             st.session_state['badges'].append('📝 Reviewer')
         st.session_state['level'] = 1 + st.session_state['points'] // 50
+# --- Uploaded assignment text (PDF pages are extracted on a worker thread, cached by file hash) ---
+def extract_uploaded_assignment(uploaded_file) -> str:
+    file_id = getattr(uploaded_file, 'file_id', None) or f"{uploaded_file.name}:{uploaded_file.size}"
+    extracted = st.session_state.get('assignment_extract')
+    if extracted and extracted[0] == file_id:
+        return extracted[1]
+    job = start_extraction(uploaded_file, uploaded_file.name)
+    progress = st.progress(0.0, text=f"Reading {uploaded_file.name}...")
+    while not job.done():
+        if job.progress.pages_total:
+            progress.progress(job.progress.pages_done / job.progress.pages_total, text=f"Reading {uploaded_file.name}: page {job.progress.pages_done} of {job.progress.pages_total}")
+        time.sleep(0.1)
+    progress.empty()
+    text = job.result()
+    st.session_state['assignment_extract'] = (file_id, text)
+    return text
+
 # --- AI-Powered Personalized Feedback on Assignments ---
+@panel
 def show_assignment_feedback():
     st.markdown("---")
     st.markdown("""
@@ -492,19 +377,51 @@ def show_assignment_feedback():
     content = ""
     if uploaded_file is not None:
         try:
-            content = uploaded_file.read().decode("utf-8")
+            content = extract_uploaded_assignment(uploaded_file)
+        except ValueError as exc:
+            st.warning(f"{exc} Please paste your text below.")
         except Exception:
-            content = "(Unable to decode file. Please paste your text below.)"
+            st.warning("Unable to read this file. Please paste your text below.")
     elif assignment_text:
         content = assignment_text
     if st.button("Get AI Feedback"):
         if not content.strip():
             st.warning("Please upload a file or enter your solution.")
         else:
-            with st.spinner("Generating feedback from Professor agent..."):
-                feedback_response = professor_agent.run(f"Please provide detailed, constructive feedback and improvement suggestions for this assignment/essay:\n\n{content}", stream=False)
+            # Long submissions are reviewed part by part in parallel, then merged into one report
+            chunks = chunk_document(content) if count_tokens(content) > SINGLE_PASS_TOKENS else []
+            chunk_lines = []
+            if len(chunks) > 1:
+                chunk_progress = st.progress(0.0, text=f"Reviewing {len(chunks)} parts of your assignment...")
+                chunk_log = st.empty()
+
+                def show_chunk_progress(chunk, result, cached):
+                    title = f"Part {chunk.index + 1}" + (f" ({chunk.heading})" if chunk.heading else "")
+                    if not result.ok:
+                        chunk_lines.append(f"⚠️ {title}: {result.error}")
+                    elif cached:
+                        chunk_lines.append(f"♻️ {title}: unchanged, reused earlier review")
+                    else:
+                        chunk_lines.append(f"✅ {title}: reviewed in {result.elapsed:.1f}s")
+                    chunk_progress.progress(len(chunk_lines) / len(chunks), text=f"Reviewed {len(chunk_lines)} of {len(chunks)} parts")
+                    chunk_log.markdown("  \n".join(chunk_lines))
             st.markdown("#### 📋 AI Feedback:")
-            st.markdown(feedback_response.content)
+            renderer = ThrottledRenderer(st.empty())
+            try:
+                feedback = review_document(
+                    professor_agent,
+                    content,
+                    chunks=chunks,
+                    force_refresh=st.session_state.get('force_refresh', False),
+                    max_concurrency=AGENT_MAX_CONCURRENCY,
+                    timeout=AGENT_TIMEOUT_SECONDS,
+                    on_chunk_done=show_chunk_progress if len(chunks) > 1 else None,
+                    on_chunk=renderer.push,
+                )
+            except RuntimeError as exc:
+                st.error(str(exc))
+                return
+            renderer.finish(feedback)
             # Gamification: Points for submitting assignment
             st.session_state['points'] += 15
             if st.session_state['points'] >= 125 and 'Consistent Learner' not in st.session_state['badges']:
@@ -512,6 +429,7 @@ def show_assignment_feedback():
             st.session_state['level'] = 1 + st.session_state['points'] // 50
 
 # --- One-Click Export to Google Docs/Notion ---
+@panel
 def show_export_buttons():
     st.markdown("---")
     st.markdown("""
@@ -529,6 +447,7 @@ def show_export_buttons():
             st.info("Exporting to Notion... (Demo: Copy content and paste into your Notion page)")
 
 # --- Interactive Live Q&A Section ---
+@panel
 def show_live_qa():
     st.markdown("---")
     st.markdown("""
@@ -538,190 +457,160 @@ def show_live_qa():
     """, unsafe_allow_html=True)
     agent_choice = st.selectbox("Which agent do you want to ask?", ["Professor", "Academic Advisor", "Research Librarian", "Teaching Assistant"], key="qa_agent")
     user_question = st.text_input("Ask your question:", key="qa_input")
-    if st.button("Ask Agent"):
-        with st.spinner("Getting answer from agent..."):
-            if agent_choice == "Professor":
-                response = professor_agent.run(user_question, stream=False)
-            elif agent_choice == "Academic Advisor":
-                response = academic_advisor_agent.run(user_question, stream=False)
-            elif agent_choice == "Research Librarian":
-                response = research_librarian_agent.run(user_question, stream=False)
-            else:
-                response = teaching_assistant_agent.run(user_question, stream=False)
+    # Set when the learner rejects an instant answer: ask the agent this time
+    retry = st.session_state.pop('qa_retry', False)
+    if st.button("Ask Agent") or retry:
+        qa_agents = {
+            "Professor": professor_agent,
+            "Academic Advisor": academic_advisor_agent,
+            "Research Librarian": research_librarian_agent,
+            "Teaching Assistant": teaching_assistant_agent,
+        }
         st.markdown(f"**{agent_choice} says:**")
-        st.markdown(response.content)
-
-    # --- Only show main features if started ---
-    if st.session_state.get('started', False):
-        # Debug: Check if responses exist in session state
-        missing = []
-        for key in [
-            'professor_response',
-            'academic_advisor_response',
-            'research_librarian_response',
-            'teaching_assistant_response']:
-            if key not in st.session_state or st.session_state[key] is None:
-                missing.append(key)
-        if missing:
-            st.warning(f"No response found for: {', '.join(missing)}.\nTry clicking the button again or check for errors in the agent code.")
+        # Near-duplicate questions on the same topic are answered from the semantic cache
+        scope = (st.session_state.get('saved_topic') or st.session_state.get('topic', ''), agent_choice)
+        hit = None if retry else semantic_cache.lookup(scope, user_question)
+        if hit:
+            st.markdown(hit.answer)
+            st.caption(f"⚡ Instant answer to a similar question: “{hit.question}” ({hit.similarity:.0%} match)")
+            st.button("Not what I asked, ask the agent", key="qa_reject", on_click=reject_cached_answer, args=(scope, hit.entry_id))
         else:
-            # Display responses in the Streamlit UI using pprint_run_response
-            st.markdown("### Professor Response:")
-            st.markdown(st.session_state['professor_response'].content)
-            pprint_run_response(st.session_state['professor_response'], markdown=True)
-            st.divider()
-            st.markdown("### Academic Advisor Response:")
-            st.markdown(st.session_state['academic_advisor_response'].content)
-            pprint_run_response(st.session_state['academic_advisor_response'], markdown=True)
-            st.divider()
-            st.markdown("### Research Librarian Response:")
-            st.markdown(st.session_state['research_librarian_response'].content)
-            pprint_run_response(st.session_state['research_librarian_response'], markdown=True)
-            st.divider()
-            st.markdown("### Teaching Assistant Response:")
-            st.markdown(st.session_state['teaching_assistant_response'].content)
-            pprint_run_response(st.session_state['teaching_assistant_response'], markdown=True)
-            st.divider()
-        # Show progress tracker
-        show_progress_tracker()
-        # Show quiz and update progress
-        show_quiz_and_update_progress()
-        # Show smart reminders
-        show_smart_reminder()
-        # Show study groups and peer review
-        show_study_groups()
-        # Show AI-powered assignment feedback
-        show_assignment_feedback()
-        # Show export buttons
-        show_export_buttons()
-        # Show live Q&A
-        show_live_qa()
+            # Stream the answer into the page as it is generated
+            response = stream_to_placeholder(qa_agents[agent_choice], user_question, st.empty(), call_site="live_qa")
+            if isinstance(response.content, str):
+                semantic_cache.store(scope, user_question, response.content)
+    qa_stats = semantic_cache.stats()
+    if qa_stats['lookups']:
+        precision = f", {qa_stats['precision']:.0%} precise" if qa_stats['precision'] is not None else ""
+        st.caption(f"Answer cache: {qa_stats['hits']} of {qa_stats['lookups']} questions answered instantly ({qa_stats['hit_rate']:.0%}){precision}")
+
+def reject_cached_answer(scope, entry_id):
+    semantic_cache.report_wrong(scope, entry_id)
+    st.session_state['qa_retry'] = True
+
+# --- Report display lives in the Learning Team tab (it was unreachable inside show_live_qa) ---
+if is_open(tab1):
+    with tab1:
+        # --- Only show main features if started ---
+        if st.session_state.get('started', False):
+            # Reports saved on an earlier visit are read from the learner store only when shown
+            for key in ARTIFACT_KEYS:
+                if key not in st.session_state:
+                    content = learner_store.load_artifact(st.session_state['user_id'], key)
+                    if content is not None:
+                        st.session_state[key] = RunResponse(content=content)
+            if st.session_state.get('saved_topic'):
+                st.caption(f"Reports for: {st.session_state['saved_topic']}")
+            # Long reports are split into sections that only render when expanded; a failed agent
+            # only hides its own report
+            for key, title in [
+                ('professor_response', "Professor"),
+                ('academic_advisor_response', "Academic Advisor"),
+                ('research_librarian_response', "Research Librarian"),
+                ('teaching_assistant_response', "Teaching Assistant")]:
+                st.markdown(f"### {title} Response:")
+                if st.session_state.get(key) is None:
+                    st.warning(f"No response from the {title}. Try clicking the button again.")
+                else:
+                    show_report(key, st.session_state[key].content)
+                    echo_to_terminal(st.session_state[key])
+                st.divider()
+            # Show progress tracker and quiz
+            show_progress_and_quiz()
+            # Show smart reminders
+            show_smart_reminder()
+            # Show study groups and peer review
+            show_study_groups()
+            # Show AI-powered assignment feedback
+            show_assignment_feedback()
+            # Show export buttons
+            show_export_buttons()
+            # Show live Q&A
+            show_live_qa()
 
 # --- AI Support Assistant Chatbot Tab ---
-with tab2:
-    st.header("🤖 AI Support Assistant Chatbot")
-    st.write("Chat one-to-one with your AI assistant. Your conversation is remembered!")
-    if 'chat_history' not in st.session_state:
-        st.session_state['chat_history'] = []
-    # --- Enhanced Chat UI ---
-    st.markdown("""
-        <style>
-        .chat-container {max-height: 400px; overflow-y: auto; padding: 0.5em 0; border-radius: 8px; background: #f7f7fa; border: 1px solid #e0e0e0; margin-bottom: 1em;}
-        .chat-bubble-user {background: #d1e7ff; color: #222; padding: 0.7em 1em; border-radius: 18px 18px 4px 18px; margin: 0.3em 0 0.3em 2em; display: inline-block; max-width: 80%;}
-        .chat-bubble-ai {background: #f0f0f0; color: #222; padding: 0.7em 1em; border-radius: 18px 18px 18px 4px; margin: 0.3em 2em 0.3em 0; display: inline-block; max-width: 80%;}
-        .chat-row {display: flex; align-items: flex-end;}
-        .chat-avatar {width: 32px; height: 32px; border-radius: 50%; margin: 0 0.5em;}
-        .chat-row.user {justify-content: flex-end;}
-        .chat-row.ai {justify-content: flex-start;}
-        </style>
-    """, unsafe_allow_html=True)
-    # Scrollable chat area
-    chat_html = ["<div class='chat-container'>"]
-    for entry in st.session_state['chat_history']:
-        if entry['role'] == 'user':
-            chat_html.append(f"<div class='chat-row user'><div class='chat-bubble-user'>{entry['content']}</div><img class='chat-avatar' src='https://cdn-icons-png.flaticon.com/512/1946/1946429.png' alt='User'></div>")
-        else:
-            chat_html.append(f"<div class='chat-row ai'><img class='chat-avatar' src='https://cdn-icons-png.flaticon.com/512/4712/4712035.png' alt='AI'><div class='chat-bubble-ai'>{entry['content']}</div></div>")
-    chat_html.append("</div>")
-    st.markdown("\n".join(chat_html), unsafe_allow_html=True)
-    # Input area with send button on same line
-    col1, col2 = st.columns([8,1])
-    with col1:
-        user_message = st.text_area("Type your message...", key="chat_input", height=68, label_visibility="collapsed")
-    with col2:
-        send_clicked = st.button("➡️", key="send_chat", help="Send message")
-    # Clear chat button
-    if st.button("🧹 Clear Chat", key="clear_chat"):
-        st.session_state['chat_history'] = []
-        st.rerun()
-    # Handle sending
-    if send_clicked:
-        if user_message.strip():
-            st.session_state['chat_history'].append({'role': 'user', 'content': user_message})
-            # Build conversation for context
-            conversation = "\n".join([f"User: {e['content']}" if e['role']=='user' else f"AI: {e['content']}" for e in st.session_state['chat_history']])
-            with st.spinner("AI is typing..."):
-                ai_response = professor_agent.run(f"Continue this conversation as a helpful AI assistant.\n\n{conversation}\nAI:", stream=False)
-            st.session_state['chat_history'].append({'role': 'ai', 'content': ai_response.content})
+if is_open(tab2):
+    with tab2:
+        st.header("🤖 AI Support Assistant Chatbot")
+        st.write("Chat one-to-one with your AI assistant. Your conversation is remembered!")
+        if 'chat_history' not in st.session_state:
+            st.session_state['chat_history'] = []
+        # Token-budgeted memory used to build the prompt; older turns are summarized in the background
+        if 'chat_memory' not in st.session_state:
+            st.session_state['chat_memory'] = ConversationMemory()
+            for entry in st.session_state['chat_history']:
+                st.session_state['chat_memory'].add(entry['role'], entry['content'])
+        # Rebuilt when the team's HTTP pool changes (new keys or invalidated registry)
+        if st.session_state.get('chat_summarizer_agent') is None or st.session_state['chat_summarizer_agent'].model.http_client is not professor_agent.model.http_client:
+            st.session_state['chat_summarizer_agent'] = build_summarizer_agent(st.session_state['openai_api_key'], http_client=professor_agent.model.http_client)
+        st.session_state['chat_memory'].summarizer = make_agent_summarizer(st.session_state['chat_summarizer_agent'])
+        # --- Enhanced Chat UI (styles/chat.css) ---
+        # Scrollable chat area: one cached element per message, only the most recent page is rendered
+        chat_avatars = {'user': asset_src('user_avatar', static_serving) or "", 'ai': asset_src('ai_avatar', static_serving) or ""}
+        if 'chat_visible' not in st.session_state:
+            st.session_state['chat_visible'] = CHAT_PAGE_SIZE
+        hidden = visible_start(st.session_state['chat_history'], st.session_state['chat_visible'])
+        if hidden and st.button(f"⬆️ Load earlier messages ({hidden} more)", key="chat_load_earlier"):
+            st.session_state['chat_visible'] += CHAT_PAGE_SIZE
+            st.rerun()
+        chat_box = st.container(height=400)
+        render_transcript(chat_box, st.session_state['chat_history'], chat_avatars, st.session_state['chat_visible'])
+        # Input area with send button on same line
+        col1, col2 = st.columns([8,1])
+        with col1:
+            user_message = st.text_area("Type your message...", key="chat_input", height=68, label_visibility="collapsed")
+        with col2:
+            send_clicked = st.button("➡️", key="send_chat", help="Send message")
+        # Clear chat button
+        if st.button("🧹 Clear Chat", key="clear_chat"):
+            st.session_state['chat_history'] = []
+            st.session_state['chat_visible'] = CHAT_PAGE_SIZE
+            st.session_state['chat_memory'] = ConversationMemory(summarizer=st.session_state['chat_memory'].summarizer)
             st.rerun()
+        # Handle sending: the new turn is appended to the transcript in place, no full rerun
+        if send_clicked:
+            if user_message.strip():
+                user_entry = {'role': 'user', 'content': user_message}
+                st.session_state['chat_history'].append(user_entry)
+                st.session_state['chat_memory'].add('user', user_message)
+                append_message(chat_box, user_entry, chat_avatars)
+                # Build conversation for context from the bounded window plus the rolling summary
+                conversation_prompt = st.session_state['chat_memory'].build_prompt()
+                # An opening question close to one already answered on this topic is served from the semantic cache;
+                # follow-ups depend on the conversation so far and always go to the agent
+                opening = len(st.session_state['chat_history']) == 1
+                chat_scope = ("chatbot", st.session_state.get('saved_topic') or st.session_state.get('topic', ''))
+                hit = semantic_cache.lookup(chat_scope, user_message) if opening else None
+                if hit:
+                    ai_content = hit.answer
+                    append_message(chat_box, {'role': 'ai', 'content': ai_content}, chat_avatars)
+                else:
+                    ai_content = stream_to_placeholder(professor_agent, conversation_prompt, chat_box.empty(), call_site="chatbot").content
+                    if opening:
+                        semantic_cache.store(chat_scope, user_message, ai_content)
+                st.session_state['chat_history'].append({'role': 'ai', 'content': ai_content})
+                st.session_state['chat_memory'].add('ai', ai_content)
+# --- Agent metrics admin panel (set SHOW_AGENT_METRICS to enable) ---
+def show_agent_metrics():
+    with st.sidebar.expander("📈 Agent metrics", expanded=False):
+        # One row per route (call site, agent, model), with how often it fell back to the next model
+        rows = route_stats()
+        if not rows:
+            st.caption("No agent runs recorded yet.")
+            return
+        total_cost = sum(row['cost_usd'] for row in rows)
+        total_tokens = sum(row['input_tokens'] + row['output_tokens'] for row in rows)
+        st.caption(f"{sum(row['runs'] for row in rows)} runs, {total_tokens} tokens, ~${total_cost:.4f}")
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+        st.download_button("Prometheus metrics", metrics_registry.prometheus_text(), file_name="agent_metrics.prom", mime="text/plain")
+        st.download_button("Runs (JSON lines)", metrics_registry.jsonl(), file_name="agent_runs.jsonl", mime="application/x-ndjson")
+
+if SHOW_AGENT_METRICS:
+    show_agent_metrics()
+
 # 🌟 Meet Your AI Teaching Team
 st.markdown("""
 <hr style='margin-top:2em;margin-bottom:1em;border:1px solid #e0e0e0;'>
-<style>
-.ai-team-section {
-  background: linear-gradient(120deg, #a18cd1 0%, #fbc2eb 100%);
-  border-radius: 18px;
-  padding: 2em 1em 1.5em 1em;
-  margin-bottom: 2em;
-  box-shadow: 0 4px 24px 0 rgba(120, 80, 180, 0.10);
-  animation: fadeIn 1.2s;
-}
-.ai-team-title {
-  text-align: center;
-  color: #fff;
-  font-size: 2.1em;
-  font-weight: bold;
-  letter-spacing: 1px;
-  margin-bottom: 1.2em;
-  text-shadow: 0 2px 8px #a18cd1;
-}
-.ai-team-cards {
-  display: flex;
-  flex-wrap: wrap;
-  justify-content: center;
-  gap: 1.5em;
-}
-.ai-agent-card {
-  background: linear-gradient(120deg, #fbc2eb 0%, #a6c1ee 100%);
-  border-radius: 16px;
-  box-shadow: 0 2px 12px 0 rgba(120, 80, 180, 0.10);
-  padding: 1.2em 1.1em 1em 1.1em;
-  min-width: 240px;
-  max-width: 320px;
-  flex: 1 1 220px;
-  transition: transform 0.18s, box-shadow 0.18s;
-  cursor: pointer;
-  border: 2px solid #fff0;
-}
-.ai-agent-card:hover {
-  transform: translateY(-8px) scale(1.04);
-  box-shadow: 0 8px 32px 0 rgba(120, 80, 180, 0.18);
-  border: 2px solid #a18cd1;
-}
-.ai-agent-icon {
-  font-size: 2.2em;
-  margin-bottom: 0.3em;
-  display: block;
-  text-align: center;
-  filter: drop-shadow(0 2px 6px #fff8);
-}
-.ai-agent-title {
-  font-size: 1.18em;
-  font-weight: bold;
-  color: #3b3b6d;
-  text-align: center;
-  margin-bottom: 0.3em;
-}
-.ai-agent-desc {
-  color: #4b3b5d;
-  font-size: 1.05em;
-  text-align: center;
-  margin-bottom: 0.1em;
-}
-.ai-team-footer {
-  text-align: center;
-  margin-top: 1.5em;
-  color: #fff;
-  font-weight: bold;
-  font-size: 1.15em;
-  letter-spacing: 0.5px;
-  text-shadow: 0 2px 8px #a18cd1;
-}
-@keyframes fadeIn {
-  from { opacity: 0; transform: translateY(30px); }
-  to { opacity: 1; transform: translateY(0); }
-}
-</style>
 <div class='ai-team-section'>
   <div class='ai-team-title'>🌈 Meet Your AI Teaching Team</div>
   <div class='ai-team-cards'>
@@ -750,7 +639,5 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-
-
-
-
+# --- Flush the learner profile once per script run ---
+persist_profile(st.session_state, st.session_state['user_id'], learner_store)
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Defaults for the concurrent Start flow; both can be overridden from
+# Streamlit secrets / environment (AGENT_MAX_CONCURRENCY, AGENT_TIMEOUT_SECONDS).
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_AGENT_TIMEOUT = 180.0
+
+
+@dataclass
+class AgentResult:
+    name: str
+    response: Any = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _check_graph(jobs: Dict[str, Any], dependencies: Dict[str, List[str]]) -> None:
+    unknown = {dep for deps in dependencies.values() for dep in deps} - set(jobs)
+    if unknown:
+        raise ValueError(f"Unknown dependencies: {', '.join(sorted(unknown))}")
+    resolved, waiting = set(), list(jobs)
+    while waiting:
+        ready = [n for n in waiting if all(dep in resolved for dep in dependencies.get(n, []))]
+        if not ready:
+            raise ValueError(f"Dependency cycle between: {', '.join(waiting)}")
+        resolved.update(ready)
+        waiting = [n for n in waiting if n not in resolved]
+
+
+async def arun_graph(
+    jobs: Dict[str, Callable[[Dict[str, AgentResult]], Awaitable[Any]]],
+    dependencies: Optional[Dict[str, List[str]]] = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    timeout: Optional[float] = DEFAULT_AGENT_TIMEOUT,
+    on_result: Optional[Callable[[AgentResult], None]] = None,
+) -> Dict[str, AgentResult]:
+    """Run agent jobs concurrently, starting each one as soon as its inputs are done.
+
+    `jobs` maps a name to a coroutine function that receives the results of
+    its dependencies (`dependencies[name]`) and returns the agent's response.
+    Jobs without dependencies start immediately. A dependent job still runs
+    when an input failed; it just receives that failed AgentResult.
+
+    At most `max_concurrency` jobs run at once. The timeout is per job and
+    counts from the moment it gets a slot; a timed-out job is cancelled, and
+    cancelling the graph cancels every running job. `on_result` is called on
+    the event loop thread as each job finishes, fails or times out; if it
+    raises, the remaining jobs are cancelled and the error propagates.
+    """
+    dependencies = dependencies or {}
+    _check_graph(jobs, dependencies)
+    results: Dict[str, AgentResult] = {}
+    finished = {name: asyncio.Event() for name in jobs}
+    slots = asyncio.Semaphore(max(1, int(max_concurrency)))
+
+    async def _run(name):
+        for dep in dependencies.get(name, []):
+            await finished[dep].wait()
+        inputs = {dep: results[dep] for dep in dependencies.get(name, [])}
+        async with slots:
+            started = time.monotonic()
+            try:
+                response = await asyncio.wait_for(jobs[name](inputs), timeout)
+                result = AgentResult(name, response=response, elapsed=time.monotonic() - started)
+            except asyncio.TimeoutError:
+                error = f"Timed out after {timeout:.0f}s" if timeout is not None else "Timed out"
+                result = AgentResult(name, error=error, elapsed=time.monotonic() - started)
+            except Exception as exc:
+                result = AgentResult(name, error=f"{type(exc).__name__}: {exc}", elapsed=time.monotonic() - started)
+        results[name] = result
+        try:
+            if on_result:
+                on_result(result)
+        finally:
+            finished[name].set()
+
+    tasks = [asyncio.ensure_future(_run(name)) for name in jobs]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # A failing `on_result` ends the graph; do not leave its other jobs running
+        for task in tasks:
+            task.cancel()
+    return {name: results[name] for name in jobs}
@@ -0,0 +1,178 @@
+import dataclasses
+import hashlib
+import threading
+from typing import Dict, MutableMapping, Optional, Union
+
+import httpx
+from agno.agent import Agent
+from agno.models.openai import OpenAIChat
+
+from http_pool import shared_http_client
+from search_cache import search_tools
+
+DEFAULT_MODEL_ID = "gpt-3.5-turbo"
+# Cheaper model for housekeeping calls such as chat summaries
+SUMMARIZER_MODEL_ID = "gpt-4o-mini"
+
+# Definition of the four-agent teaching team, shared by every entry point.
+TEAM_SPEC = {
+    'professor': {
+        'name': "Professor",
+        'role': "Research and Knowledge Specialist",
+        'search': False,
+        'instructions': [
+            "Create a comprehensive knowledge base that covers fundamental concepts, advanced topics, and current developments of the given topic.",
+            "Explain the topic from first principles first. Include key terminology, core principles, and practical applications and make it as a detailed report that anyone who's starting out can read and get maximum value out of it.",
+            "Make sure it is formatted in a way that is easy to read and understand.",
+        ],
+    },
+    'academic_advisor': {
+        'name': "Academic Advisor",
+        'role': "Learning Path Designer",
+        'search': False,
+        'instructions': [
+            "Using the knowledge base for the given topic, create a detailed learning roadmap.",
+            "Break down the topic into logical subtopics and arrange them in order of progression, a detailed report of roadmap that includes all the subtopics in order to be an expert in this topic.",
+            "Include estimated time commitments for each section.",
+            "Present the roadmap in a clear, structured format.",
+        ],
+    },
+    'research_librarian': {
+        'name': "Research Librarian",
+        'role': "Learning Resource Specialist",
+        'search': True,
+        'instructions': [
+            "Make a list of high-quality learning resources for the given topic.",
+            "Use the SerpApi search tool to find current and relevant learning materials.",
+            "Include technical blogs, GitHub repositories, official documentation, video tutorials, and courses.",
+            "Present the resources in a curated list with descriptions and quality assessments.",
+        ],
+    },
+    'teaching_assistant': {
+        'name': "Teaching Assistant",
+        'role': "Exercise Creator",
+        'search': True,
+        'instructions': [
+            "Create comprehensive practice materials for the given topic.",
+            "Use the SerpApi search tool to find example problems and real-world applications.",
+            "Include progressive exercises, quizzes, hands-on projects, and real-world application scenarios.",
+            "Ensure the materials align with the roadmap progression.",
+            "Provide detailed solutions and explanations for all practice materials.",
+        ],
+    },
+}
+
+# Process-level resources (search toolkits) keyed by fingerprint; the HTTP pool is shared by all of them
+_resources: Dict[str, dict] = {}
+_teams: Dict[str, Dict[str, Agent]] = {}
+_lock = threading.Lock()
+
+
+def team_fingerprint(openai_api_key: str, serpapi_api_key: str, model_id: str = DEFAULT_MODEL_ID, temperature: Optional[float] = None) -> str:
+    """Stable, non-reversible identifier for a set of keys and model settings."""
+    raw = "\x1f".join([openai_api_key or '', serpapi_api_key or '', model_id, repr(temperature)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _get_resources(fingerprint: str, serpapi_api_key: str) -> dict:
+    with _lock:
+        resources = _resources.get(fingerprint)
+        if resources is None:
+            resources = {
+                # One keep-alive pool (with retry/backoff on 429/5xx) shared by every OpenAIChat
+                'http_client': shared_http_client(),
+                # One search layer shared by the Research Librarian and the Teaching Assistant
+                'search_tools': search_tools(api_key=serpapi_api_key),
+            }
+            _resources[fingerprint] = resources
+        return resources
+
+
+def build_team(openai_api_key: str, serpapi_api_key: str, model_id: str = DEFAULT_MODEL_ID, temperature: Optional[float] = None) -> Dict[str, Agent]:
+    """Build the four agents on top of the shared, per-fingerprint HTTP pool and search tools."""
+    fingerprint = team_fingerprint(openai_api_key, serpapi_api_key, model_id, temperature)
+    resources = _get_resources(fingerprint, serpapi_api_key)
+    team = {}
+    for key, spec in TEAM_SPEC.items():
+        # Retries happen in the shared transport; the OpenAI SDK's own retries would multiply them
+        model_kwargs = {'id': model_id, 'api_key': openai_api_key, 'http_client': resources['http_client'], 'max_retries': 0}
+        if temperature is not None:
+            model_kwargs['temperature'] = temperature
+        team[key] = Agent(
+            name=spec['name'],
+            role=spec['role'],
+            model=OpenAIChat(**model_kwargs),
+            tools=[resources['search_tools']] if spec['search'] else [],
+            instructions=list(spec['instructions']),
+            show_tool_calls=True,
+            markdown=True,
+        )
+    return team
+
+
+def clone_agent(agent: Agent, http_client: Optional[Union[httpx.Client, httpx.AsyncClient]] = None) -> Agent:
+    """Independent copy of `agent` for a concurrent run, still on the original HTTP pool and tools.
+
+    agno's `deep_copy` would also copy the model and with it the httpx client,
+    so the model is rebuilt (same settings) around the shared client instead.
+    Pass an `httpx.AsyncClient` to get a copy for `agent.arun`.
+    """
+    model = dataclasses.replace(agent.model, http_client=http_client or agent.model.http_client)
+    return agent.deep_copy(update={'model': model})
+
+
+def build_summarizer_agent(openai_api_key: str, model_id: str = SUMMARIZER_MODEL_ID, http_client: Optional[httpx.Client] = None) -> Agent:
+    """Small agent that condenses chat history; pass a team member's `model.http_client` to share its pool."""
+    return Agent(
+        name="Summarizer",
+        role="Conversation Summarizer",
+        model=OpenAIChat(id=model_id, api_key=openai_api_key, temperature=0, http_client=http_client, max_retries=0 if http_client else None),
+        instructions=["Summarize conversations faithfully and concisely."],
+        markdown=False,
+    )
+
+
+def get_team(openai_api_key: str, serpapi_api_key: str, model_id: str = DEFAULT_MODEL_ID, temperature: Optional[float] = None, store: Optional[MutableMapping] = None) -> Dict[str, Agent]:
+    """Return the cached team for these keys/settings, building it on first use.
+
+    By default the team is cached process-wide. Streamlit pages pass
+    `st.session_state` as `store` so each session keeps its own agents (agno
+    agents hold per-run state and are not safe to run concurrently from two
+    sessions) while the HTTP pool and search tools are still shared.
+    """
+    fingerprint = team_fingerprint(openai_api_key, serpapi_api_key, model_id, temperature)
+    cache_key = f"_agent_team_{fingerprint}"
+    if store is None:
+        with _lock:
+            team = _teams.get(cache_key)
+        if team is None:
+            team = build_team(openai_api_key, serpapi_api_key, model_id, temperature)
+            with _lock:
+                team = _teams.setdefault(cache_key, team)
+        return team
+    team = store.get(cache_key)
+    if team is None or fingerprint not in _resources:
+        # Keys or model settings changed (or the pool was invalidated): drop the stale team
+        for stale in [k for k in store.keys() if isinstance(k, str) and k.startswith("_agent_team_")]:
+            del store[stale]
+        team = build_team(openai_api_key, serpapi_api_key, model_id, temperature)
+        store[cache_key] = team
+    return team
+
+
+def invalidate_team(fingerprint: Optional[str] = None, store: Optional[MutableMapping] = None) -> None:
+    """Drop cached teams and their search tools (all of them if no fingerprint is given).
+
+    Call this when model settings change without changing the fingerprint
+    (e.g. after editing TEAM_SPEC in a long-running process) or to release
+    the resources of keys that are no longer in use. The process-wide HTTP
+    pool stays open; other teams are still using it.
+    """
+    with _lock:
+        fingerprints = [fingerprint] if fingerprint else list(_resources)
+        for fp in fingerprints:
+            _teams.pop(f"_agent_team_{fp}", None)
+            _resources.pop(fp, None)
+    if store is not None:
+        for stale in [k for k in store.keys() if isinstance(k, str) and k.startswith("_agent_team_") and (fingerprint is None or k.endswith(fingerprint))]:
+            del store[stale]
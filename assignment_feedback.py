@@ -0,0 +1,241 @@
+import os
+import queue
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from agno.agent import Agent
+
+from agent_orchestrator import AgentResult, arun_graph, DEFAULT_MAX_CONCURRENCY, DEFAULT_AGENT_TIMEOUT
+from async_core import arun, drive
+from chat_memory import count_tokens
+from pipeline import compress_context
+from response_cache import get_response_cache
+
+FEEDBACK_PROMPT = "Please provide detailed, constructive feedback and improvement suggestions for this assignment/essay:\n\n"
+# Submissions up to this size are reviewed in one call, longer ones chunk by chunk
+SINGLE_PASS_TOKENS = int(os.getenv('FEEDBACK_SINGLE_PASS_TOKENS', 3000))
+CHUNK_TOKENS = int(os.getenv('FEEDBACK_CHUNK_TOKENS', 1500))
+# Budget for all per-chunk reviews together in the merge prompt
+MERGE_INPUT_TOKENS = int(os.getenv('FEEDBACK_MERGE_INPUT_TOKENS', 6000))
+
+_HEADING = re.compile(r"^(#{1,6}\s+\S.*|(?:chapter|section|part)\s+\d+\b.{0,80}|\d+(?:\.\d+)*\.?\s+[A-Z][^.!?]{0,80})$", re.I)
+
+
+@dataclass
+class Chunk:
+    index: int
+    heading: str
+    text: str
+    tokens: int
+
+
+def split_sections(text: str) -> List[tuple]:
+    """(heading, body) pairs split at markdown or numbered headings; text before the first heading has heading ''."""
+    sections, heading, lines = [], "", []
+    for line in (text or "").splitlines():
+        if _HEADING.match(line.strip()):
+            if heading or "".join(lines).strip():
+                sections.append((heading, "\n".join(lines).strip()))
+            heading, lines = line.strip().lstrip("#").strip(), []
+        else:
+            lines.append(line)
+    if heading or "".join(lines).strip():
+        sections.append((heading, "\n".join(lines).strip()))
+    return sections
+
+
+def _split_oversized(paragraph: str, max_tokens: int) -> List[str]:
+    """Sentence-pack a paragraph that is too long on its own; cut word-wise as a last resort."""
+    pieces, current = [], ""
+    for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+        while count_tokens(sentence) > max_tokens:
+            words = sentence.split()
+            cut = max(1, len(words) * max_tokens // count_tokens(sentence))
+            pieces.append(" ".join(words[:cut]))
+            sentence = " ".join(words[cut:])
+        candidate = f"{current} {sentence}".strip()
+        if current and count_tokens(candidate) > max_tokens:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_document(text: str, max_tokens: int = CHUNK_TOKENS) -> List[Chunk]:
+    """Token-bounded chunks anchored to section boundaries.
+
+    Every section starts a new chunk, except that tiny sections (under a
+    quarter of `max_tokens`) are kept with the sections after them. A
+    section that does not fit is split between paragraphs (between sentences
+    for an oversized paragraph). Where a boundary falls depends only on the
+    sections next to it, so an edit moves boundaries within its own section
+    at most, and the other chunks hit the review cache when a revised
+    version is resubmitted.
+    """
+    chunks: List[Chunk] = []
+    heading, parts, used = "", [], 0
+    tiny = max_tokens // 4
+
+    def _flush():
+        nonlocal heading, parts, used
+        if parts:
+            body = "\n\n".join(parts)
+            chunks.append(Chunk(len(chunks), heading, body, count_tokens(body)))
+        heading, parts, used = "", [], 0
+
+    for section_heading, body in split_sections(text):
+        section = (f"## {section_heading}\n\n{body}" if section_heading else body).strip()
+        tokens = count_tokens(section)
+        if tokens <= max_tokens:
+            if parts and used + tokens > max_tokens:
+                _flush()
+            heading = heading if parts else section_heading
+            parts.append(section)
+            used += tokens
+            if tokens >= tiny:
+                _flush()
+            continue
+        _flush()
+        heading = section_heading
+        for paragraph in re.split(r"\n\s*\n", body):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            for piece in ([paragraph] if count_tokens(paragraph) <= max_tokens else _split_oversized(paragraph, max_tokens)):
+                tokens = count_tokens(piece)
+                if parts and used + tokens > max_tokens:
+                    _flush()
+                    heading = section_heading
+                parts.append(piece)
+                used += tokens
+        _flush()
+    _flush()
+    return chunks
+
+
+def chunk_prompt(chunk: Chunk) -> str:
+    """Review prompt for one chunk; it leaves out the chunk's position so cached reviews survive edits elsewhere."""
+    where = f" (section: {chunk.heading})" if chunk.heading else ""
+    return (
+        f"You are reviewing one part of a longer assignment/essay{where}. "
+        "Give specific, constructive feedback on this part only: strengths, problems (quote the passage), "
+        "and concrete improvement suggestions. Be concise and use bullet points.\n\n"
+        f"{chunk.text}"
+    )
+
+
+def merge_prompt(chunks: List[Chunk], results: Dict[str, AgentResult], token_budget: int = MERGE_INPUT_TOKENS) -> str:
+    per_chunk = max(100, token_budget // max(1, len(chunks)))
+    parts = []
+    for chunk in chunks:
+        result = results.get(_job_name(chunk))
+        title = f"### Part {chunk.index + 1}" + (f": {chunk.heading}" if chunk.heading else "")
+        if result is None or not result.ok:
+            parts.append(f"{title}\n(This part could not be reviewed.)")
+            continue
+        review = result.response.content
+        if count_tokens(review) > per_chunk:
+            review = compress_context(review, per_chunk)
+        parts.append(f"{title}\n{review}")
+    return (
+        "Below is part-by-part feedback on a student's assignment/essay. Merge it into one coherent feedback report "
+        "with an overall assessment, key strengths, the most important issues in priority order, "
+        "part-specific suggestions and next steps. Remove repetition and keep the quoted passages.\n\n"
+        + "\n\n".join(parts)
+    )
+
+
+def _job_name(chunk: Chunk) -> str:
+    return f"chunk_{chunk.index}"
+
+
+async def areview_document(
+    agent: Agent,
+    text: str,
+    chunks: Optional[List[Chunk]] = None,
+    force_refresh: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    timeout: Optional[float] = DEFAULT_AGENT_TIMEOUT,
+    on_chunk_done: Optional[Callable[[Chunk, AgentResult, bool], None]] = None,
+    on_chunk: Optional[Callable[[str], None]] = None,
+) -> str:
+    """Feedback report for a submission of any length, on the current event loop.
+
+    Short texts get a single review. Longer ones are split with `chunk_document`;
+    the chunks are reviewed concurrently (arun_graph) through the response
+    cache, then `agent` merges the reviews (streamed to `on_chunk`).
+    `on_chunk_done(chunk, result, cached)` runs as each review finishes.
+    Callbacks run on the event loop thread. Raises RuntimeError if no chunk
+    could be reviewed.
+    """
+    if chunks is None:
+        chunks = chunk_document(text) if count_tokens(text) > SINGLE_PASS_TOKENS else []
+    if len(chunks) <= 1:
+        response = await arun(agent, FEEDBACK_PROMPT + text, "", force_refresh, on_chunk=on_chunk, call_site="assignment_feedback")
+        return response.content
+
+    cache = get_response_cache()
+    by_name = {_job_name(c): c for c in chunks}
+    prompts = {name: chunk_prompt(c) for name, c in by_name.items()}
+    cached = set() if force_refresh else {name for name, prompt in prompts.items() if cache.peek(cache.key_for(agent, "", prompt))}
+    jobs = {
+        name: (lambda inputs, prompt=prompt: arun(agent, prompt, "", force_refresh, call_site="assignment_feedback_chunk"))
+        for name, prompt in prompts.items()
+    }
+    results = await arun_graph(
+        jobs,
+        max_concurrency=max_concurrency,
+        timeout=timeout,
+        on_result=(lambda result: on_chunk_done(by_name[result.name], result, result.name in cached)) if on_chunk_done else None,
+    )
+    if not any(r.ok for r in results.values()):
+        errors = {r.error for r in results.values()}
+        raise RuntimeError(f"None of the {len(chunks)} parts could be reviewed: {'; '.join(sorted(errors))}")
+    response = await arun(agent, merge_prompt(chunks, results), "", force_refresh, on_chunk=on_chunk, call_site="assignment_feedback")
+    return response.content
+
+
+def review_document(
+    agent: Agent,
+    text: str,
+    chunks: Optional[List[Chunk]] = None,
+    force_refresh: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    timeout: Optional[float] = DEFAULT_AGENT_TIMEOUT,
+    on_chunk_done: Optional[Callable[[Chunk, AgentResult, bool], None]] = None,
+    on_tick: Optional[Callable[[], None]] = None,
+    on_chunk: Optional[Callable[[str], None]] = None,
+) -> str:
+    """Blocking `areview_document` for scripts, run on the shared background event loop.
+
+    `on_chunk_done`, `on_chunk` and `on_tick` are called from the calling
+    thread, so it is safe to update Streamlit placeholders from them.
+    Interrupting the caller cancels the reviews.
+    """
+    # Events from the loop thread, replayed on the calling thread in order
+    events = queue.SimpleQueue()
+
+    def _tick():
+        while not events.empty():
+            callback, args = events.get()
+            callback(*args)
+        if on_tick:
+            on_tick()
+
+    return drive(
+        areview_document(
+            agent,
+            text,
+            chunks,
+            force_refresh,
+            max_concurrency,
+            timeout,
+            (lambda *args: events.put((on_chunk_done, args))) if on_chunk_done else None,
+            (lambda chunk: events.put((on_chunk, (chunk,)))) if on_chunk else None,
+        ),
+        on_tick=_tick,
+    )
@@ -0,0 +1,180 @@
+"""Async execution API for the teaching agents, independent of Streamlit.
+
+`arun` and `astream` run one agent on the event loop's shared HTTP pool;
+`agent_orchestrator.arun_graph` and `pipeline.arun_teaching_pipeline` build
+on them. Synchronous callers (the Streamlit pages, batch threads) hand
+coroutines to one background event loop with `submit` / `drive`, so a single
+keep-alive pool serves every session and a stopped script cancels its
+in-flight requests instead of abandoning a worker thread.
+"""
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from agno.agent import Agent, RunResponse
+
+from agent_registry import clone_agent
+from http_pool import shared_async_client
+from instrumentation import track_run
+from model_router import arun_routed, is_fallback_error, note_fallback, route_chain
+from response_cache import ResponseCache, get_response_cache
+from single_flight import agent_flights
+from streaming import text_delta
+
+
+def async_agent(agent: Agent) -> Agent:
+    """Copy of `agent` whose model calls go through the running loop's async pool."""
+    return clone_agent(agent, http_client=shared_async_client())
+
+
+async def _stream_run(runner: Agent, prompt: str, tracker) -> AsyncIterator[str]:
+    async for event in await runner.arun(prompt, stream=True):
+        chunk = text_delta(event)
+        if chunk:
+            if tracker.first_token is None:
+                tracker.first_token = time.monotonic()
+            yield chunk
+
+
+async def astream(agent: Agent, prompt: str, call_site: str = "async") -> AsyncIterator[str]:
+    """Yield the text deltas of one streamed run; closing the generator cancels the request.
+
+    The route's fallback models are tried only until the first delta was yielded.
+    """
+    _, chain = route_chain(agent, call_site)
+    for index, candidate in enumerate(chain):
+        runner = async_agent(candidate)
+        started = False
+        try:
+            with track_run(call_site, runner) as tracker:
+                async for chunk in _stream_run(runner, prompt, tracker):
+                    started = True
+                    yield chunk
+                tracker.response = runner.run_response
+            return
+        except Exception as exc:
+            if started or index == len(chain) - 1 or not is_fallback_error(exc):
+                raise
+            note_fallback(call_site, agent, candidate.model.id)
+
+
+async def _arun(agent: Agent, prompt: str, topic: Optional[str], force_refresh: bool, on_chunk: Optional[Callable[[str], None]], call_site: str, cache: Optional[ResponseCache]) -> RunResponse:
+    key = None
+    if topic is not None:
+        key = cache.key_for(agent, topic, prompt)
+        content = None if force_refresh else cache.get(key)
+        if content is not None:
+            with track_run(call_site, agent, cached=True):
+                if on_chunk:
+                    on_chunk(content)
+            return RunResponse(content=content, agent_name=agent.name, model=getattr(agent.model, 'id', None))
+    runner = async_agent(agent)
+    with track_run(call_site, runner) as tracker:
+        if on_chunk:
+            parts = []
+            async for chunk in _stream_run(runner, prompt, tracker):
+                parts.append(chunk)
+                on_chunk(chunk)
+            final = runner.run_response
+            if final is None or not getattr(final, 'content', None):
+                final = RunResponse(content="".join(parts), agent_name=agent.name, model=getattr(agent.model, 'id', None))
+            tracker.response = final
+        else:
+            tracker.response = await runner.arun(prompt, stream=False)
+    response = tracker.response
+    if key is not None and isinstance(getattr(response, 'content', None), str) and response.content:
+        cache.set(key, agent.name, response.content)
+    return response
+
+
+async def _arun_routed(agent: Agent, prompt: str, topic: Optional[str], force_refresh: bool, on_chunk: Optional[Callable[[str], None]], call_site: str, cache: Optional[ResponseCache]) -> RunResponse:
+    streamed = []
+    if on_chunk:
+        user_on_chunk = on_chunk
+
+        def on_chunk(chunk: str) -> None:
+            streamed.append(True)
+            user_on_chunk(chunk)
+    return await arun_routed(
+        agent,
+        call_site,
+        lambda candidate: _arun(candidate, prompt, topic, force_refresh, on_chunk, call_site, cache),
+        started=lambda: bool(streamed),
+    )
+
+
+async def arun(
+    agent: Agent,
+    prompt: str,
+    topic: Optional[str] = None,
+    force_refresh: bool = False,
+    on_chunk: Optional[Callable[[str], None]] = None,
+    call_site: str = "async",
+    timeout: Optional[float] = None,
+    cache: Optional[ResponseCache] = None,
+) -> RunResponse:
+    """`agent.arun(prompt)` through the response cache, recorded under `call_site`.
+
+    With a `topic` the response cache is consulted (`force_refresh` skips the
+    lookup but still stores), and identical runs already in flight for other
+    callers are joined instead of repeated (single_flight); without one the
+    call is never cached or shared. `on_chunk` switches to streaming; a cache
+    hit is delivered as a single chunk. The model comes from the call site's
+    route (see model_router), falling back to the next model on timeouts and
+    rate limits. On `timeout` the request is cancelled (unless other callers
+    still wait for it) and asyncio.TimeoutError raised.
+    """
+    if timeout is not None:
+        return await asyncio.wait_for(arun(agent, prompt, topic, force_refresh, on_chunk, call_site, None, cache), timeout)
+    if topic is None:
+        return await _arun_routed(agent, prompt, topic, force_refresh, on_chunk, call_site, cache)
+    cache = cache or get_response_cache()
+    return await agent_flights.run(
+        f"{call_site}\x1f{cache.key_for(agent, topic, prompt)}",
+        lambda publish: _arun_routed(agent, prompt, topic, force_refresh, publish, call_site, cache),
+        on_chunk,
+        on_join=lambda: track_run(call_site, agent, coalesced=True),
+    )
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide event loop (on a daemon thread) that runs coroutines for sync callers."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="agent-loop", daemon=True).start()
+        return _loop
+
+
+def submit(coro: Awaitable) -> concurrent.futures.Future:
+    """Schedule `coro` on the background loop; `future.cancel()` cancels the running task."""
+    return asyncio.run_coroutine_threadsafe(coro, background_loop())
+
+
+def drive(coro: Awaitable, on_tick: Optional[Callable[[], None]] = None, poll_interval: float = 0.25):
+    """Run `coro` on the background loop and block until it returns.
+
+    `on_tick` runs on the calling thread every `poll_interval` seconds (and
+    once at the end), which is where Streamlit placeholders get updated. If
+    the calling thread is interrupted, e.g. because Streamlit stopped or
+    reran the script, the coroutine is cancelled before the exception
+    propagates.
+    """
+    future = submit(coro)
+    try:
+        while True:
+            done, _ = concurrent.futures.wait([future], timeout=poll_interval)
+            if on_tick:
+                on_tick()
+            if done:
+                return future.result()
+    except BaseException:
+        future.cancel()
+        raise
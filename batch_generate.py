@@ -0,0 +1,171 @@
+"""Headless batch generation of course packs.
+
+Runs the four-agent teaching pipeline over a list of topics on the async
+core (no Streamlit) and appends one JSON line per finished topic, so an
+interrupted run picks up where it stopped:
+
+    python batch_generate.py topics.txt --out course_packs.jsonl --workers 4
+
+Reads OPENAI_API_KEY and SERP_API_KEY from the environment (or a .env file).
+Set METRICS_LOG_PATH to also log per-agent latency, tokens and cost as JSON lines.
+Agents run on --model; a 'batch' route in MODEL_ROUTES can pick another model per agent (see model_router).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from agent_registry import DEFAULT_MODEL_ID, build_team
+from pipeline import arun_teaching_pipeline, topic_prompt
+from response_cache import normalize_topic
+from search_cache import RateLimiter
+
+
+def read_topics(path: str) -> list:
+    """One topic per line; blank lines, '#' comments and duplicates are skipped."""
+    topics, seen = [], set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            topic = line.strip()
+            if topic and not topic.startswith("#") and normalize_topic(topic) not in seen:
+                seen.add(normalize_topic(topic))
+                topics.append(topic)
+    return topics
+
+
+def completed_topics(out_path: str) -> set:
+    """Normalized topics that already have a successful record in the output file."""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash mid-write leaves at most one truncated last line
+                continue
+            if record.get('status') == 'ok':
+                done.add(record['normalized_topic'])
+    return done
+
+
+class PackWriter:
+    """Append-only JSONL checkpoint; every record is flushed and fsynced before the next topic counts as done."""
+
+    def __init__(self, path: str):
+        needs_newline = os.path.exists(path) and os.path.getsize(path) > 0
+        if needs_newline:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self._file = open(path, "a", encoding="utf-8")
+        if needs_newline:
+            # Terminate a record truncated by a crash so it stays a single bad line
+            self._file.write("\n")
+        self._lock = threading.Lock()
+
+    def write(self, record: dict) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-build course packs for a catalog of topics.")
+    parser.add_argument("topics", help="text file with one topic per line")
+    parser.add_argument("--out", default="course_packs.jsonl", help="JSONL output / checkpoint file")
+    parser.add_argument("--workers", type=int, default=2, help="topics processed in parallel")
+    parser.add_argument("--agent-concurrency", type=int, default=4, help="agents run in parallel per topic")
+    parser.add_argument("--topics-per-minute", type=float, default=10, help="rate limit on topic starts")
+    parser.add_argument("--timeout", type=float, default=300, help="per-agent timeout in seconds")
+    parser.add_argument("--model", default=DEFAULT_MODEL_ID, help="model for the agents (a 'batch' route in MODEL_ROUTES can override it per agent)")
+    parser.add_argument("--temperature", type=float, default=0.1)
+    parser.add_argument("--learning-style", default="Reading/Writing")
+    parser.add_argument("--progress", type=int, default=0)
+    parser.add_argument("--force-refresh", action="store_true", help="ignore the response cache")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    openai_api_key = os.getenv('OPENAI_API_KEY', '')
+    serpapi_api_key = os.getenv('SERP_API_KEY', '')
+    if not openai_api_key or not serpapi_api_key:
+        print("OPENAI_API_KEY and SERP_API_KEY must be set.", file=sys.stderr)
+        return 2
+
+    topics = read_topics(args.topics)
+    done = completed_topics(args.out)
+    todo = [t for t in topics if normalize_topic(t) not in done]
+    print(f"{len(topics)} topics, {len(topics) - len(todo)} already done, {len(todo)} to generate")
+
+    limiter = RateLimiter(args.topics_per_minute, burst=args.workers)
+    writer = PackWriter(args.out)
+    # Every run works on its own copy of an agent, so one team serves all workers
+    team = build_team(openai_api_key, serpapi_api_key, args.model, args.temperature)
+
+    async def generate(topic: str) -> dict:
+        await asyncio.to_thread(limiter.acquire, max_wait=float('inf'))
+        started = time.monotonic()
+        results = await arun_teaching_pipeline(
+            team,
+            topic,
+            topic_prompt(topic, args.learning_style, args.progress),
+            args.force_refresh,
+            max_concurrency=args.agent_concurrency,
+            timeout=args.timeout,
+            call_site="batch",
+        )
+        record = {
+            'topic': topic,
+            'normalized_topic': normalize_topic(topic),
+            'status': 'ok' if results and all(r.ok for r in results.values()) else 'error',
+            'model': args.model,
+            'learning_style': args.learning_style,
+            'progress': args.progress,
+            'created_at': time.time(),
+            'elapsed': round(time.monotonic() - started, 2),
+            'outputs': {node: r.response.content for node, r in results.items() if r.ok},
+            'errors': {node: r.error for node, r in results.items() if not r.ok},
+        }
+        await asyncio.to_thread(writer.write, record)
+        return record
+
+    async def run_all() -> int:
+        workers = asyncio.Semaphore(max(1, args.workers))
+        failures = 0
+
+        async def worker(topic: str):
+            async with workers:
+                try:
+                    return topic, await generate(topic), None
+                except Exception as exc:
+                    return topic, None, exc
+
+        for i, finished in enumerate(asyncio.as_completed([worker(topic) for topic in todo]), 1):
+            topic, record, exc = await finished
+            if exc is None:
+                failures += record['status'] != 'ok'
+                print(f"[{i}/{len(todo)}] {topic}: {record['status']} in {record['elapsed']}s")
+            else:
+                failures += 1
+                print(f"[{i}/{len(todo)}] {topic}: failed ({type(exc).__name__}: {exc})", file=sys.stderr)
+        return failures
+
+    try:
+        failures = asyncio.run(run_all())
+    finally:
+        writer.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
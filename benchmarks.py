@@ -0,0 +1,240 @@
+"""Offline benchmarks of the hot paths, compared against a stored baseline.
+
+    python benchmarks.py                       # run, save to .cache/bench_latest.json, compare
+    python benchmarks.py --save-baseline       # run and make this the baseline
+    python benchmarks.py --only chat_prompt --threshold 0.15
+
+Measured:
+- rerun: full-script reruns of App.py and main.py (streamlit.testing
+  AppTest) with the agents on fake_backend, a started session with four
+  large reports and a long chat history, on each of the two tabs;
+- chat_prompt: one chat turn (ConversationMemory.add + build_prompt) with
+  10/100/1000 turns of history;
+- transcript: chat bubble HTML for the visible page and the whole history,
+  cold and from the bubble cache;
+- report: splitting large agent reports into sections, cold and cached.
+
+Each benchmark reports the median and minimum seconds per call over
+several rounds. A benchmark whose median is more than `--threshold` slower
+than the baseline's is flagged and the exit status is 1. Baselines are
+machine-specific: record one per machine (or CI runner) with --save-baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from agno.agent import RunResponse
+
+from chat_memory import ConversationMemory
+from chat_view import CHAT_PAGE_SIZE, message_html, render_transcript
+from fake_backend import FakeBackendConfig, configure
+import report_view
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "bench_baseline.json")
+DEFAULT_OUT = os.path.join(HERE, ".cache", "bench_latest.json")
+DEFAULT_THRESHOLD = 0.25
+HISTORY_SIZES = (10, 100, 1000)
+REPORT_SIZES = (20_000, 100_000)
+
+
+def measure(fn: Callable[[], object], setup: Optional[Callable[[], None]] = None, rounds: int = 15, min_time: float = 0.005) -> dict:
+    """Seconds per call of `fn`: median and minimum over `rounds`, each round looping until `min_time`.
+
+    `setup` runs (untimed) before every call, e.g. to clear a cache for a cold measurement.
+    """
+    fn()
+    per_call = []
+    for _ in range(rounds):
+        calls, elapsed = 0, 0.0
+        while elapsed < min_time or calls == 0:
+            if setup:
+                setup()
+            started = time.perf_counter()
+            fn()
+            elapsed += time.perf_counter() - started
+            calls += 1
+        per_call.append(elapsed / calls)
+    return {'median': statistics.median(per_call), 'min': min(per_call), 'rounds': rounds}
+
+
+def sample_report(chars: int, seed: int = 0) -> str:
+    """Markdown shaped like an agent report: headings, paragraphs, lists, a table and code fences."""
+    parts, section = [f"Report {seed}\n"], 0
+    while sum(len(p) for p in parts) < chars:
+        section += 1
+        parts.append(f"## Section {section}: Core ideas part {section}\n")
+        parts.append(" ".join(f"Sentence {i} explains concept {section}.{i} in plain words." for i in range(12)) + "\n")
+        parts.append("\n".join(f"- Point {i} about topic {section}" for i in range(6)) + "\n")
+        parts.append("| Term | Meaning |\n|---|---|\n" + "\n".join(f"| term{i} | meaning {i} |" for i in range(4)) + "\n")
+        parts.append("```python\n# Not a heading inside a fence\n" + "\n".join(f"x{i} = {i} * 2" for i in range(8)) + "\n```\n")
+    return "\n".join(parts)[:chars]
+
+
+def sample_history(turns: int) -> List[dict]:
+    """`turns` exchanges of a tutoring chat (two messages each)."""
+    history = []
+    for i in range(turns):
+        history.append({'role': 'user', 'content': f"Question {i}: how does step {i} of backpropagation work <b>here</b>?"})
+        history.append({'role': 'ai', 'content': f"Answer {i}: the gradient flows backwards through layer {i}.\n" + "More detail. " * 20})
+    return history
+
+
+class _NullContainer:
+    """Stands in for an st.container: takes the markdown, sends nothing."""
+
+    def markdown(self, body, **kwargs):
+        return None
+
+
+def bench_chat_prompt() -> Dict[str, dict]:
+    results = {}
+    for turns in HISTORY_SIZES:
+        memory = ConversationMemory()
+        for entry in sample_history(turns):
+            memory.add(entry['role'], entry['content'])
+
+        def one_turn():
+            memory.add('user', "And how does that relate to the learning rate?")
+            return memory.build_prompt()
+        results[f"chat_prompt[turns={turns}]"] = measure(one_turn)
+    return results
+
+
+def bench_transcript() -> Dict[str, dict]:
+    results = {}
+    avatars = {'user': "/app/static/user.png", 'ai': "/app/static/ai.png"}
+    container = _NullContainer()
+    for turns in HISTORY_SIZES:
+        history = sample_history(turns)
+        for label, shown in (("page", CHAT_PAGE_SIZE), ("all", len(history))):
+            render = lambda shown=shown: render_transcript(container, history, avatars, shown)
+            results[f"transcript[turns={turns},{label},cold]"] = measure(render, setup=message_html.cache_clear)
+            results[f"transcript[turns={turns},{label},cached]"] = measure(render)
+    return results
+
+
+def bench_report() -> Dict[str, dict]:
+    results = {}
+    for chars in REPORT_SIZES:
+        content = sample_report(chars)
+        render = lambda content=content: report_view.render_report(content)
+        results[f"report[chars={chars},cold]"] = measure(render, setup=report_view._rendered.clear)
+        results[f"report[chars={chars},cached]"] = measure(render)
+    return results
+
+
+def _started_session(app_test, history_turns: int = 100) -> None:
+    """Session state of a learner who already generated reports and chatted for a while."""
+    state = app_test.session_state
+    state['user_id'] = "benchmark-user"
+    state['started'] = True
+    state['saved_topic'] = "Machine Learning"
+    for index, key in enumerate(['professor_response', 'academic_advisor_response', 'research_librarian_response', 'teaching_assistant_response']):
+        state[key] = RunResponse(content=sample_report(20_000, seed=index))
+    state['chat_history'] = sample_history(history_turns)
+
+
+def bench_rerun(scripts=("App.py", "main.py"), rounds: int = 5) -> Dict[str, dict]:
+    from streamlit.testing.v1 import AppTest
+    results = {}
+    for script in scripts:
+        for tab in ("Learning Team", "AI Support Assistant Chatbot"):
+            app_test = AppTest.from_file(os.path.join(HERE, script), default_timeout=120)
+            _started_session(app_test)
+            app_test.session_state['main_tab'] = tab
+            app_test.run()
+            if app_test.exception:
+                raise RuntimeError(f"{script} failed: {app_test.exception[0].value}")
+            label = "chat" if tab.startswith("AI") else "learning"
+            results[f"rerun[{script},{label}]"] = measure(app_test.run, rounds=rounds, min_time=0.0)
+    return results
+
+
+BENCHMARKS = {
+    'rerun': bench_rerun,
+    'chat_prompt': bench_chat_prompt,
+    'transcript': bench_transcript,
+    'report': bench_report,
+}
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """One row per benchmark with its change against the baseline median; `regressed` beyond `threshold`."""
+    rows = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        change = result['median'] / before['median'] - 1 if before and before['median'] else None
+        rows.append({'name': name, 'median': result['median'], 'baseline': before['median'] if before else None, 'change': change, 'regressed': change is not None and change > threshold})
+    return rows
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    if seconds >= 0.1:
+        return f"{seconds:.3f}s"
+    if seconds >= 1e-4:
+        return f"{seconds * 1e3:.3f}ms"
+    return f"{seconds * 1e6:.1f}µs"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks and compare them against a baseline.")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="run only these groups (repeatable)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="where to write this run's results")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="flag medians this much slower than the baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args(argv)
+
+    # Agents answer from the offline stand-in; its caches live apart from the real ones
+    configure(FakeBackendConfig(latency_median=0.0, tokens_per_second=0))
+    results = {}
+    for group in args.only or BENCHMARKS:
+        print(f"running {group}...", file=sys.stderr)
+        results.update(BENCHMARKS[group]())
+
+    run = {
+        'created_at': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)['results']
+    rows = compare(results, baseline, args.threshold)
+    print(f"{'benchmark':<48}{'median':>12}{'baseline':>12}{'change':>9}")
+    for row in rows:
+        change = f"{row['change']:+.0%}" if row['change'] is not None else "new"
+        print(f"{row['name']:<48}{_format_seconds(row['median']):>12}{_format_seconds(row['baseline']):>12}{change:>9}{'  REGRESSION' if row['regressed'] else ''}")
+
+    if args.save_baseline:
+        # Keep baseline entries of groups that were not run this time
+        merged = dict(run, results=dict(baseline, **results))
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(merged, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    regressions = [row['name'] for row in rows if row['regressed']]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    if not baseline:
+        print("no baseline yet; record one with --save-baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from instrumentation import track_run
+from model_router import run_routed
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv('CHAT_MEMORY_TOKEN_BUDGET', 2000))
+
+# Summaries run off the script thread so sending a message never waits on them
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when it is installed, ~4 characters per token otherwise."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def make_agent_summarizer(agent) -> Callable[[str, str], str]:
+    """Wrap an agno agent (ideally on a cheap model) as a `summarize(previous, new_turns)` callable."""
+    def summarize(previous_summary: str, new_turns: str) -> str:
+        prompt = (
+            "Update the running summary of a tutoring chat. Keep facts, the learner's goals and open questions; "
+            "drop pleasantries. Answer with the summary only, under 200 words.\n\n"
+            f"Current summary:\n{previous_summary or '(empty)'}\n\nNew turns to fold in:\n{new_turns}"
+        )
+        def attempt(candidate):
+            with track_run("chat_summary", candidate) as tracker:
+                tracker.response = candidate.run(prompt, stream=False)
+            return tracker.response
+        return run_routed(agent, "chat_summary", attempt).content
+    return summarize
+
+
+class ConversationMemory:
+    """Token-budgeted sliding window over the chat with a rolling summary of evicted turns.
+
+    Each message is rendered and token-counted once when it is added, and the
+    window keeps a running total, so building the prompt never rescans the
+    whole history. Turns that fall out of the window are folded into the
+    summary by `summarizer` on a background thread.
+    """
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET, summarizer: Optional[Callable[[str, str], str]] = None):
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.summary = ""
+        self._window = deque()  # (line, tokens)
+        self._window_tokens = 0
+        self._evicted = []
+        self._summarizing = False
+        self._lock = threading.Lock()
+
+    def add(self, role: str, content: str) -> None:
+        line = f"User: {content}" if role == 'user' else f"AI: {content}"
+        tokens = count_tokens(line)
+        with self._lock:
+            self._window.append((line, tokens))
+            self._window_tokens += tokens
+            # Always keep the newest message, even if it alone exceeds the budget
+            while self._window_tokens > self.token_budget and len(self._window) > 1:
+                old_line, old_tokens = self._window.popleft()
+                self._window_tokens -= old_tokens
+                self._evicted.append(old_line)
+        self._schedule_summary()
+
+    def _schedule_summary(self) -> None:
+        with self._lock:
+            if self._summarizing or not self._evicted or self.summarizer is None:
+                return
+            self._summarizing = True
+            batch, self._evicted = self._evicted, []
+            previous = self.summary
+        _summary_executor.submit(self._summarize, previous, batch)
+
+    def _summarize(self, previous: str, batch: list) -> None:
+        try:
+            summary = self.summarizer(previous, "\n".join(batch))
+        except Exception:
+            summary = None
+        with self._lock:
+            if summary:
+                self.summary = summary
+            else:
+                # Keep the turns so the next eviction retries them
+                self._evicted = batch + self._evicted
+            self._summarizing = False
+        if summary:
+            self._schedule_summary()
+
+    def build_prompt(self, instruction: str = "Continue this conversation as a helpful AI assistant.") -> str:
+        with self._lock:
+            lines = [line for line, _ in self._window]
+            summary = self.summary
+        parts = [instruction]
+        if summary:
+            parts.append(f"Summary of the earlier conversation:\n{summary}")
+        parts.append("\n".join(lines) + "\nAI:")
+        return "\n\n".join(parts)
+
+    @property
+    def window_tokens(self) -> int:
+        return self._window_tokens
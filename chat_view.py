@@ -0,0 +1,37 @@
+import html
+from functools import lru_cache
+from typing import Dict, List
+
+# Messages shown on first render and added per "Load earlier messages" click
+CHAT_PAGE_SIZE = 20
+
+
+@lru_cache(maxsize=4096)
+def message_html(role: str, content: str, avatar_src: str) -> str:
+    """HTML of one chat bubble, built once per (role, content, avatar) and reused on every rerun.
+
+    Content is escaped: the bubble shows exactly what was typed or generated.
+    """
+    text = html.escape(content or "").replace("\n", "<br>")
+    avatar = f"<img class='chat-avatar' src='{avatar_src}' alt='{'User' if role == 'user' else 'AI'}'>" if avatar_src else ""
+    if role == 'user':
+        return f"<div class='chat-row user'><div class='chat-bubble-user'>{text}</div>{avatar}</div>"
+    return f"<div class='chat-row ai'>{avatar}<div class='chat-bubble-ai'>{text}</div></div>"
+
+
+def visible_start(history: List[dict], shown: int) -> int:
+    """Index of the first message inside the window of the `shown` most recent ones."""
+    return max(0, len(history) - max(shown, 1))
+
+
+def append_message(container, entry: dict, avatars: Dict[str, str]) -> None:
+    """Render one message as its own element, so a new turn is added without re-sending the others."""
+    container.markdown(message_html(entry['role'], entry['content'], avatars.get(entry['role'], "")), unsafe_allow_html=True)
+
+
+def render_transcript(container, history: List[dict], avatars: Dict[str, str], shown: int = CHAT_PAGE_SIZE) -> int:
+    """Render the `shown` most recent messages into `container`; returns how many earlier ones are hidden."""
+    start = visible_start(history, shown)
+    for entry in history[start:]:
+        append_message(container, entry, avatars)
+    return start
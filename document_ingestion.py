@@ -0,0 +1,133 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+
+from response_cache import ResponseCache, cache_dir
+
+EXTRACT_CACHE_TTL_SECONDS = float(os.getenv('EXTRACT_CACHE_TTL_SECONDS', 30 * 24 * 3600))
+# Pages beyond this are ignored; a thesis-sized PDF is plenty for feedback
+MAX_PDF_PAGES = int(os.getenv('MAX_PDF_PAGES', 300))
+_HASH_BLOCK = 1 << 20
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="extract")
+_extract_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def _get_extract_cache() -> ResponseCache:
+    global _extract_cache
+    with _cache_lock:
+        if _extract_cache is None:
+            _extract_cache = ResponseCache(path=os.path.join(cache_dir(), "documents.sqlite3"), ttl_seconds=EXTRACT_CACHE_TTL_SECONDS, max_entries=200)
+        return _extract_cache
+
+
+def file_digest(fileobj: BinaryIO) -> str:
+    """sha256 of the file, read in 1 MB blocks; the position is reset to the start."""
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: fileobj.read(_HASH_BLOCK), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def iter_pdf_pages(fileobj: BinaryIO, max_pages: int = MAX_PDF_PAGES) -> Iterator[Tuple[int, int, str]]:
+    """Yield (page number, page count, text) one page at a time.
+
+    pypdf parses each page's content lazily from the file object, so only the
+    current page's text is held besides what the caller keeps.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(fileobj)
+    total = min(len(reader.pages), max_pages)
+    for index in range(total):
+        yield index + 1, total, reader.pages[index].extract_text() or ""
+
+
+def decode_text(data: bytes) -> str:
+    """UTF-8/UTF-16 (BOM) first, then charset detection, then latin-1 as a last resort.
+
+    Detection often ranks a Baltic or Central European code page just above
+    Windows-1252 for Western text; cp1252 wins whenever it is about as clean.
+    """
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return data.decode("utf-16")
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        pass
+    try:
+        from charset_normalizer import from_bytes
+
+        matches = from_bytes(data)
+        best = matches.best()
+        if best is not None:
+            preferred = next((m for m in matches if m.encoding == "cp1252" and m.chaos <= best.chaos + 0.1), best)
+            return str(preferred)
+    except ImportError:
+        pass
+    return data.decode("latin-1")
+
+
+@dataclass
+class ExtractionProgress:
+    pages_done: int = 0
+    pages_total: Optional[int] = None
+
+
+def extract_document(fileobj: BinaryIO, filename: str, on_page: Optional[Callable[[int, Optional[int]], None]] = None) -> str:
+    """Text of an uploaded pdf/txt/md file, served from the extraction cache when the file hash matches.
+
+    `on_page(pages_done, pages_total)` is called after each PDF page.
+    Raises ValueError for an unsupported extension or a PDF without a text layer.
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in (".pdf", ".txt", ".md"):
+        raise ValueError(f"Unsupported file type: {extension or filename}")
+    cache = _get_extract_cache()
+    key = f"{extension}:{file_digest(fileobj)}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    if extension == ".pdf":
+        pages = []
+        for page_number, total, page_text in iter_pdf_pages(fileobj):
+            if page_text.strip():
+                pages.append(page_text.strip())
+            if on_page:
+                on_page(page_number, total)
+        text = "\n\n".join(pages)
+        if not text:
+            raise ValueError("This PDF has no extractable text (it may be a scanned image).")
+    else:
+        text = decode_text(fileobj.read())
+    cache.set(key, extension.lstrip("."), text)
+    return text
+
+
+class ExtractionJob:
+    """Extraction running on a worker thread; poll `done()` / `progress` from the script thread."""
+
+    def __init__(self, fileobj: BinaryIO, filename: str):
+        self.filename = filename
+        self.progress = ExtractionProgress()
+        self.future: Future = _executor.submit(extract_document, fileobj, filename, self._on_page)
+
+    def _on_page(self, pages_done: int, pages_total: Optional[int]) -> None:
+        self.progress = ExtractionProgress(pages_done, pages_total)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> str:
+        return self.future.result(timeout)
+
+
+def start_extraction(fileobj: BinaryIO, filename: str) -> ExtractionJob:
+    return ExtractionJob(fileobj, filename)
@@ -0,0 +1,292 @@
+"""Offline stand-in for the OpenAI chat API and SerpAPI, for load tests and demos without keys.
+
+With FAKE_BACKEND set, the shared HTTP pools (http_pool) answer
+`/chat/completions` locally instead of calling OpenAI, and the teams search
+with `search_cache.FakeSerpApiTools`. Everything above the transport (the
+OpenAI SDK, agno, retries, routing, caches, instrumentation) runs for real.
+
+FAKE_BACKEND is "1" for the defaults, or inline JSON / the path of a JSON
+file overriding FakeBackendConfig fields, e.g.
+
+    {"latency_median": 0.8, "error_rate": 0.05, "models": {"gpt-4o": {"tokens_per_second": 30}}}
+"""
+import asyncio
+import dataclasses
+import itertools
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+# z-score of the 95th percentile, to turn (median, p95) into a log-normal sigma
+_Z95 = 1.6449
+
+
+@dataclass
+class FakeBackendConfig:
+    # Time to first token (seconds): log-normal with this median and 95th percentile
+    latency_median: float = 0.4
+    latency_p95: float = 1.5
+    # Generation speed after the first token, and answer length (±25%)
+    tokens_per_second: float = 60.0
+    output_tokens: int = 350
+    # Tokens per streamed SSE chunk
+    chunk_tokens: int = 4
+    # Share of requests answered with one of `error_statuses` instead of a completion
+    error_rate: float = 0.0
+    error_statuses: Tuple[int, ...] = (429, 500, 503)
+    # Share of streams that break off after the first chunk
+    stream_drop_rate: float = 0.0
+    # Share of first turns with tools offered that call a tool (the search agents)
+    tool_call_rate: float = 1.0
+    search_latency_median: float = 0.3
+    search_latency_p95: float = 1.0
+    search_error_rate: float = 0.0
+    seed: Optional[int] = None
+    # model id -> overrides of the fields above, e.g. a slower gpt-4o
+    models: Dict[str, dict] = field(default_factory=dict)
+
+    def for_model(self, model: Optional[str]) -> "FakeBackendConfig":
+        overrides = self.models.get(model or '')
+        return dataclasses.replace(self, **overrides) if overrides else self
+
+
+def load_config(spec: str = '') -> Optional[FakeBackendConfig]:
+    """None when `spec` is empty/false, defaults for "1"/"true", else inline JSON or a JSON file path."""
+    spec = (spec or '').strip()
+    if spec.lower() in ('', '0', 'false', 'no', 'off'):
+        return None
+    if spec.lower() in ('1', 'true', 'yes', 'on'):
+        return FakeBackendConfig()
+    if not spec.startswith("{"):
+        with open(spec, encoding="utf-8") as f:
+            spec = f.read()
+    raw = json.loads(spec)
+    if 'error_statuses' in raw:
+        raw['error_statuses'] = tuple(raw['error_statuses'])
+    return FakeBackendConfig(**raw)
+
+
+_config: Optional[FakeBackendConfig] = load_config(os.getenv('FAKE_BACKEND', ''))
+_rng = random.Random(_config.seed if _config else None)
+_ids = itertools.count(1)
+_lock = threading.Lock()
+
+
+def configure(config: Optional[FakeBackendConfig]) -> None:
+    """Switch the stand-in on (or off with None) for HTTP pools and search tools created from now on."""
+    global _config
+    with _lock:
+        _config = config
+        if config is not None and config.seed is not None:
+            _rng.seed(config.seed)
+
+
+def fake_backend_config() -> Optional[FakeBackendConfig]:
+    """The active config, or None when the real services are used."""
+    return _config
+
+
+def sample_latency(median: float, p95: float) -> float:
+    """Log-normal draw with the given median and 95th percentile."""
+    if median <= 0:
+        return 0.0
+    if p95 <= median:
+        return median
+    sigma = math.log(p95 / median) / _Z95
+    with _lock:
+        return _rng.lognormvariate(math.log(median), sigma)
+
+
+def chance(rate: float) -> bool:
+    with _lock:
+        return _rng.random() < rate
+
+
+def _answer_length(config: FakeBackendConfig) -> int:
+    with _lock:
+        return max(1, int(config.output_tokens * _rng.uniform(0.75, 1.25)))
+
+
+def _last_user_text(messages: List[dict]) -> str:
+    for message in reversed(messages):
+        if message.get('role') == 'user':
+            content = message.get('content')
+            if isinstance(content, list):
+                content = " ".join(part.get('text', '') for part in content if isinstance(part, dict))
+            return content or ''
+    return ''
+
+
+def fake_answer(prompt: str, tokens: int) -> List[str]:
+    """A markdown report of about `tokens` words built from the prompt's words, split into tokens."""
+    words = re.findall(r"[A-Za-z][A-Za-z0-9-]+", prompt)[:12] or ["topic"]
+    out: List[str] = []
+    section = 0
+    while len(out) < tokens:
+        section += 1
+        out.extend(["\n\n##", "Part", f"{section}:", words[section % len(words)].capitalize(), "\n\n"])
+        for i in range(40):
+            out.append(words[(section + i) % len(words)] + ("." if i % 10 == 9 else ""))
+    return [token if token.startswith("\n") else token + " " for token in out[:tokens]]
+
+
+class _FakeChat:
+    """Builds one /chat/completions answer; the transports only differ in how they sleep."""
+
+    def __init__(self, request: httpx.Request, config: FakeBackendConfig):
+        body = json.loads(request.content or b"{}")
+        self.model = body.get('model') or 'fake'
+        self.config = config.for_model(self.model)
+        self.stream = bool(body.get('stream'))
+        self.id = f"chatcmpl-fake-{next(_ids)}"
+        self.created = int(time.time())
+        messages = body.get('messages') or []
+        self.prompt_tokens = max(1, len(json.dumps(messages)) // 4)
+        self.first_token_delay = sample_latency(self.config.latency_median, self.config.latency_p95)
+        self.error_status = None
+        if chance(self.config.error_rate) and self.config.error_statuses:
+            with _lock:
+                self.error_status = _rng.choice(self.config.error_statuses)
+        self.tool_call = None
+        tools = body.get('tools') or []
+        if tools and not any(m.get('role') == 'tool' for m in messages) and chance(self.config.tool_call_rate):
+            names = [t.get('function', {}).get('name') for t in tools]
+            name = 'search_google' if 'search_google' in names else names[0]
+            query = " ".join(re.findall(r"[A-Za-z0-9+#-]+", _last_user_text(messages))[:8])
+            self.tool_call = {'id': f"call_fake_{next(_ids)}", 'type': 'function', 'function': {'name': name, 'arguments': json.dumps({'query': query})}}
+            self.tokens = [json.dumps({'query': query})]
+        else:
+            self.tokens = fake_answer(_last_user_text(messages), _answer_length(self.config))
+        self.drop = self.stream and chance(self.config.stream_drop_rate)
+
+    def error_response(self) -> httpx.Response:
+        headers = {'retry-after-ms': "200"} if self.error_status == 429 else {}
+        body = {'error': {'message': f"Injected fault ({self.error_status}) from the fake backend", 'type': 'fake_error', 'code': None}}
+        return httpx.Response(self.error_status, json=body, headers=headers)
+
+    def usage(self) -> dict:
+        completion = len(self.tokens)
+        return {'prompt_tokens': self.prompt_tokens, 'completion_tokens': completion, 'total_tokens': self.prompt_tokens + completion}
+
+    def completion(self) -> dict:
+        if self.tool_call:
+            message = {'role': 'assistant', 'content': None, 'tool_calls': [self.tool_call]}
+        else:
+            message = {'role': 'assistant', 'content': "".join(self.tokens).strip()}
+        return {
+            'id': self.id, 'object': 'chat.completion', 'created': self.created, 'model': self.model,
+            'choices': [{'index': 0, 'message': message, 'finish_reason': 'tool_calls' if self.tool_call else 'stop'}],
+            'usage': self.usage(),
+        }
+
+    def generation_seconds(self, tokens: int) -> float:
+        return tokens / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0.0
+
+    def _chunk(self, delta: dict, finish_reason: Optional[str] = None, usage: Optional[dict] = None) -> bytes:
+        payload = {
+            'id': self.id, 'object': 'chat.completion.chunk', 'created': self.created, 'model': self.model,
+            'choices': [] if usage else [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+        }
+        if usage:
+            payload['usage'] = usage
+        return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+    def events(self) -> Iterator[Tuple[float, bytes]]:
+        """(seconds to wait, SSE bytes) pairs; raises httpx.ReadError where a dropped stream breaks off."""
+        if self.tool_call:
+            delta = {'role': 'assistant', 'tool_calls': [dict(self.tool_call, index=0)]}
+            yield 0.0, self._chunk(delta)
+            yield 0.0, self._chunk({}, 'tool_calls')
+        else:
+            size = max(1, self.config.chunk_tokens)
+            for start in range(0, len(self.tokens), size):
+                part = self.tokens[start:start + size]
+                delta = {'content': "".join(part)}
+                if start == 0:
+                    delta['role'] = 'assistant'
+                yield (0.0 if start == 0 else self.generation_seconds(len(part))), self._chunk(delta)
+                if self.drop:
+                    raise httpx.ReadError("Injected stream drop from the fake backend")
+            yield 0.0, self._chunk({}, 'stop')
+        yield 0.0, self._chunk({}, usage=self.usage())
+        yield 0.0, b"data: [DONE]\n\n"
+
+
+_SSE_HEADERS = {'content-type': 'text/event-stream'}
+
+
+def _not_found(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(404, json={'error': {'message': f"The fake backend does not serve {request.url.path}", 'type': 'invalid_request_error'}})
+
+
+class FakeOpenAITransport(httpx.BaseTransport):
+    """Answers OpenAI chat completions locally with the configured latency, token rate and faults."""
+
+    def __init__(self, config: Optional[FakeBackendConfig] = None):
+        self.config = config or FakeBackendConfig()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/chat/completions"):
+            return _not_found(request)
+        chat = _FakeChat(request, self.config)
+        time.sleep(chat.first_token_delay)
+        if chat.error_status:
+            return chat.error_response()
+        if not chat.stream:
+            time.sleep(chat.generation_seconds(len(chat.tokens)))
+            return httpx.Response(200, json=chat.completion())
+
+        def body() -> Iterator[bytes]:
+            for delay, data in chat.events():
+                if delay:
+                    time.sleep(delay)
+                yield data
+        return httpx.Response(200, headers=_SSE_HEADERS, content=body())
+
+
+class AsyncFakeOpenAITransport(httpx.AsyncBaseTransport):
+    """Async FakeOpenAITransport; the latency is awaited, so one loop can hold many fake requests."""
+
+    def __init__(self, config: Optional[FakeBackendConfig] = None):
+        self.config = config or FakeBackendConfig()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/chat/completions"):
+            return _not_found(request)
+        chat = _FakeChat(request, self.config)
+        await asyncio.sleep(chat.first_token_delay)
+        if chat.error_status:
+            return chat.error_response()
+        if not chat.stream:
+            await asyncio.sleep(chat.generation_seconds(len(chat.tokens)))
+            return httpx.Response(200, json=chat.completion())
+
+        async def body() -> AsyncIterator[bytes]:
+            for delay, data in chat.events():
+                if delay:
+                    await asyncio.sleep(delay)
+                yield data
+        return httpx.Response(200, headers=_SSE_HEADERS, content=body())
+
+
+def fake_search_results(query: str, num_results: int = 10) -> str:
+    """SerpAPI-shaped JSON for `query`, as CachedSerpApiTools would get it from the network."""
+    slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-") or "query"
+    results = [
+        {
+            'position': i + 1,
+            'title': f"{query} — resource {i + 1}",
+            'link': f"https://example.com/{slug}/{i + 1}",
+            'snippet': f"An offline stand-in result about {query}.",
+        }
+        for i in range(num_results)
+    ]
+    return json.dumps({'search_results': results, 'recipes_results': [], 'shopping_results': [], 'knowledge_graph': {}, 'related_questions': []})
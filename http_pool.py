@@ -0,0 +1,148 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+from fake_backend import AsyncFakeOpenAITransport, FakeOpenAITransport, fake_backend_config
+
+# Responses worth retrying: rate limits and transient server errors
+RETRY_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 4))
+# Full-jitter exponential backoff: sleep uniform(0, min(cap, base * 2**attempt)) seconds
+HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', 0.5))
+HTTP_BACKOFF_CAP = float(os.getenv('HTTP_BACKOFF_CAP', 20.0))
+
+POOL_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=30.0)
+POOL_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Seconds to wait before retry number `attempt + 1`; a server's Retry-After wins when it is longer."""
+    delay = random.uniform(0, min(HTTP_BACKOFF_CAP, HTTP_BACKOFF_BASE * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, HTTP_BACKOFF_CAP))
+    return delay
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse `retry-after-ms` (OpenAI) or `Retry-After` (seconds or an HTTP date)."""
+    value = response.headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = response.headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _should_retry(response: httpx.Response, attempt: int, max_retries: int) -> bool:
+    return response.status_code in RETRY_STATUS and attempt < max_retries
+
+
+class RetryTransport(httpx.BaseTransport):
+    """Retry 429/5xx responses and failed connects with jittered backoff.
+
+    Only connect errors are retried among exceptions: once a request has been
+    sent, a dropped connection may still have started a (billed) completion.
+    """
+
+    def __init__(self, transport: Optional[httpx.BaseTransport] = None, max_retries: int = HTTP_MAX_RETRIES):
+        self._transport = transport or httpx.HTTPTransport(limits=POOL_LIMITS)
+        self.max_retries = max_retries
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = self._transport.handle_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(backoff_delay(attempt))
+            else:
+                if not _should_retry(response, attempt, self.max_retries):
+                    return response
+                delay = backoff_delay(attempt, retry_after_seconds(response))
+                response.close()
+                time.sleep(delay)
+            attempt += 1
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncRetryTransport(httpx.AsyncBaseTransport):
+    """Async RetryTransport; cancelling the calling task also cancels a pending backoff sleep."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None, max_retries: int = HTTP_MAX_RETRIES):
+        self._transport = transport or httpx.AsyncHTTPTransport(limits=POOL_LIMITS)
+        self.max_retries = max_retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self._transport.handle_async_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+            else:
+                if not _should_retry(response, attempt, self.max_retries):
+                    return response
+                delay = backoff_delay(attempt, retry_after_seconds(response))
+                await response.aclose()
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+_client: Optional[httpx.Client] = None
+# httpx async pools are bound to the event loop that opened them: one client per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def shared_http_client() -> httpx.Client:
+    """Process-wide keep-alive pool for synchronous model calls.
+
+    API keys travel in request headers, so one pool serves every user's agents.
+    With FAKE_BACKEND set, requests are answered by the offline stand-in
+    (behind the same retry layer).
+    """
+    global _client
+    config = fake_backend_config()
+    with _lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(transport=RetryTransport(FakeOpenAITransport(config) if config else None), timeout=POOL_TIMEOUT)
+        return _client
+
+
+def shared_async_client() -> httpx.AsyncClient:
+    """Keep-alive pool for async model calls on the running event loop."""
+    loop = asyncio.get_running_loop()
+    config = fake_backend_config()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(transport=AsyncRetryTransport(AsyncFakeOpenAITransport(config) if config else None), timeout=POOL_TIMEOUT)
+            _async_clients[loop] = client
+        return client
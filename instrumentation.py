@@ -0,0 +1,212 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+# USD per 1M tokens (input, output); unknown models are costed at zero
+MODEL_PRICES: Dict[str, tuple] = {
+    'gpt-3.5-turbo': (0.50, 1.50),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4.1-mini': (0.40, 1.60),
+    'gpt-4.1': (2.00, 8.00),
+}
+
+# Set METRICS_LOG_PATH to append every run as a JSON line
+METRICS_LOG_PATH = os.getenv('METRICS_LOG_PATH', '')
+MAX_RECENT_RUNS = 1000
+# Summed per route over the life of the process (Prometheus counters)
+TOTAL_FIELDS = ('input_tokens', 'output_tokens', 'tool_calls', 'tool_seconds', 'cost_usd', 'wall_time')
+
+
+@dataclass
+class RunMetrics:
+    call_site: str
+    agent: str
+    model: Optional[str] = None
+    wall_time: float = 0.0
+    time_to_first_token: Optional[float] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    tool_calls: int = 0
+    tool_seconds: float = 0.0
+    cost_usd: float = 0.0
+    cached: bool = False
+    # Shared another session's identical in-flight run (single_flight); no tokens of its own
+    coalesced: bool = False
+    error: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+def estimate_cost(model: Optional[str], input_tokens: int, output_tokens: int) -> float:
+    prices = MODEL_PRICES.get(model or '')
+    if prices is None:
+        # Dated snapshots such as gpt-4o-mini-2024-07-18 use the base model's price
+        prices = next((p for name, p in sorted(MODEL_PRICES.items(), key=lambda kv: -len(kv[0])) if (model or '').startswith(name)), (0.0, 0.0))
+    return (input_tokens * prices[0] + output_tokens * prices[1]) / 1_000_000
+
+
+class MetricsRegistry:
+    """Process-wide store of recent agent runs with Prometheus and JSON-lines export.
+
+    `recent` is bounded; the Prometheus counters come from `totals`, which
+    only ever grow, so they never appear to reset when old runs are dropped.
+    """
+
+    def __init__(self, log_path: str = METRICS_LOG_PATH, max_recent: int = MAX_RECENT_RUNS):
+        self.recent = deque(maxlen=max_recent)
+        # (call site, agent, model) -> cumulative counts and sums
+        self.totals: Dict[tuple, dict] = {}
+        self.log_path = log_path
+        self._lock = threading.Lock()
+
+    def record(self, metrics: RunMetrics) -> None:
+        with self._lock:
+            self.recent.append(metrics)
+            totals = self.totals.setdefault(
+                (metrics.call_site, metrics.agent, metrics.model),
+                dict.fromkeys(('runs', 'errors', 'cached', 'coalesced') + TOTAL_FIELDS, 0),
+            )
+            totals['runs'] += 1
+            totals['errors'] += metrics.error is not None
+            totals['cached'] += metrics.cached
+            totals['coalesced'] += metrics.coalesced
+            for name in TOTAL_FIELDS:
+                totals[name] += getattr(metrics, name)
+            if self.log_path:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(asdict(metrics)) + "\n")
+
+    def runs(self) -> List[RunMetrics]:
+        with self._lock:
+            return list(self.recent)
+
+    def summary(self) -> List[dict]:
+        """One row per route (call site, agent, model) with counts, averages and totals."""
+        rows: Dict[tuple, dict] = {}
+        for m in self.runs():
+            row = rows.setdefault((m.call_site, m.agent, m.model), {
+                'call_site': m.call_site, 'agent': m.agent, 'model': m.model, 'runs': 0, 'errors': 0, 'cached': 0, 'coalesced': 0,
+                'wall_time': 0.0, 'ttft': [], 'input_tokens': 0, 'output_tokens': 0,
+                'tool_calls': 0, 'tool_seconds': 0.0, 'cost_usd': 0.0,
+            })
+            row['runs'] += 1
+            row['errors'] += m.error is not None
+            row['cached'] += m.cached
+            row['coalesced'] += m.coalesced
+            row['wall_time'] += m.wall_time
+            if m.time_to_first_token is not None:
+                row['ttft'].append(m.time_to_first_token)
+            for name in ('input_tokens', 'output_tokens', 'tool_calls', 'tool_seconds', 'cost_usd'):
+                row[name] += getattr(m, name)
+        result = []
+        for row in rows.values():
+            ttft = row.pop('ttft')
+            row['avg_wall_time'] = round(row.pop('wall_time') / row['runs'], 3)
+            row['avg_ttft'] = round(sum(ttft) / len(ttft), 3) if ttft else None
+            row['tool_seconds'] = round(row['tool_seconds'], 3)
+            row['cost_usd'] = round(row['cost_usd'], 6)
+            result.append(row)
+        return result
+
+    def prometheus_text(self) -> str:
+        """Cumulative counters per route in the Prometheus text exposition format."""
+        lines = []
+        metrics = [
+            ('teaching_agent_runs_total', 'counter', 'Agent runs', 'runs'),
+            ('teaching_agent_errors_total', 'counter', 'Failed agent runs', 'errors'),
+            ('teaching_agent_cache_hits_total', 'counter', 'Runs served from the response cache', 'cached'),
+            ('teaching_agent_coalesced_total', 'counter', 'Runs that shared an identical in-flight run', 'coalesced'),
+            ('teaching_agent_input_tokens_total', 'counter', 'Prompt tokens', 'input_tokens'),
+            ('teaching_agent_output_tokens_total', 'counter', 'Completion tokens', 'output_tokens'),
+            ('teaching_agent_tool_calls_total', 'counter', 'Tool calls', 'tool_calls'),
+            ('teaching_agent_tool_seconds_total', 'counter', 'Seconds spent in tool calls', 'tool_seconds'),
+            ('teaching_agent_cost_usd_total', 'counter', 'Estimated cost in USD', 'cost_usd'),
+            ('teaching_agent_wall_seconds_avg', 'gauge', 'Average wall time per run', 'avg_wall_time'),
+        ]
+        with self._lock:
+            rows = [dict(totals, call_site=call_site, agent=agent, model=model) for (call_site, agent, model), totals in self.totals.items()]
+        for row in rows:
+            row['avg_wall_time'] = round(row['wall_time'] / row['runs'], 3)
+            row['tool_seconds'] = round(row['tool_seconds'], 3)
+            row['cost_usd'] = round(row['cost_usd'], 6)
+        for name, kind, help_text, key in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for row in rows:
+                labels = f'call_site="{row["call_site"]}",agent="{row["agent"]}",model="{row["model"] or ""}"'
+                lines.append(f"{name}{{{labels}}} {row[key]}")
+        return "\n".join(lines) + "\n"
+
+    def jsonl(self) -> str:
+        return "".join(json.dumps(asdict(m)) + "\n" for m in self.runs())
+
+
+metrics_registry = MetricsRegistry()
+
+
+class RunTracker:
+    """Collects timings for one agent call; see `track_run`."""
+
+    def __init__(self, call_site: str, agent: Any, cached: bool = False, coalesced: bool = False):
+        self.call_site = call_site
+        self.agent = agent
+        self.cached = cached
+        self.coalesced = coalesced
+        self.response = None
+        self.error: Optional[str] = None
+        self.started = time.monotonic()
+        self.first_token: Optional[float] = None
+
+    def wrap_on_chunk(self, on_chunk: Callable[[str], None]) -> Callable[[str], None]:
+        """Stamp the time of the first streamed chunk, then pass chunks through."""
+        def _on_chunk(chunk: str) -> None:
+            if self.first_token is None:
+                self.first_token = time.monotonic()
+            on_chunk(chunk)
+        return _on_chunk
+
+    def build(self) -> RunMetrics:
+        wall_time = time.monotonic() - self.started
+        model = getattr(getattr(self.agent, 'model', None), 'id', None)
+        metrics = RunMetrics(
+            call_site=self.call_site,
+            agent=getattr(self.agent, 'name', None) or str(self.agent),
+            model=model,
+            wall_time=round(wall_time, 3),
+            time_to_first_token=round(self.first_token - self.started, 3) if self.first_token else None,
+            cached=self.cached,
+            coalesced=self.coalesced,
+            error=self.error,
+        )
+        run_metrics = getattr(self.response, 'metrics', None) or {}
+        metrics.input_tokens = int(sum(run_metrics.get('input_tokens', []) or []))
+        metrics.output_tokens = int(sum(run_metrics.get('output_tokens', []) or []))
+        if metrics.time_to_first_token is None and run_metrics.get('time_to_first_token'):
+            metrics.time_to_first_token = round(run_metrics['time_to_first_token'][0], 3)
+        tools = getattr(self.response, 'tools', None) or []
+        metrics.tool_calls = len(tools)
+        metrics.tool_seconds = round(sum((getattr(t.metrics, 'time', None) or 0.0) for t in tools if getattr(t, 'metrics', None)), 3)
+        metrics.cost_usd = estimate_cost(model, metrics.input_tokens, metrics.output_tokens)
+        return metrics
+
+
+@contextmanager
+def track_run(call_site: str, agent: Any, cached: bool = False, registry: Optional[MetricsRegistry] = None, coalesced: bool = False):
+    """Record wall time, TTFT, tokens, tool calls and cost of the agent call inside the block.
+
+    Set `tracker.response` to the RunResponse before leaving the block;
+    exceptions are recorded as errors and re-raised.
+    """
+    tracker = RunTracker(call_site, agent, cached, coalesced)
+    try:
+        yield tracker
+    except Exception as exc:
+        tracker.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        (registry or metrics_registry).record(tracker.build())
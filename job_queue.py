@@ -0,0 +1,289 @@
+"""Background generation jobs for the Start flow.
+
+Start enqueues a job and returns right away. A bounded pool of workers runs
+the four-agent pipeline on the shared background loop (async_core), so
+reruns, tab switches and page refreshes no longer interrupt it. The queue,
+per-agent progress and finished reports are persisted in SQLite; pages poll
+their session's job and take the reports from it.
+
+Jobs are keyed by the normalized topic and prompt: learners starting the
+same topic share one run, and every session that asked for it is
+subscribed. A forced refresh of a topic that is already queued or running
+is run again, without the caches, once that run finishes. API keys are
+never stored, so jobs cut short by a restart are
+marked 'interrupted' and resumed when a subscribed session comes back with
+its team (agents that had already finished are answered by the response
+cache).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Optional
+
+from agent_orchestrator import AgentResult, DEFAULT_MAX_CONCURRENCY, DEFAULT_AGENT_TIMEOUT
+from async_core import submit
+from pipeline import TEACHING_PIPELINE, arun_teaching_pipeline
+from response_cache import cache_dir, normalize_topic
+from search_cache import SearchStats
+from streaming import StreamBuffer
+
+# Jobs running at the same time; the rest wait in the queue
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+# A finished job is handed to new subscribers for this long instead of running again
+JOB_REUSE_SECONDS = float(os.getenv('JOB_REUSE_SECONDS', 600))
+# Finished jobs are deleted after this long
+JOB_RETENTION_SECONDS = float(os.getenv('JOB_RETENTION_SECONDS', 7 * 24 * 3600))
+
+QUEUED, RUNNING, DONE, FAILED, INTERRUPTED = "queued", "running", "done", "failed", "interrupted"
+ACTIVE = (QUEUED, RUNNING)
+
+
+@dataclass
+class Job:
+    """Snapshot of one job; `streams` holds the partial text of agents still writing."""
+    id: str
+    topic: str
+    status: str
+    results: Dict[str, str] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    elapsed: Dict[str, float] = field(default_factory=dict)
+    streams: Dict[str, str] = field(default_factory=dict)
+    created_at: float = 0.0
+    finished_at: Optional[float] = None
+    # Jobs queued before this one
+    position: int = 0
+    # Web searches made by the run, once it is finished
+    search_stats: Optional[SearchStats] = None
+    # A forced refresh was asked for while this run was active; it reruns when this one ends
+    refresh_queued: bool = False
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+
+def job_key(topic: str, prompt: str) -> str:
+    """Jobs for the same normalized topic and prompt parameters share one id."""
+    normalized = normalize_topic(topic)
+    raw = f"{normalized}\x1f{prompt.replace(topic, normalized) if topic else prompt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class JobQueue:
+    """Persistent FIFO of Start-flow jobs with an in-process worker pool and cross-session deduplication."""
+
+    def __init__(self, path: Optional[str] = None, workers: int = JOB_WORKERS, reuse_seconds: float = JOB_REUSE_SECONDS):
+        self.path = path or os.path.join(cache_dir(), "jobs.sqlite3")
+        self.workers = max(1, workers)
+        self.reuse_seconds = reuse_seconds
+        self.submitted = 0
+        self.deduplicated = 0
+        # job id -> (team, force_refresh); kept in memory only, the team holds API keys
+        self._runners: Dict[str, tuple] = {}
+        # job id -> team of a forced refresh waiting for the active run to finish
+        self._reruns: Dict[str, dict] = {}
+        self._streams: Dict[str, Dict[str, StreamBuffer]] = {}
+        self._queue: deque = deque()
+        self._running: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY, topic TEXT, prompt TEXT, status TEXT, max_concurrency INTEGER, timeout REAL,"
+            " results TEXT, errors TEXT, elapsed TEXT, created_at REAL, finished_at REAL, search_stats TEXT)"
+        )
+        if "search_stats" not in [column[1] for column in self._conn.execute("PRAGMA table_info(jobs)")]:
+            # Queues created before the column existed
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN search_stats TEXT")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS subscriptions ("
+            " session_id TEXT, job_id TEXT, created_at REAL, collected INTEGER DEFAULT 0,"
+            " PRIMARY KEY (session_id, job_id))"
+        )
+        with self._conn:
+            # Whatever was queued or running belonged to a process that is gone
+            self._conn.execute("UPDATE jobs SET status = ? WHERE status IN (?, ?)", (INTERRUPTED,) + ACTIVE)
+            cutoff = time.time() - JOB_RETENTION_SECONDS
+            self._conn.execute("DELETE FROM subscriptions WHERE job_id IN (SELECT job_id FROM jobs WHERE created_at < ? AND status NOT IN (?, ?))", (cutoff,) + ACTIVE)
+            self._conn.execute("DELETE FROM jobs WHERE created_at < ? AND status NOT IN (?, ?)", (cutoff,) + ACTIVE)
+
+    def submit(
+        self,
+        session_id: str,
+        topic: str,
+        prompt: str,
+        team: dict,
+        force_refresh: bool = False,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        timeout: Optional[float] = DEFAULT_AGENT_TIMEOUT,
+    ) -> Job:
+        """Subscribe `session_id` to the job for this topic and prompt, enqueueing it unless it is queued, running or fresh.
+
+        With `force_refresh` a queued or running job is rerun without the
+        caches as soon as it finishes (see `Job.refresh_queued`).
+        """
+        job_id = job_key(topic, prompt)
+        now = time.time()
+        with self._lock:
+            self.submitted += 1
+            row = self._conn.execute("SELECT status, finished_at FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            reusable = row is not None and (row[0] in ACTIVE or (row[0] == DONE and not force_refresh and now - (row[1] or 0) < self.reuse_seconds))
+            with self._conn:
+                if reusable:
+                    self.deduplicated += 1
+                    if force_refresh and row[0] in ACTIVE:
+                        self._reruns[job_id] = team
+                else:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO jobs (job_id, topic, prompt, status, max_concurrency, timeout, results, errors, elapsed, created_at, finished_at, search_stats)"
+                        " VALUES (?, ?, ?, ?, ?, ?, '{}', '{}', '{}', ?, NULL, NULL)",
+                        (job_id, topic, prompt, QUEUED, max_concurrency, timeout, now),
+                    )
+                    self._runners[job_id] = (team, force_refresh or self._reruns.pop(job_id, None) is not None)
+                    self._queue.append(job_id)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO subscriptions (session_id, job_id, created_at, collected) VALUES (?, ?, ?, 0)",
+                    (session_id, job_id, now),
+                )
+        self._pump()
+        return self.get(job_id)
+
+    def resume(self, job_id: str, team: dict) -> None:
+        """Requeue an interrupted job with a subscriber's team."""
+        with self._lock:
+            with self._conn:
+                updated = self._conn.execute("UPDATE jobs SET status = ? WHERE job_id = ? AND status = ?", (QUEUED, job_id, INTERRUPTED)).rowcount
+            if updated:
+                rerun = self._reruns.pop(job_id, None)
+                self._runners[job_id] = (rerun or team, rerun is not None)
+                self._queue.append(job_id)
+        self._pump()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT topic, status, results, errors, elapsed, created_at, finished_at, search_stats FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            streams = {node: buffer.text() for node, buffer in self._streams.get(job_id, {}).items()}
+            position = list(self._queue).index(job_id) if job_id in self._queue else 0
+            refresh_queued = job_id in self._reruns
+        topic, status, results, errors, elapsed, created_at, finished_at, search_stats = row
+        return Job(
+            job_id, topic, status, json.loads(results), json.loads(errors), json.loads(elapsed), streams, created_at, finished_at, position,
+            SearchStats(**json.loads(search_stats)) if search_stats else None, refresh_queued,
+        )
+
+    def active_job(self, session_id: str) -> Optional[Job]:
+        """The session's most recent job whose results it has not collected yet."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id FROM subscriptions WHERE session_id = ? AND collected = 0 ORDER BY created_at DESC LIMIT 1", (session_id,)
+            ).fetchone()
+        return self.get(row[0]) if row else None
+
+    def collect(self, session_id: str, job_id: str) -> None:
+        """The session has taken the job's reports; it is no longer its active job."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("UPDATE subscriptions SET collected = 1 WHERE session_id = ? AND job_id = ?", (session_id, job_id))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'queued': len(self._queue), 'running': len(self._running), 'submitted': self.submitted, 'deduplicated': self.deduplicated}
+
+    def _pump(self) -> None:
+        """Start queued jobs while workers are free."""
+        with self._lock:
+            while self._queue and len(self._running) < self.workers:
+                job_id = self._queue.popleft()
+                team, force_refresh = self._runners.pop(job_id)
+                topic, prompt, max_concurrency, timeout = self._conn.execute(
+                    "SELECT topic, prompt, max_concurrency, timeout FROM jobs WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                with self._conn:
+                    self._conn.execute("UPDATE jobs SET status = ? WHERE job_id = ?", (RUNNING, job_id))
+                self._streams[job_id] = {node: StreamBuffer() for node in TEACHING_PIPELINE}
+                future = submit(self._run(job_id, team, topic, prompt, force_refresh, max_concurrency, timeout))
+                self._running[job_id] = future
+                future.add_done_callback(lambda f, job_id=job_id: self._finished(job_id, f))
+
+    async def _run(self, job_id: str, team: dict, topic: str, prompt: str, force_refresh: bool, max_concurrency: int, timeout: Optional[float]):
+        def on_result(result: AgentResult):
+            # Progress is persisted per agent, so a restart keeps what is done
+            column, value = ('results', result.response.content) if result.ok else ('errors', result.error)
+            if result.ok and not isinstance(value, str):
+                column, value = 'errors', "No text response"
+            with self._lock:
+                with self._conn:
+                    self._conn.execute(
+                        f"UPDATE jobs SET {column} = json_set({column}, '$.' || ?, ?), elapsed = json_set(elapsed, '$.' || ?, ?) WHERE job_id = ?",
+                        (result.name, value, result.name, round(result.elapsed, 2), job_id),
+                    )
+
+        streams = self._streams[job_id]
+        # Both search agents share one tool; the job keeps the searches made during its run
+        search_tools = team['research_librarian'].tools[0]
+        search_before = search_tools.snapshot()
+        results = await arun_teaching_pipeline(
+            team,
+            topic,
+            prompt,
+            force_refresh,
+            max_concurrency=max_concurrency or DEFAULT_MAX_CONCURRENCY,
+            timeout=timeout,
+            on_result=on_result,
+            on_chunk={node: buffer.append for node, buffer in streams.items()},
+        )
+        search_stats = search_tools.snapshot().since(search_before)
+        with self._lock:
+            with self._conn:
+                self._conn.execute("UPDATE jobs SET search_stats = ? WHERE job_id = ?", (json.dumps(asdict(search_stats)), job_id))
+        return results
+
+    def _finished(self, job_id: str, future) -> None:
+        status, error = DONE, None
+        if future.cancelled():
+            status = INTERRUPTED
+        elif future.exception() is not None:
+            status, error = FAILED, f"{type(future.exception()).__name__}: {future.exception()}"
+        elif not any(result.ok for result in future.result().values()):
+            status = FAILED
+        with self._lock:
+            with self._conn:
+                if error:
+                    self._conn.execute("UPDATE jobs SET errors = json_set(errors, '$.job', ?) WHERE job_id = ?", (error, job_id))
+                self._conn.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ?", (status, time.time(), job_id))
+                if status != INTERRUPTED and job_id in self._reruns:
+                    # In the same transaction, so subscribers never see (and collect) the run being replaced
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, results = '{}', errors = '{}', elapsed = '{}', created_at = ?, finished_at = NULL, search_stats = NULL WHERE job_id = ?",
+                        (QUEUED, time.time(), job_id),
+                    )
+                    self._runners[job_id] = (self._reruns.pop(job_id), True)
+                    self._queue.append(job_id)
+            self._running.pop(job_id, None)
+            self._streams.pop(job_id, None)
+        self._pump()
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide queue shared by all sessions."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
@@ -0,0 +1,132 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from response_cache import cache_dir
+
+# Session-state keys that make up a learner's profile
+PROFILE_KEYS = ('points', 'level', 'badges', 'progress_slider', 'completed_sections', 'quiz_answer', 'learning_style', 'current_section')
+# Session-state keys of the Start-flow reports, stored as artifacts
+ARTIFACT_KEYS = ('professor_response', 'academic_advisor_response', 'research_librarian_response', 'teaching_assistant_response')
+# Report bodies kept in memory across sessions (most recently used first out)
+MAX_CACHED_ARTIFACTS = 256
+
+
+class LearnerStore:
+    """Profiles and generated reports per user id in SQLite (WAL), behind an in-memory read-through cache.
+
+    Profiles are small JSON documents and are cached whole. Report bodies are
+    only read when a report is actually displayed; `list_artifacts` returns
+    their metadata without the content.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_cached_artifacts: int = MAX_CACHED_ARTIFACTS):
+        self.path = path or os.path.join(cache_dir(), "learners.sqlite3")
+        self.max_cached_artifacts = max_cached_artifacts
+        # user id -> profile JSON; kept serialized so callers never share mutable lists with the cache
+        self._profiles: Dict[str, str] = {}
+        self._artifacts: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS profiles (user_id TEXT PRIMARY KEY, data TEXT, updated_at REAL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            " user_id TEXT, name TEXT, topic TEXT, content TEXT, size INTEGER, updated_at REAL,"
+            " PRIMARY KEY (user_id, name))"
+        )
+        self._conn.commit()
+
+    def load_profile(self, user_id: str) -> dict:
+        with self._lock:
+            if user_id not in self._profiles:
+                row = self._conn.execute("SELECT data FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+                self._profiles[user_id] = row[0] if row else "{}"
+            return json.loads(self._profiles[user_id])
+
+    def save_profile(self, user_id: str, data: dict) -> bool:
+        """Write the profile if it differs from what is stored; returns whether a write happened."""
+        payload = json.dumps(data, sort_keys=True)
+        with self._lock:
+            if self._profiles.get(user_id) == payload:
+                return False
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (user_id, data, updated_at) VALUES (?, ?, ?)",
+                (user_id, payload, time.time()),
+            )
+            self._conn.commit()
+            self._profiles[user_id] = payload
+            return True
+
+    def save_artifacts(self, user_id: str, topic: str, artifacts: Dict[str, str]) -> None:
+        """Store a batch of reports for one topic in a single transaction."""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO artifacts (user_id, name, topic, content, size, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(user_id, name, topic, content, len(content), now) for name, content in artifacts.items()],
+                )
+            for name, content in artifacts.items():
+                self._remember((user_id, name), content)
+
+    def list_artifacts(self, user_id: str) -> Dict[str, dict]:
+        """name -> {'topic', 'size', 'updated_at'}; report bodies are not read."""
+        with self._lock:
+            rows = self._conn.execute("SELECT name, topic, size, updated_at FROM artifacts WHERE user_id = ?", (user_id,)).fetchall()
+        return {name: {'topic': topic, 'size': size, 'updated_at': updated_at} for name, topic, size, updated_at in rows}
+
+    def load_artifact(self, user_id: str, name: str) -> Optional[str]:
+        key = (user_id, name)
+        with self._lock:
+            if key in self._artifacts:
+                self._artifacts.move_to_end(key)
+                return self._artifacts[key]
+            row = self._conn.execute("SELECT content FROM artifacts WHERE user_id = ? AND name = ?", key).fetchone()
+            if row is None:
+                return None
+            self._remember(key, row[0])
+            return row[0]
+
+    def _remember(self, key: tuple, content: str) -> None:
+        self._artifacts[key] = content
+        self._artifacts.move_to_end(key)
+        while len(self._artifacts) > self.max_cached_artifacts:
+            self._artifacts.popitem(last=False)
+
+
+_store: Optional[LearnerStore] = None
+_store_lock = threading.Lock()
+
+
+def get_learner_store() -> LearnerStore:
+    """Process-wide store shared by all sessions."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LearnerStore()
+        return _store
+
+
+def profile_snapshot(state) -> dict:
+    """The persisted part of a session state: profile keys that are set, as plain JSON values."""
+    return {key: state[key] for key in PROFILE_KEYS if key in state}
+
+
+def restore_profile(state, user_id: str, store: Optional[LearnerStore] = None) -> None:
+    """Seed a new session's state from the stored profile; keys already set in this session win."""
+    store = store or get_learner_store()
+    for key, value in store.load_profile(user_id).items():
+        if key in PROFILE_KEYS and key not in state:
+            state[key] = value
+
+
+def persist_profile(state, user_id: str, store: Optional[LearnerStore] = None) -> bool:
+    """Flush the session's profile in one write, only if something changed since the last flush."""
+    return (store or get_learner_store()).save_profile(user_id, profile_snapshot(state))
@@ -0,0 +1,311 @@
+"""Load test of the learner flows: N concurrent sessions against the offline stand-in.
+
+Every simulated session builds its own team (as a Streamlit session does),
+runs the Start flow over the four-agent pipeline with streaming, then asks
+Live Q&A questions and chats with the Professor, going through the same
+response cache, semantic cache and model routes as the app:
+
+    python load_test.py --sessions 50 --questions 3 --chat-turns 3
+    FAKE_BACKEND=slow_backend.json python load_test.py --sessions 200 --ramp 10
+
+The stand-in (fake_backend) is used with its defaults unless FAKE_BACKEND or
+--backend configures it; --live calls OpenAI and SerpAPI with OPENAI_API_KEY
+and SERP_API_KEY instead. The SerpAPI rate limit (SERPAPI_RATE_PER_MINUTE)
+applies to the stand-in too. Reports p50/p95/p99 latency per flow, throughput
+and memory per session (tracemalloc); --json writes the report.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from agent_registry import DEFAULT_MODEL_ID, TEAM_SPEC, get_team
+from async_core import arun
+from chat_memory import ConversationMemory
+from fake_backend import FakeBackendConfig, configure, fake_backend_config, load_config
+from pipeline import TEACHING_PIPELINE, arun_teaching_pipeline, topic_prompt
+from semantic_cache import get_semantic_cache
+from single_flight import agent_flights
+from streaming import StreamBuffer
+
+DEFAULT_TOPICS = ["Machine Learning", "LoRA fine-tuning", "Rust lifetimes", "Linear algebra", "Kubernetes networking", "Bayesian statistics"]
+LIVE_QA_QUESTIONS = [
+    "What is {topic}?",
+    "What are the key ideas of {topic}?",
+    "Give me a practical example of {topic}.",
+    "What should I learn before {topic}?",
+]
+CHAT_MESSAGES = [
+    "Can you help me get started with {topic}?",
+    "What is the hardest part of {topic} for beginners?",
+    "Suggest a small project to practice {topic}.",
+    "How do I know I have understood {topic}?",
+]
+
+
+@dataclass
+class LoadTestSettings:
+    sessions: int = 10
+    questions: int = 2
+    chat_turns: int = 2
+    # Seconds over which session starts are spread
+    ramp: float = 0.0
+    # Mean pause between a learner's actions (uniform between 0 and twice this)
+    think_time: float = 0.0
+    agent_concurrency: int = 4
+    timeout: Optional[float] = 300
+    model: str = DEFAULT_MODEL_ID
+    temperature: Optional[float] = 0.1
+    # Serve repeated topics from the response cache instead of forcing fresh runs
+    use_cache: bool = False
+    trace_memory: bool = True
+    topics: List[str] = field(default_factory=lambda: list(DEFAULT_TOPICS))
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Linear-interpolated percentile; None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class _Recorder:
+    """Latency samples and failures per flow ('start_flow', 'live_qa', 'chatbot', pipeline nodes)."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.active = 0
+        self.max_active = 0
+
+    def add(self, flow: str, seconds: float, ok: bool = True) -> None:
+        self.samples.setdefault(flow, []).append(seconds)
+        if not ok:
+            self.errors[flow] = self.errors.get(flow, 0) + 1
+
+
+async def _think(settings: LoadTestSettings, rng) -> None:
+    if settings.think_time > 0:
+        await asyncio.sleep(rng.uniform(0, 2 * settings.think_time))
+
+
+async def _timed(recorder: _Recorder, flow: str, coro):
+    started = time.monotonic()
+    try:
+        result = await coro
+    except Exception:
+        recorder.add(flow, time.monotonic() - started, ok=False)
+        return None
+    recorder.add(flow, time.monotonic() - started)
+    return result
+
+
+async def simulate_session(index: int, settings: LoadTestSettings, keys: tuple, recorder: _Recorder, store: dict, rng) -> None:
+    """One learner: Start flow, then Live Q&A questions, then a chat with the Professor."""
+    topic = settings.topics[index % len(settings.topics)]
+    team = get_team(keys[0], keys[1], settings.model, settings.temperature, store=store)
+    semantic_cache = get_semantic_cache()
+
+    started = time.monotonic()
+    results = await arun_teaching_pipeline(
+        team,
+        topic,
+        topic_prompt(topic, "Reading/Writing", 0),
+        force_refresh=not settings.use_cache,
+        max_concurrency=settings.agent_concurrency,
+        timeout=settings.timeout,
+        on_chunk={node: StreamBuffer().append for node in TEACHING_PIPELINE},
+    )
+    recorder.add('start_flow', time.monotonic() - started, ok=bool(results) and all(r.ok for r in results.values()))
+    for node, result in results.items():
+        recorder.add(node, result.elapsed, ok=result.ok)
+    store['results'] = results
+
+    agent_keys = list(TEAM_SPEC)
+    for q in range(settings.questions):
+        await _think(settings, rng)
+        agent_key = agent_keys[(index + q) % len(agent_keys)]
+        question = LIVE_QA_QUESTIONS[(index + q) % len(LIVE_QA_QUESTIONS)].format(topic=topic)
+        scope = (topic, TEAM_SPEC[agent_key]['name'])
+        started = time.monotonic()
+        hit = semantic_cache.lookup(scope, question)
+        if hit:
+            recorder.add('live_qa', time.monotonic() - started)
+            continue
+        response = await _timed(recorder, 'live_qa', arun(team[agent_key], question, on_chunk=StreamBuffer().append, call_site="live_qa"))
+        if response is not None and isinstance(response.content, str):
+            semantic_cache.store(scope, question, response.content)
+
+    memory = store['chat_memory'] = ConversationMemory()
+    for turn in range(settings.chat_turns):
+        await _think(settings, rng)
+        message = CHAT_MESSAGES[(index + turn) % len(CHAT_MESSAGES)].format(topic=topic)
+        memory.add('user', message)
+        scope = ("chatbot", topic)
+        started = time.monotonic()
+        # As in the apps, only a conversation's opening message may be answered from the cache
+        hit = semantic_cache.lookup(scope, message) if turn == 0 else None
+        if hit:
+            recorder.add('chatbot', time.monotonic() - started)
+            answer = hit.answer
+        else:
+            response = await _timed(recorder, 'chatbot', arun(team['professor'], memory.build_prompt(), on_chunk=StreamBuffer().append, call_site="chatbot"))
+            answer = response.content if response is not None and isinstance(response.content, str) else ""
+            if answer and turn == 0:
+                semantic_cache.store(scope, message, answer)
+        memory.add('ai', answer)
+
+
+async def arun_load_test(settings: LoadTestSettings, openai_api_key: str, serpapi_api_key: str) -> dict:
+    """Run the sessions on the current event loop and return the report (see `format_report`)."""
+    rng = random.Random(0)
+    recorder = _Recorder()
+    flights_before = agent_flights.stats()
+    # Per-session state is kept until the end, as a Streamlit server keeps session_state
+    stores = [{} for _ in range(settings.sessions)]
+    if settings.trace_memory:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+    async def session(index: int) -> None:
+        if settings.ramp > 0 and settings.sessions > 1:
+            await asyncio.sleep(settings.ramp * index / settings.sessions)
+        recorder.active += 1
+        recorder.max_active = max(recorder.max_active, recorder.active)
+        try:
+            await simulate_session(index, settings, (openai_api_key, serpapi_api_key), recorder, stores[index], rng)
+        except Exception:
+            recorder.add('session', 0.0, ok=False)
+        finally:
+            recorder.active -= 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(session(i) for i in range(settings.sessions)))
+    wall = time.monotonic() - started
+
+    memory = None
+    if settings.trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = {
+            # Working set while sessions overlap, spread over the most sessions that were in flight at once
+            'peak_kb_per_session': round((peak - baseline) / max(1, recorder.max_active) / 1024, 1),
+            # What each finished session keeps alive (team copies, results, chat memory)
+            'retained_kb_per_session': round((current - baseline) / max(1, settings.sessions) / 1024, 1),
+        }
+    stores.clear()
+
+    flows = {}
+    for flow, values in recorder.samples.items():
+        flows[flow] = {
+            'count': len(values),
+            'errors': recorder.errors.get(flow, 0),
+            'p50': round(percentile(values, 50), 3),
+            'p95': round(percentile(values, 95), 3),
+            'p99': round(percentile(values, 99), 3),
+            'max': round(max(values), 3),
+        }
+    completed = len(recorder.samples.get('start_flow', []))
+    calls = sum(len(values) for flow, values in recorder.samples.items() if flow in ('live_qa', 'chatbot') or flow in TEACHING_PIPELINE)
+    config = fake_backend_config()
+    return {
+        'settings': {k: v for k, v in asdict(settings).items() if k != 'topics'},
+        'backend': asdict(config) if config else 'live',
+        'wall_seconds': round(wall, 2),
+        'max_concurrent_sessions': recorder.max_active,
+        'throughput': {
+            'sessions_per_second': round(completed / wall, 3) if wall else None,
+            'agent_calls_per_second': round(calls / wall, 3) if wall else None,
+        },
+        'memory': memory,
+        # Agent runs that joined another session's identical in-flight run (single_flight)
+        'coalesced_runs': agent_flights.stats()['coalesced'] - flights_before['coalesced'],
+        'flows': flows,
+        'failed_sessions': recorder.errors.get('session', 0),
+    }
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"{report['settings']['sessions']} sessions in {report['wall_seconds']}s "
+        f"(up to {report['max_concurrent_sessions']} at once, {report['failed_sessions']} failed)",
+        f"throughput: {report['throughput']['sessions_per_second']} sessions/s, {report['throughput']['agent_calls_per_second']} agent calls/s",
+        f"coalesced: {report['coalesced_runs']} agent runs shared an identical in-flight run",
+    ]
+    if report['memory']:
+        lines.append(f"memory: {report['memory']['peak_kb_per_session']} KiB peak / {report['memory']['retained_kb_per_session']} KiB retained per session")
+    lines.append(f"{'flow':<30}{'count':>7}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for flow, row in report['flows'].items():
+        if flow == 'session':
+            continue
+        lines.append(f"{flow:<30}{row['count']:>7}{row['errors']:>8}{row['p50']:>9.3f}{row['p95']:>9.3f}{row['p99']:>9.3f}{row['max']:>9.3f}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate concurrent learner sessions against the agent pipeline.")
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent learner sessions")
+    parser.add_argument("--questions", type=int, default=2, help="Live Q&A questions per session")
+    parser.add_argument("--chat-turns", type=int, default=2, help="chatbot messages per session")
+    parser.add_argument("--ramp", type=float, default=0.0, help="seconds over which sessions start")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a learner's actions")
+    parser.add_argument("--agent-concurrency", type=int, default=4, help="agents run in parallel per Start flow")
+    parser.add_argument("--timeout", type=float, default=300, help="per-agent timeout in seconds")
+    parser.add_argument("--model", default=DEFAULT_MODEL_ID, help="model for agents without a route (see model_router)")
+    parser.add_argument("--topics", help="text file with one topic per line (default: a built-in list)")
+    parser.add_argument("--use-cache", action="store_true", help="let repeated topics hit the response cache")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (it slows Python code down)")
+    parser.add_argument("--backend", default="", help="fake backend settings: inline JSON or a JSON file (see fake_backend)")
+    parser.add_argument("--live", action="store_true", help="call OpenAI and SerpAPI instead of the stand-in")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    if args.live:
+        load_dotenv()
+        configure(None)
+        keys = (os.getenv('OPENAI_API_KEY', ''), os.getenv('SERP_API_KEY', ''))
+        if not all(keys):
+            print("OPENAI_API_KEY and SERP_API_KEY must be set for --live.", file=sys.stderr)
+            return 2
+    else:
+        configure(load_config(args.backend) if args.backend else fake_backend_config() or FakeBackendConfig())
+        keys = ('offline', 'offline')
+
+    settings = LoadTestSettings(
+        sessions=args.sessions,
+        questions=args.questions,
+        chat_turns=args.chat_turns,
+        ramp=args.ramp,
+        think_time=args.think_time,
+        agent_concurrency=args.agent_concurrency,
+        timeout=args.timeout,
+        model=args.model,
+        use_cache=args.use_cache,
+        trace_memory=not args.no_memory,
+    )
+    if args.topics:
+        with open(args.topics, encoding="utf-8") as f:
+            settings.topics = [line.strip() for line in f if line.strip() and not line.startswith("#")] or settings.topics
+
+    report = asyncio.run(arun_load_test(settings, *keys))
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['failed_sessions'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
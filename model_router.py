@@ -0,0 +1,176 @@
+"""Per-call-type model routing with fallback.
+
+A route picks the model for one agent at one call site (the `call_site`
+names the instrumentation already records: start_flow, batch, live_qa,
+chatbot, assignment_feedback, ...). When the model times out, is rate
+limited or the provider fails, the call is retried on the route's fallback
+models in order. Call sites without a route keep the agent's own model.
+
+Override or extend DEFAULT_ROUTES with MODEL_ROUTES, either inline JSON or
+the path of a JSON file in the same shape, e.g.
+
+    {"start_flow": {"professor": {"model": "gpt-4o", "fallbacks": ["gpt-4o-mini"]}}}
+
+A route without "model" keeps the agent's configured model.
+
+Latency, tokens and cost per (call site, agent, model) are in
+`instrumentation.metrics_registry`; `route_stats` adds how often each
+route fell back.
+"""
+import asyncio
+import dataclasses
+import json
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from instrumentation import metrics_registry
+
+# call site -> agent key (snake_case agent name, or "*" for any agent) -> route.
+# Routes without a "model" keep the agent's configured model and only add fallbacks and
+# limits; moving a call site to a bigger model is opt-in through MODEL_ROUTES.
+DEFAULT_ROUTES: Dict[str, Dict[str, dict]] = {
+    'start_flow': {'*': {'fallbacks': ['gpt-4o-mini', 'gpt-3.5-turbo']}},
+    'batch': {'*': {'fallbacks': ['gpt-4o-mini', 'gpt-3.5-turbo']}},
+    'live_qa': {'*': {'fallbacks': ['gpt-4o-mini', 'gpt-3.5-turbo'], 'timeout': 60}},
+    'chatbot': {'*': {'fallbacks': ['gpt-4o-mini', 'gpt-3.5-turbo'], 'timeout': 60}},
+    'chat_summary': {'*': {'fallbacks': ['gpt-4o-mini', 'gpt-3.5-turbo'], 'temperature': 0, 'timeout': 30}},
+    'assignment_feedback': {'*': {'fallbacks': ['gpt-4o-mini', 'gpt-3.5-turbo']}},
+    'assignment_feedback_chunk': {'*': {'fallbacks': ['gpt-4o-mini', 'gpt-3.5-turbo']}},
+}
+
+# Provider errors worth another model: timeouts, rate limits, server errors
+FALLBACK_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class Route:
+    # None keeps the agent's own model
+    model: Optional[str] = None
+    fallbacks: Tuple[str, ...] = ()
+    temperature: Optional[float] = None
+    # Per-attempt request timeout in seconds
+    timeout: Optional[float] = None
+
+    def models_for(self, agent: Any) -> List[str]:
+        """The route's model (or the agent's own), then the fallbacks, without repeats."""
+        return list(dict.fromkeys((self.model or agent.model.id,) + self.fallbacks))
+
+
+def load_routes(spec: str = '') -> Dict[str, Dict[str, Route]]:
+    """DEFAULT_ROUTES with `spec` (inline JSON or a JSON file path) merged over it per call site."""
+    raw = {site: dict(agents) for site, agents in DEFAULT_ROUTES.items()}
+    if spec:
+        if not spec.lstrip().startswith("{"):
+            with open(spec, encoding="utf-8") as f:
+                spec = f.read()
+        for site, agents in json.loads(spec).items():
+            raw.setdefault(site, {}).update(agents)
+    return {
+        site: {
+            key: Route(
+                model=route.get('model'),
+                fallbacks=tuple(route.get('fallbacks', ())),
+                temperature=route.get('temperature'),
+                timeout=route.get('timeout'),
+            )
+            for key, route in agents.items()
+        }
+        for site, agents in raw.items()
+    }
+
+
+ROUTES = load_routes(os.getenv('MODEL_ROUTES', ''))
+
+_fallbacks: Counter = Counter()
+_lock = threading.Lock()
+
+
+def agent_key(agent: Any) -> str:
+    """'Academic Advisor' -> 'academic_advisor', the agent's key in agent_registry.TEAM_SPEC."""
+    return re.sub(r"\W+", "_", (getattr(agent, 'name', None) or '').strip()).strip("_").lower()
+
+
+def route_for(call_site: Optional[str], agent: Any, routes: Optional[Dict[str, Dict[str, Route]]] = None) -> Optional[Route]:
+    agents = (routes or ROUTES).get(call_site or '')
+    if not agents:
+        return None
+    return agents.get(agent_key(agent)) or agents.get('*')
+
+
+def routed_agent(agent: Any, model_id: str, route: Route) -> Any:
+    """Copy of `agent` on `model_id` with the route's settings, sharing the original HTTP pool and tools."""
+    changes = {'id': model_id}
+    if route.temperature is not None:
+        changes['temperature'] = route.temperature
+    if route.timeout is not None:
+        changes['timeout'] = route.timeout
+    return agent.deep_copy(update={'model': dataclasses.replace(agent.model, **changes)})
+
+
+def route_chain(agent: Any, call_site: Optional[str]) -> Tuple[Optional[Route], List[Any]]:
+    """The route (if any) and the agents to try in order; unrouted calls just use `agent`."""
+    route = route_for(call_site, agent)
+    if route is None or getattr(agent, 'model', None) is None:
+        return None, [agent]
+    return route, [routed_agent(agent, model_id, route) for model_id in route.models_for(agent)]
+
+
+def is_fallback_error(exc: BaseException) -> bool:
+    """Timeouts, rate limits, connection failures and 5xx from the provider."""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+        return True
+    status = getattr(exc, 'status_code', None)
+    cause = exc.__cause__
+    if cause is not None and type(cause).__name__ in ('APIConnectionError', 'APITimeoutError', 'RateLimitError', 'InternalServerError'):
+        return True
+    return type(exc).__name__ == 'ModelProviderError' and status in FALLBACK_STATUS
+
+
+def note_fallback(call_site: str, agent: Any, failed_model: str) -> None:
+    """Count one fallback away from `failed_model`; reported by `route_stats`."""
+    with _lock:
+        _fallbacks[(call_site, getattr(agent, 'name', None) or str(agent), failed_model)] += 1
+
+
+def run_routed(agent: Any, call_site: Optional[str], attempt: Callable[[Any], Any], started: Optional[Callable[[], bool]] = None) -> Any:
+    """Call `attempt(candidate)` for each agent of the route until one succeeds.
+
+    Only fallback-worthy errors move on to the next model, and not once
+    `started()` reports that output already reached the user (a streamed
+    answer cannot be restarted on another model without repeating itself).
+    """
+    _, chain = route_chain(agent, call_site)
+    for index, candidate in enumerate(chain):
+        try:
+            return attempt(candidate)
+        except Exception as exc:
+            if index == len(chain) - 1 or not is_fallback_error(exc) or (started and started()):
+                raise
+            note_fallback(call_site, agent, candidate.model.id)
+
+
+async def arun_routed(agent: Any, call_site: Optional[str], attempt: Callable[[Any], Any], started: Optional[Callable[[], bool]] = None) -> Any:
+    """Async `run_routed`; the route's timeout bounds each attempt and cancels it."""
+    route, chain = route_chain(agent, call_site)
+    for index, candidate in enumerate(chain):
+        try:
+            if route is not None and route.timeout is not None:
+                return await asyncio.wait_for(attempt(candidate), route.timeout)
+            return await attempt(candidate)
+        except Exception as exc:
+            if index == len(chain) - 1 or not is_fallback_error(exc) or (started and started()):
+                raise
+            note_fallback(call_site, agent, candidate.model.id)
+
+
+def route_stats(summary: Optional[List[dict]] = None) -> List[dict]:
+    """Per-route rows of the instrumentation summary plus how often that model was fallen back from."""
+    if summary is None:
+        summary = metrics_registry.summary()
+    with _lock:
+        fallbacks = dict(_fallbacks)
+    return [dict(row, fallbacks=fallbacks.get((row['call_site'], row['agent'], row['model']), 0)) for row in summary]
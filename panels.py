@@ -0,0 +1,45 @@
+import functools
+from typing import Callable, List, Sequence
+
+import streamlit as st
+
+# Called after every panel rerun (e.g. to flush the learner profile), set per session
+PANEL_HOOK_KEY = "_after_panel_run"
+
+
+def stateful_tabs(labels: Sequence[str], key: str) -> List:
+    """st.tabs that know which tab is selected, so hidden tabs can skip their work.
+
+    Older Streamlit versions cannot report the selected tab; there every tab
+    is treated as open and runs as before.
+    """
+    try:
+        return st.tabs(labels, key=key, on_change="rerun")
+    except TypeError:
+        return st.tabs(labels)
+
+
+def is_open(tab) -> bool:
+    return getattr(tab, 'open', None) is not False
+
+
+def set_panel_hook(hook: Callable[[], None]) -> None:
+    """Run `hook` after each panel-only rerun, where the rest of the script does not run."""
+    st.session_state[PANEL_HOOK_KEY] = hook
+
+
+def panel(fn: Callable) -> Callable:
+    """Turn a `show_*` section into an isolated fragment.
+
+    Interacting with the panel's widgets reruns only that panel instead of
+    the whole app (all four agent reports included).
+    """
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        result = fn(*args, **kwargs)
+        hook = st.session_state.get(PANEL_HOOK_KEY)
+        if hook is not None:
+            hook()
+        return result
+
+    return st.fragment(run)
@@ -0,0 +1,145 @@
+import queue
+import re
+from typing import Callable, Dict, List, Optional
+
+from agent_orchestrator import AgentResult, arun_graph, DEFAULT_MAX_CONCURRENCY, DEFAULT_AGENT_TIMEOUT
+from async_core import arun, drive
+from chat_memory import count_tokens
+
+# Declarative pipeline over the four agents: node -> (team member, upstream nodes).
+# The Professor and the Research Librarian start right away; the Academic Advisor
+# builds on the Professor's knowledge base and the Teaching Assistant on the roadmap.
+TEACHING_PIPELINE: Dict[str, dict] = {
+    'professor_response': {'agent': 'professor', 'inputs': []},
+    'research_librarian_response': {'agent': 'research_librarian', 'inputs': []},
+    'academic_advisor_response': {'agent': 'academic_advisor', 'inputs': ['professor_response']},
+    'teaching_assistant_response': {'agent': 'teaching_assistant', 'inputs': ['academic_advisor_response']},
+}
+
+NODE_TITLES = {
+    'professor_response': "Knowledge base from the Professor",
+    'research_librarian_response': "Resources from the Research Librarian",
+    'academic_advisor_response': "Learning roadmap from the Academic Advisor",
+    'teaching_assistant_response': "Practice materials from the Teaching Assistant",
+}
+
+# Token budget for each upstream output passed downstream
+DEFAULT_CONTEXT_TOKENS = 600
+
+
+def topic_prompt(topic: str, learning_style: str, progress: int) -> str:
+    """The Start-flow prompt every agent receives (before upstream context is appended)."""
+    return f"the topic is: {topic}, user learning style: {learning_style}, user progress: {progress}%."
+
+
+def pipeline_dependencies(pipeline: Dict[str, dict] = TEACHING_PIPELINE) -> Dict[str, List[str]]:
+    return {node: list(spec['inputs']) for node, spec in pipeline.items()}
+
+
+def compress_context(text: str, token_budget: int = DEFAULT_CONTEXT_TOKENS) -> str:
+    """Shrink a markdown report to its outline: headings plus the first sentence of each paragraph/bullet.
+
+    Code blocks and tables are dropped. The outline is cut at `token_budget`.
+    """
+    text = re.sub(r"```.*?```", "", text or "", flags=re.S)
+    lines = []
+    used = 0
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line.startswith("|") or set(line) <= set("-=*_ "):
+            continue
+        if not line.startswith("#"):
+            # First sentence only, capped at 30 words
+            line = re.split(r"(?<=[.!?])\s", line, maxsplit=1)[0]
+            words = line.split()
+            line = " ".join(words[:30]) + (" …" if len(words) > 30 else "")
+        tokens = count_tokens(line)
+        if used + tokens > token_budget:
+            break
+        lines.append(line)
+        used += tokens
+    return "\n".join(lines)
+
+
+def build_node_prompt(base_prompt: str, inputs: Dict[str, AgentResult], token_budget: int = DEFAULT_CONTEXT_TOKENS) -> str:
+    """Append the compressed outputs of the node's upstream agents to the topic prompt."""
+    sections = []
+    for node, result in inputs.items():
+        if result.ok and isinstance(getattr(result.response, 'content', None), str):
+            sections.append(f"{NODE_TITLES.get(node, node)} (summary):\n{compress_context(result.response.content, token_budget)}")
+    if not sections:
+        return base_prompt
+    return base_prompt + "\n\nBuild on this work from your teammates instead of repeating it:\n\n" + "\n\n".join(sections)
+
+
+async def arun_teaching_pipeline(
+    team: dict,
+    topic: str,
+    base_prompt: str,
+    force_refresh: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    timeout: Optional[float] = DEFAULT_AGENT_TIMEOUT,
+    on_result: Optional[Callable[[AgentResult], None]] = None,
+    on_chunk: Optional[Dict[str, Callable[[str], None]]] = None,
+    call_site: str = "start_flow",
+) -> Dict[str, AgentResult]:
+    """Run TEACHING_PIPELINE for one topic through the response cache, on the current event loop.
+
+    `on_chunk` maps a node to a callback for its streamed text; nodes without
+    one run non-streaming. Callbacks run on the event loop thread. Each run
+    works on its own copy of the agent, so one team can serve concurrent runs.
+    """
+    on_chunk = on_chunk or {}
+    jobs = {
+        node: (lambda inputs, node=node: arun(
+            team[TEACHING_PIPELINE[node]['agent']],
+            build_node_prompt(base_prompt, inputs),
+            topic,
+            force_refresh,
+            on_chunk=on_chunk.get(node),
+            call_site=call_site,
+        ))
+        for node in TEACHING_PIPELINE
+    }
+    return await arun_graph(
+        jobs,
+        pipeline_dependencies(),
+        max_concurrency=max_concurrency,
+        timeout=timeout,
+        on_result=on_result,
+    )
+
+
+def run_teaching_pipeline(
+    team: dict,
+    topic: str,
+    base_prompt: str,
+    force_refresh: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    timeout: Optional[float] = DEFAULT_AGENT_TIMEOUT,
+    on_result: Optional[Callable[[AgentResult], None]] = None,
+    on_tick: Optional[Callable[[], None]] = None,
+    on_chunk: Optional[Dict[str, Callable[[str], None]]] = None,
+    call_site: str = "start_flow",
+) -> Dict[str, AgentResult]:
+    """Blocking `arun_teaching_pipeline` for scripts, run on the shared background event loop.
+
+    `on_result` and `on_tick` are called from the calling thread, so it is
+    safe to update Streamlit placeholders from them; `on_chunk` callbacks
+    run on the loop thread (use a StreamBuffer). Interrupting the caller
+    cancels the agents' requests.
+    """
+    finished = queue.SimpleQueue()
+
+    def _tick():
+        if on_tick:
+            on_tick()
+        while not finished.empty():
+            result = finished.get()
+            if on_result:
+                on_result(result)
+
+    return drive(
+        arun_teaching_pipeline(team, topic, base_prompt, force_refresh, max_concurrency, timeout, finished.put, on_chunk, call_site),
+        on_tick=_tick,
+    )
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Tuple
+
+import streamlit as st
+from agno.utils.pprint import pprint_run_response
+
+from panels import is_open
+
+# Reports longer than this are shown as collapsible sections
+REPORT_SECTION_CHARS = int(os.getenv('REPORT_SECTION_CHARS', 4000))
+# Echo each distinct report to the terminal once (off by default)
+REPORT_TERMINAL_LOG = os.getenv('REPORT_TERMINAL_LOG', '').lower() in ('1', 'true', 'yes')
+MAX_RENDERED_REPORTS = 64
+
+_HEADING = re.compile(r"^(#{1,2})\s+(.+?)\s*#*\s*$")
+
+
+@dataclass(frozen=True)
+class RenderedReport:
+    digest: str
+    intro: str
+    # (title, markdown body) per top-level section; empty when the report is short
+    sections: Tuple[Tuple[str, str], ...]
+
+
+_rendered: "OrderedDict[str, RenderedReport]" = OrderedDict()
+_echoed: "OrderedDict[str, None]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def content_digest(content: str) -> str:
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+
+def _split_sections(content: str) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """Split at '#'/'##' headings outside code fences; text before the first heading is the intro."""
+    intro, sections, title, lines = [], [], None, []
+    in_fence = False
+    for line in content.splitlines():
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING.match(line)
+        if match:
+            if title is None:
+                intro = lines
+            else:
+                sections.append((title, "\n".join(lines).strip()))
+            title, lines = match.group(2).strip("*_ "), []
+        else:
+            lines.append(line)
+    if title is None:
+        return content, ()
+    sections.append((title, "\n".join(lines).strip()))
+    return "\n".join(intro).strip(), tuple(sections)
+
+
+def render_report(content: str) -> RenderedReport:
+    """Pre-split report, computed once per distinct content and reused on every rerun and session."""
+    digest = content_digest(content)
+    with _lock:
+        if digest in _rendered:
+            _rendered.move_to_end(digest)
+            return _rendered[digest]
+    if len(content or "") > REPORT_SECTION_CHARS:
+        intro, sections = _split_sections(content)
+    else:
+        intro, sections = content or "", ()
+    rendered = RenderedReport(digest, intro, sections if len(sections) > 1 else ())
+    if not rendered.sections:
+        rendered = RenderedReport(digest, content or "", ())
+    with _lock:
+        _rendered[digest] = rendered
+        while len(_rendered) > MAX_RENDERED_REPORTS:
+            _rendered.popitem(last=False)
+    return rendered
+
+
+def _section_expander(title: str, key: str):
+    try:
+        return st.expander(title, key=key, on_change="rerun")
+    except TypeError:
+        # Older Streamlit: no open/closed state, every section renders up front
+        return st.expander(title)
+
+
+def show_report(name: str, content: str) -> None:
+    """Render a report; long ones as collapsible sections whose bodies are only sent once expanded."""
+    rendered = render_report(content)
+    if rendered.intro:
+        st.markdown(rendered.intro)
+    for index, (title, body) in enumerate(rendered.sections):
+        expander = _section_expander(title, key=f"report_{name}_{rendered.digest[:12]}_{index}")
+        if is_open(expander):
+            with expander:
+                st.markdown(body)
+
+
+def echo_to_terminal(response) -> None:
+    """Opt-in terminal log (REPORT_TERMINAL_LOG=1); each distinct report is printed once per process."""
+    if not REPORT_TERMINAL_LOG or not isinstance(getattr(response, 'content', None), str):
+        return
+    digest = content_digest(response.content)
+    with _lock:
+        if digest in _echoed:
+            return
+        _echoed[digest] = None
+        while len(_echoed) > 4 * MAX_RENDERED_REPORTS:
+            _echoed.popitem(last=False)
+    pprint_run_response(response, markdown=True)
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from agno.agent import Agent
+
+from fake_backend import fake_backend_config
+
+CACHE_DIR = os.getenv('TEACHING_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+DEFAULT_TTL_SECONDS = float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+DEFAULT_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 500))
+
+
+def cache_dir() -> str:
+    """CACHE_DIR, or its 'offline' subdirectory while the fake backend is on, so made-up answers never reach real sessions."""
+    return os.path.join(CACHE_DIR, "offline") if fake_backend_config() else CACHE_DIR
+
+
+def normalize_topic(topic: str) -> str:
+    """'  Machine   learning. ' and 'machine learning' map to the same cache entry."""
+    return re.sub(r"\s+", " ", (topic or "").strip().strip(".?!")).casefold()
+
+
+class ResponseCache:
+    """SQLite-backed store of agent outputs with TTL and LRU eviction.
+
+    Entries are keyed by a content hash of everything that determines the
+    output (see `key_for`), so a hit can be served without any network call.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path or os.path.join(cache_dir(), "responses.sqlite3")
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, agent TEXT, content TEXT,"
+            " created_at REAL, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def key_for(agent: Agent, topic: str, prompt: str) -> str:
+        """Hash of agent name, model id, temperature, instructions and the normalized prompt.
+
+        The prompt carries the prompt parameters (learning style, progress);
+        the raw topic inside it is replaced by its normalized form.
+        """
+        normalized = normalize_topic(topic)
+        instructions = agent.instructions if isinstance(agent.instructions, list) else [str(agent.instructions or '')]
+        payload = {
+            'agent': agent.name,
+            'model': getattr(agent.model, 'id', None),
+            'temperature': getattr(agent.model, 'temperature', None),
+            'instructions': hashlib.sha256("\n".join(instructions).encode("utf-8")).hexdigest(),
+            'topic': normalized,
+            'prompt': prompt.replace(topic, normalized) if topic else prompt,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT content, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def peek(self, key: str) -> bool:
+        """Whether a fresh entry exists, without touching hit/miss counters or LRU order."""
+        with self._lock:
+            row = self._conn.execute("SELECT created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        return row is not None and not (self.ttl_seconds and time.time() - row[0] > self.ttl_seconds)
+
+    def set(self, key: str, agent_name: str, content: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, agent, content, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, agent_name, content, now, now),
+            )
+            # LRU eviction: keep only the most recently used max_entries rows
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY last_access DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'hit_rate': self.hits / total if total else 0.0}
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache instance shared by all sessions."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
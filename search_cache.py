@@ -0,0 +1,194 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+from agno.tools.serpapi import SerpApiTools
+
+from fake_backend import FakeBackendConfig, chance, fake_backend_config, fake_search_results, sample_latency
+from response_cache import ResponseCache, cache_dir
+
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv('SEARCH_CACHE_TTL_SECONDS', 24 * 3600))
+SERPAPI_RATE_PER_MINUTE = float(os.getenv('SERPAPI_RATE_PER_MINUTE', 30))
+
+# Articles only: words like "to", "best" or "top" change what a search returns
+_STOPWORDS = {"a", "an", "the"}
+
+
+def normalize_query(query: str) -> str:
+    """'The LoRA  tutorials!' and 'lora tutorials' map to the same cache entry; word order is kept."""
+    words = re.sub(r"[^\w\s+#.-]", " ", (query or "").casefold()).split()
+    return " ".join(w.strip(".-") for w in words if w not in _STOPWORDS and w.strip(".-"))
+
+
+class RateLimiter:
+    """Token bucket; `acquire` blocks until a slot is free (or `max_wait` passes)."""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(rate_per_minute // 6)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait: float = 60.0) -> bool:
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                delay = (1 - self.tokens) / self.rate
+            if time.monotonic() + delay > deadline:
+                return False
+            time.sleep(delay)
+
+
+@dataclass
+class SearchStats:
+    calls: int = 0
+    cache_hits: int = 0
+    coalesced: int = 0
+    network_calls: int = 0
+    rate_limited: int = 0
+    network_seconds: float = 0.0
+
+    def since(self, earlier: "SearchStats") -> "SearchStats":
+        return SearchStats(*(getattr(self, f) - getattr(earlier, f) for f in self.__dataclass_fields__))
+
+    @property
+    def hit_rate(self) -> float:
+        return (self.cache_hits + self.coalesced) / self.calls if self.calls else 0.0
+
+    @property
+    def avg_latency(self) -> float:
+        return self.network_seconds / self.network_calls if self.network_calls else 0.0
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_inflight: Dict[str, Future] = {}
+_shared_lock = threading.Lock()
+_search_cache: Optional[ResponseCache] = None
+
+
+def _get_search_cache() -> ResponseCache:
+    global _search_cache
+    with _shared_lock:
+        if _search_cache is None:
+            _search_cache = ResponseCache(path=os.path.join(cache_dir(), "searches.sqlite3"), ttl_seconds=SEARCH_CACHE_TTL_SECONDS, max_entries=5000)
+        return _search_cache
+
+
+class CachedSerpApiTools(SerpApiTools):
+    """SerpApiTools behind query normalization, a persistent TTL cache, in-flight coalescing and a per-key rate limit.
+
+    Drop-in replacement: the agents see the same `search_google` tool.
+    Cache, in-flight table and rate limiters are process-wide, so every agent
+    and session searching with the same key shares them.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, **kwargs):
+        super().__init__(api_key=api_key, **kwargs)
+        self.stats = SearchStats()
+        self._stats_lock = threading.Lock()
+        key_id = hashlib.sha256((self.api_key or '').encode("utf-8")).hexdigest()[:12]
+        with _shared_lock:
+            self._limiter = _limiters.setdefault(key_id, RateLimiter(SERPAPI_RATE_PER_MINUTE))
+
+    def _count(self, **increments) -> None:
+        with self._stats_lock:
+            for name, value in increments.items():
+                setattr(self.stats, name, getattr(self.stats, name) + value)
+
+    def snapshot(self) -> SearchStats:
+        with self._stats_lock:
+            return replace(self.stats)
+
+    def _fetch(self, query: str, num_results: int) -> str:
+        """One SerpAPI request, without caching."""
+        return super().search_google(query, num_results)
+
+    def search_google(self, query: str, num_results: int = 10) -> str:
+        """
+        Search Google using the Serpapi API. Returns the search results.
+
+        Args:
+            query(str): The query to search for.
+            num_results(int): The number of results to return.
+
+        Returns:
+            str: The search results from Google.
+                Keys:
+                    - 'search_results': List of organic search results.
+                    - 'recipes_results': List of recipes search results.
+                    - 'shopping_results': List of shopping search results.
+                    - 'knowledge_graph': The knowledge graph.
+                    - 'related_questions': List of related questions.
+        """
+        self._count(calls=1)
+        normalized = normalize_query(query)
+        if not normalized:
+            return self._fetch(query, num_results)
+        key = hashlib.sha256(f"google\x1f{normalized}\x1f{num_results}".encode("utf-8")).hexdigest()
+        cache = _get_search_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            self._count(cache_hits=1)
+            return cached
+
+        with _shared_lock:
+            future = _inflight.get(key)
+            owner = future is None
+            if owner:
+                future = _inflight[key] = Future()
+        if not owner:
+            # An identical query is already on the wire; share its result
+            self._count(coalesced=1)
+            return future.result()
+
+        try:
+            if not self._limiter.acquire():
+                self._count(rate_limited=1)
+                result = f"Error searching for the query {query}: SerpAPI rate limit reached, try again later"
+            else:
+                started = time.monotonic()
+                result = self._fetch(query, num_results)
+                self._count(network_calls=1, network_seconds=time.monotonic() - started)
+                if result.startswith("{"):
+                    cache.set(key, "serpapi", result)
+            future.set_result(result)
+            return result
+        except Exception as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with _shared_lock:
+                _inflight.pop(key, None)
+
+
+class FakeSerpApiTools(CachedSerpApiTools):
+    """CachedSerpApiTools answering from `fake_backend` instead of SerpAPI (see FAKE_BACKEND).
+
+    Only the network request is replaced: normalization, caching, coalescing
+    and the rate limit behave as in production.
+    """
+
+    def _fetch(self, query: str, num_results: int) -> str:
+        config = fake_backend_config() or FakeBackendConfig()
+        time.sleep(sample_latency(config.search_latency_median, config.search_latency_p95))
+        if chance(config.search_error_rate):
+            return f"Error searching for the query {query}: injected fault from the fake backend"
+        return fake_search_results(query, num_results)
+
+
+def search_tools(api_key: Optional[str] = None, **kwargs) -> CachedSerpApiTools:
+    """The search toolkit for a team: the offline stand-in when FAKE_BACKEND is set."""
+    cls = FakeSerpApiTools if fake_backend_config() else CachedSerpApiTools
+    return cls(api_key=api_key, **kwargs)
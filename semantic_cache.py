@@ -0,0 +1,214 @@
+"""Semantic answer cache for free-form questions (Live Q&A, the chatbot's opening message).
+
+Questions are embedded with a hashing vectorizer (content words, 5-letter
+word prefixes, word bigrams and character trigrams, no model download) and
+matched by cosine similarity against a NumPy matrix per scope, e.g.
+(topic, agent). A hit must also share most of its key terms with the new
+question, so "what is gradient descent" does not answer "what is
+stochastic gradient descent". Only questions that stand on their own are
+cached: chatbot follow-ups ("can you elaborate?") depend on the conversation
+and are never looked up.
+"""
+import itertools
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, List, Optional, Tuple
+
+import numpy as np
+
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.7))
+# Minimum Jaccard overlap of key terms (word prefixes) between the two questions
+SEMANTIC_CACHE_MIN_OVERLAP = float(os.getenv('SEMANTIC_CACHE_MIN_OVERLAP', 0.75))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', 256))
+SEMANTIC_CACHE_MAX_SCOPES = int(os.getenv('SEMANTIC_CACHE_MAX_SCOPES', 64))
+VECTOR_DIM = 1024
+
+# Question scaffolding that says nothing about what is being asked
+STOPWORDS = frozenset("""
+a an the is are was were be been being what whats how why when where which who whom whose does do did
+can could would should will shall may might must please explain explained explanation describe tell
+me us about of to in on at by for from and or with i you we it its this that these those define
+definition meaning mean means give some example examples simple simply terms briefly quick quickly
+""".split())
+
+
+def question_terms(text: str) -> List[str]:
+    """Content words, lower-cased, with a naive plural/-s strip."""
+    words = [w for w in re.findall(r"[a-z0-9]+", (text or "").lower()) if w not in STOPWORDS]
+    return [re.sub(r"(?<=[a-z]{3})(ies|es|s)$", "", w) for w in words]
+
+
+def key_terms(text: str) -> frozenset:
+    """5-letter prefixes of the content words ('backprop' and 'backpropagation' share one)."""
+    return frozenset(w[:5] for w in question_terms(text))
+
+
+def embed(text: str, dim: int = VECTOR_DIM) -> np.ndarray:
+    """L2-normalized signed feature hashing; crc32 keeps vectors stable across processes."""
+    vector = np.zeros(dim, dtype=np.float32)
+    words = question_terms(text)
+    features = []
+    for word in words:
+        features.append((f"p:{word[:5]}", 1.0))
+        features.append((f"w:{word}", 0.5))
+        padded = f"<{word}>"
+        features.extend((f"c:{padded[i:i + 3]}", 0.2) for i in range(len(padded) - 2))
+    features.extend((f"b:{a} {b}", 1.0) for a, b in zip(words, words[1:]))
+    for feature, weight in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        vector[h % dim] += weight if h & 0x80000000 else -weight
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+@dataclass
+class SemanticHit:
+    answer: str
+    question: str
+    similarity: float
+    entry_id: int
+
+
+class _ScopeIndex:
+    """Fixed-capacity matrix of question vectors; the least recently used row is overwritten when full."""
+
+    def __init__(self, dim: int, capacity: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        # slot -> (entry id, question, answer, key terms); None for free slots
+        self.entries: List[Optional[tuple]] = [None] * capacity
+        self.size = 0
+
+    def search(self, vector: np.ndarray, top_k: int = 5) -> List[Tuple[int, float]]:
+        if not self.size:
+            return []
+        scores = self.vectors[:self.size] @ vector
+        order = np.argsort(-scores)[:top_k]
+        return [(int(slot), float(scores[slot])) for slot in order if self.entries[slot] is not None]
+
+    def add(self, vector: np.ndarray, entry: tuple) -> None:
+        if self.size < len(self.entries):
+            slot = self.size
+            self.size += 1
+        else:
+            slot = int(np.argmin(self.last_used))
+        self.vectors[slot] = vector
+        self.entries[slot] = entry
+        self.last_used[slot] = time.monotonic()
+
+    def remove(self, entry_id: int) -> bool:
+        for slot, entry in enumerate(self.entries[:self.size]):
+            if entry is not None and entry[0] == entry_id:
+                self.entries[slot] = None
+                self.vectors[slot] = 0.0
+                self.last_used[slot] = 0.0
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return sum(entry is not None for entry in self.entries[:self.size])
+
+
+class SemanticCache:
+    """Process-wide answer cache with one bounded nearest-neighbour index per scope.
+
+    Precision is measured from feedback: `report_wrong` marks a served answer
+    as not matching the question (and drops it).
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        min_overlap: float = SEMANTIC_CACHE_MIN_OVERLAP,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        max_scopes: int = SEMANTIC_CACHE_MAX_SCOPES,
+        dim: int = VECTOR_DIM,
+    ):
+        self.threshold = threshold
+        self.min_overlap = min_overlap
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+        self.dim = dim
+        self.lookups = 0
+        self.hits = 0
+        self.flagged = 0
+        self._similarity_sum = 0.0
+        self._scopes: "OrderedDict[Hashable, _ScopeIndex]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def lookup(self, scope: Hashable, question: str) -> Optional[SemanticHit]:
+        vector = embed(question, self.dim)
+        terms = key_terms(question)
+        with self._lock:
+            self.lookups += 1
+            index = self._scopes.get(scope)
+            if index is None or not terms:
+                return None
+            self._scopes.move_to_end(scope)
+            for slot, similarity in index.search(vector):
+                if similarity < self.threshold:
+                    break
+                entry_id, cached_question, answer, cached_terms = index.entries[slot]
+                if len(terms & cached_terms) / len(terms | cached_terms) < self.min_overlap:
+                    continue
+                index.last_used[slot] = time.monotonic()
+                self.hits += 1
+                self._similarity_sum += similarity
+                return SemanticHit(answer, cached_question, similarity, entry_id)
+            return None
+
+    def store(self, scope: Hashable, question: str, answer: str) -> None:
+        if not answer or not key_terms(question):
+            return
+        vector = embed(question, self.dim)
+        with self._lock:
+            index = self._scopes.get(scope)
+            if index is None:
+                index = self._scopes[scope] = _ScopeIndex(self.dim, self.max_entries)
+                while len(self._scopes) > self.max_scopes:
+                    self._scopes.popitem(last=False)
+            self._scopes.move_to_end(scope)
+            index.add(vector, (next(self._ids), question, answer, key_terms(question)))
+
+    def report_wrong(self, scope: Hashable, entry_id: int) -> None:
+        """The learner said a served answer did not fit their question."""
+        with self._lock:
+            index = self._scopes.get(scope)
+            if index is not None and index.remove(entry_id):
+                self.flagged += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = sum(len(index) for index in self._scopes.values())
+            hits, lookups, flagged = self.hits, self.lookups, self.flagged
+            avg_similarity = self._similarity_sum / hits if hits else None
+            scopes = len(self._scopes)
+        return {
+            'lookups': lookups,
+            'hits': hits,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'flagged': flagged,
+            'precision': (hits - flagged) / hits if hits else None,
+            'avg_similarity': avg_similarity,
+            'entries': entries,
+            'scopes': scopes,
+        }
+
+
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Process-wide cache instance shared by all sessions."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticCache()
+        return _cache
@@ -0,0 +1,135 @@
+"""Process-wide single-flight for identical agent runs.
+
+When a class is told to "enter Transformers and click Start", every session
+asks the same agents the same thing at the same moment. The first call for
+a key runs; identical calls arriving while it is in flight attach to it,
+receive its streamed chunks (the ones already produced are replayed first)
+and share its response. `async_core.arun` keys Start-flow runs by call site
+and response-cache key (agent, model, instructions, normalized prompt).
+
+The shared run is cancelled only when every caller waiting on it has gone
+away, so one learner closing the tab does not fail the others.
+"""
+import asyncio
+import concurrent.futures
+import contextlib
+import threading
+from typing import Awaitable, Callable, ContextManager, Dict, Optional
+
+
+class _Flight:
+    """One in-flight run: its chunks so far, the callbacks of its waiters and its eventual result."""
+
+    def __init__(self):
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.chunks = []
+        self.subscribers = []
+        self.waiters = 0
+        self.task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def publish(self, chunk: str) -> None:
+        # Callbacks run under the lock so a late subscriber's replay cannot interleave with new chunks
+        with self._lock:
+            self.chunks.append(chunk)
+            for on_chunk in self.subscribers:
+                on_chunk(chunk)
+
+    def subscribe(self, on_chunk: Callable[[str], None]) -> None:
+        with self._lock:
+            for chunk in self.chunks:
+                on_chunk(chunk)
+            self.subscribers.append(on_chunk)
+
+    def unsubscribe(self, on_chunk: Callable[[str], None]) -> None:
+        with self._lock:
+            if on_chunk in self.subscribers:
+                self.subscribers.remove(on_chunk)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one run; counts what was shared."""
+
+    def __init__(self):
+        self.runs = 0
+        self.coalesced = 0
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    async def run(
+        self,
+        key: str,
+        fn: Callable[[Optional[Callable[[str], None]]], Awaitable],
+        on_chunk: Optional[Callable[[str], None]] = None,
+        on_join: Optional[Callable[[], ContextManager]] = None,
+    ):
+        """Await `fn(publish)` for the first caller of `key`; later callers share it while it runs.
+
+        `fn` receives a chunk callback when the first caller streams (None
+        otherwise). A caller that streams but joined a non-streaming run gets
+        the whole content as one chunk at the end. Callers that join an
+        existing run wait inside `on_join()`, e.g. to record them.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.runs += 1
+            else:
+                self.coalesced += 1
+            flight.waiters += 1
+        if on_chunk:
+            flight.subscribe(on_chunk)
+        if leader:
+            flight.loop = asyncio.get_running_loop()
+            flight.task = flight.loop.create_task(fn(flight.publish if on_chunk else None))
+            flight.task.add_done_callback(lambda task: self._finish(key, flight, task))
+        joined = on_join() if on_join is not None and not leader else contextlib.nullcontext()
+        try:
+            with joined:
+                # Shielded: cancelling one waiter must not cancel the shared future
+                result = await asyncio.shield(asyncio.wrap_future(flight.future))
+        except asyncio.CancelledError:
+            self._leave(key, flight, on_chunk)
+            raise
+        if on_chunk:
+            flight.unsubscribe(on_chunk)
+            if not flight.chunks and isinstance(getattr(result, 'content', None), str):
+                on_chunk(result.content)
+        with self._lock:
+            flight.waiters -= 1
+        return result
+
+    def _finish(self, key: str, flight: _Flight, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if task.cancelled():
+            flight.future.cancel()
+        elif task.exception() is not None:
+            flight.future.set_exception(task.exception())
+        else:
+            flight.future.set_result(task.result())
+
+    def _leave(self, key: str, flight: _Flight, on_chunk: Optional[Callable[[str], None]]) -> None:
+        """A waiter was cancelled; the shared run is cancelled with the last one."""
+        if on_chunk:
+            flight.unsubscribe(on_chunk)
+        with self._lock:
+            flight.waiters -= 1
+            abandoned = flight.waiters == 0
+            if abandoned and self._flights.get(key) is flight:
+                # Callers arriving from now on start a new run instead of joining a cancelled one
+                del self._flights[key]
+        if abandoned and flight.task is not None and not flight.task.done():
+            flight.loop.call_soon_threadsafe(flight.task.cancel)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'runs': self.runs, 'coalesced': self.coalesced, 'in_flight': len(self._flights)}
+
+
+# Shared by every session and entry point in the process
+agent_flights = SingleFlight()
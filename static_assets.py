@@ -0,0 +1,94 @@
+import base64
+import hashlib
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Streamlit serves ./static at app/static/ when server.enableStaticServing is on
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+GENERATED_DIR = os.path.join(STATIC_DIR, "generated")
+
+# name -> (source file, displayed width, displayed height or None to keep the aspect ratio)
+ASSET_SPECS: Dict[str, Tuple[str, int, Optional[int]]] = {
+    'logo': ("Logo.png", 150, 150),
+    'ai_logo': ("AI.png", 210, 220),
+    'developer': ("pic.jpg", 300, None),
+    # Chat avatars are shown at 32px; 64px keeps them sharp on high-DPI screens
+    'ai_avatar': ("AI.png", 64, 64),
+    'user_avatar': (os.path.join("static", "avatars", "user.png"), 64, 64),
+}
+
+_variants: Dict[tuple, str] = {}
+_data_uris: Dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def _content_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def build_variant(name: str, fmt: str = "WEBP") -> Optional[str]:
+    """Path of the downscaled, recompressed variant of asset `name`, building it if needed.
+
+    Memoized by the source file's mtime, so reruns only pay for an os.stat.
+    The output file name carries the content hash, which makes it safe to
+    cache in the browser forever.
+    """
+    source, width, height = ASSET_SPECS[name]
+    source_path = os.path.join(BASE_DIR, source)
+    if not os.path.exists(source_path):
+        return None
+    memo_key = (name, fmt, os.path.getmtime(source_path))
+    with _lock:
+        if memo_key in _variants:
+            return _variants[memo_key]
+        digest = _content_hash(source_path)
+        extension = "webp" if fmt == "WEBP" else "png"
+        target = os.path.join(GENERATED_DIR, f"{name}-{width}x{height or 'auto'}-{digest}.{extension}")
+        if not os.path.exists(target):
+            os.makedirs(GENERATED_DIR, exist_ok=True)
+            with Image.open(source_path) as image:
+                image = image.convert("RGBA") if image.mode not in ("RGB", "RGBA") else image
+                if height:
+                    image = image.resize((width, height), Image.LANCZOS)
+                else:
+                    image.thumbnail((width, width * 10), Image.LANCZOS)
+                tmp_path = target + ".tmp"
+                if fmt == "WEBP":
+                    image.save(tmp_path, "WEBP", quality=85, method=6)
+                else:
+                    image.save(tmp_path, "PNG", optimize=True)
+                os.replace(tmp_path, target)
+        _variants[memo_key] = target
+        return target
+
+
+def asset_src(name: str, static_serving: bool = True) -> Optional[str]:
+    """`src` for an <img> tag: a static URL if Streamlit static serving is on, else a small data URI."""
+    path = build_variant(name)
+    if path is None:
+        return None
+    if static_serving:
+        return "app/static/" + os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+    with _lock:
+        if path not in _data_uris:
+            with open(path, "rb") as f:
+                _data_uris[path] = "data:image/webp;base64," + base64.b64encode(f.read()).decode()
+        return _data_uris[path]
+
+
+def prewarm_assets() -> None:
+    """Build every variant up front so the first page view doesn't pay for it."""
+    for name in ASSET_SPECS:
+        build_variant(name)
+
+
+if __name__ == "__main__":
+    # Run at deploy time: python static_assets.py
+    prewarm_assets()
+    for path in sorted(_variants.values()):
+        print(f"{os.path.relpath(path, BASE_DIR)}  {os.path.getsize(path) / 1024:.1f} KB")
@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from agno.agent import Agent, RunResponse
+
+from instrumentation import track_run
+from model_router import run_routed
+
+# Re-render at most this often while tokens are arriving (seconds)
+DEFAULT_RENDER_INTERVAL = 0.15
+CURSOR = "▌"
+
+
+def text_delta(event: Any) -> Optional[str]:
+    """The text carried by one streamed run event, or None for tool calls and other events."""
+    content = getattr(event, 'content', None)
+    if isinstance(content, str) and content and getattr(event, 'event', 'RunResponseContent') == 'RunResponseContent':
+        return content
+    return None
+
+
+def iter_text_chunks(events: Iterable[Any]) -> Iterator[str]:
+    """Yield the text deltas of an `agent.run(..., stream=True)` event stream."""
+    for event in events:
+        content = text_delta(event)
+        if content:
+            yield content
+
+
+def run_streaming(agent: Agent, prompt: str, on_chunk: Callable[[str], None], call_site: Optional[str] = None, **run_kwargs) -> RunResponse:
+    """Run `agent` with streaming, feed each text delta to `on_chunk` and return the final RunResponse.
+
+    With `call_site` the model is picked by the call site's route (see
+    model_router) and the run is recorded in the instrumentation registry.
+    """
+    if call_site:
+        streamed = []
+
+        def attempt(candidate: Agent) -> RunResponse:
+            with track_run(call_site, candidate) as tracker:
+                tracker.response = run_streaming(candidate, prompt, tracker.wrap_on_chunk(_on_chunk), **run_kwargs)
+            return tracker.response
+
+        def _on_chunk(chunk: str) -> None:
+            streamed.append(True)
+            on_chunk(chunk)
+        return run_routed(agent, call_site, attempt, started=lambda: bool(streamed))
+    parts = []
+    for chunk in iter_text_chunks(agent.run(prompt, stream=True, **run_kwargs)):
+        parts.append(chunk)
+        on_chunk(chunk)
+    final = getattr(agent, 'run_response', None)
+    if final is not None and getattr(final, 'content', None):
+        return final
+    return RunResponse(content="".join(parts), agent_name=agent.name, model=getattr(agent.model, 'id', None))
+
+
+class ThrottledRenderer:
+    """Batch streamed chunks into a Streamlit placeholder, re-rendering at most every `interval` seconds.
+
+    Use from the script thread only (Live Q&A, chatbot). For worker threads
+    use StreamBuffer and render it from the script thread.
+    """
+
+    def __init__(self, placeholder, interval: float = DEFAULT_RENDER_INTERVAL):
+        self.placeholder = placeholder
+        self.interval = interval
+        self.parts = []
+        self._last_render = 0.0
+
+    def push(self, chunk: str) -> None:
+        self.parts.append(chunk)
+        now = time.monotonic()
+        if now - self._last_render >= self.interval:
+            self.placeholder.markdown("".join(self.parts) + CURSOR)
+            self._last_render = now
+
+    def finish(self, content: Optional[str] = None) -> None:
+        self.placeholder.markdown(content if content is not None else "".join(self.parts))
+
+
+class StreamBuffer:
+    """Thread-safe text buffer filled by a worker thread and rendered by the script thread."""
+
+    def __init__(self):
+        self._parts = []
+        self._lock = threading.Lock()
+        self._version = 0
+        self._rendered_version = 0
+
+    def append(self, chunk: str) -> None:
+        with self._lock:
+            self._parts.append(chunk)
+            self._version += 1
+
+    def text(self) -> str:
+        with self._lock:
+            return "".join(self._parts)
+
+    def render(self, placeholder, cursor: bool = True) -> None:
+        """Re-render only if new chunks arrived since the last call."""
+        with self._lock:
+            if self._version == self._rendered_version:
+                return
+            self._rendered_version = self._version
+            text = "".join(self._parts)
+        placeholder.markdown(text + (CURSOR if cursor else ""))
+
+
+def stream_to_placeholder(agent: Agent, prompt: str, placeholder, interval: float = DEFAULT_RENDER_INTERVAL, call_site: Optional[str] = None, **run_kwargs) -> RunResponse:
+    """Stream `agent`'s answer into `placeholder` with throttled re-renders and return the final RunResponse."""
+    renderer = ThrottledRenderer(placeholder, interval)
+    response = run_streaming(agent, prompt, renderer.push, call_site=call_site, **run_kwargs)
+    renderer.finish(response.content if isinstance(response.content, str) else None)
+    return response
@@ -1,11 +1,12 @@
 
 import streamlit as st
-from agno.agent import Agent, RunResponse
-from agno.models.openai import OpenAIChat
 import os
 from agno.tools.arxiv import ArxivTools
-from agno.utils.pprint import pprint_run_response
-from agno.tools.serpapi import SerpApiTools
+from agent_registry import get_team
+from fake_backend import fake_backend_config
+from agent_orchestrator import DEFAULT_MAX_CONCURRENCY, DEFAULT_AGENT_TIMEOUT
+from team_view import AGENT_LABELS, run_start_flow, show_run_stats
+from report_view import echo_to_terminal
 
 # Set page configuration
 st.set_page_config(page_title="👨‍🏫 AI Teaching Agent Team", layout="centered")
@@ -20,6 +21,10 @@ if 'serpapi_api_key' not in st.session_state:
 if 'topic' not in st.session_state:
     st.session_state['topic'] = ''
 
+# Concurrency settings for the Start flow
+AGENT_MAX_CONCURRENCY = int(os.getenv('AGENT_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY))
+AGENT_TIMEOUT_SECONDS = float(os.getenv('AGENT_TIMEOUT_SECONDS', DEFAULT_AGENT_TIMEOUT))
+
 # Streamlit sidebar for API keys
 with st.sidebar:
     st.title("API Keys Configuration")
@@ -28,8 +33,13 @@ with st.sidebar:
     st.session_state['serpapi_api_key'] = st.text_input("Enter your SerpAPI Key", type="password").strip()
     
     # Add info about terminal responses
-    st.info("Note: You can also view detailed agent responses\nin your terminal after execution.")
+    st.info("Note: Set REPORT_TERMINAL_LOG=1 to also print\neach agent response in your terminal.")
+
 
+# The offline stand-in (FAKE_BACKEND) answers without real keys
+if fake_backend_config():
+    for key_name in ('openai_api_key', 'serpapi_api_key'):
+        st.session_state[key_name] = st.session_state[key_name] or 'offline'
 
 # Validate API keys (only OpenAI and SerpAPI needed now)
 if not st.session_state['openai_api_key'] or not st.session_state['serpapi_api_key']:
@@ -39,69 +49,18 @@ if not st.session_state['openai_api_key'] or not st.session_state['serpapi_api_k
 # Set the OpenAI API key from session state
 os.environ["OPENAI_API_KEY"] = st.session_state['openai_api_key']
 
-# Create the Professor agent (formerly KnowledgeBuilder)
-professor_agent = Agent(
-    name="Professor",
-    role="Research and Knowledge Specialist", 
-    model=OpenAIChat(id="gpt-4o-mini", api_key=st.session_state['openai_api_key']),
-    tools=[],
-    instructions=[
-        "Create a comprehensive knowledge base that covers fundamental concepts, advanced topics, and current developments of the given topic.",
-        "Explain the topic from first principles first. Include key terminology, core principles, and practical applications and make it as a detailed report that anyone who's starting out can read and get maximum value out of it.",
-        "Make sure it is formatted in a way that is easy to read and understand.",
-    ],
-    show_tool_calls=True,
-    markdown=True,
-)
-
-# Create the Academic Advisor agent (formerly RoadmapArchitect)
-academic_advisor_agent = Agent(
-    name="Academic Advisor",
-    role="Learning Path Designer",
-    model=OpenAIChat(id="gpt-4o-mini", api_key=st.session_state['openai_api_key']),
-    tools=[],
-    instructions=[
-        "Using the knowledge base for the given topic, create a detailed learning roadmap.",
-        "Break down the topic into logical subtopics and arrange them in order of progression, a detailed report of roadmap that includes all the subtopics in order to be an expert in this topic.",
-        "Include estimated time commitments for each section.",
-        "Present the roadmap in a clear, structured format.",
-    ],
-    show_tool_calls=True,
-    markdown=True
-)
-
-# Create the Research Librarian agent (formerly ResourceCurator)
-research_librarian_agent = Agent(
-    name="Research Librarian",
-    role="Learning Resource Specialist",
-    model=OpenAIChat(id="gpt-4o-mini", api_key=st.session_state['openai_api_key']),
-    tools=[SerpApiTools(api_key=st.session_state['serpapi_api_key'])],
-    instructions=[
-        "Make a list of high-quality learning resources for the given topic.",
-        "Use the SerpApi search tool to find current and relevant learning materials.",
-        "Include technical blogs, GitHub repositories, official documentation, video tutorials, and courses.",
-        "Present the resources in a curated list with descriptions and quality assessments.",
-    ],
-    show_tool_calls=True,
-    markdown=True,
-)
-
-# Create the Teaching Assistant agent (formerly PracticeDesigner)
-teaching_assistant_agent = Agent(
-    name="Teaching Assistant",
-    role="Exercise Creator",
-    model=OpenAIChat(id="gpt-4o-mini", api_key=st.session_state['openai_api_key']),
-    tools=[SerpApiTools(api_key=st.session_state['serpapi_api_key'])],
-    instructions=[
-        "Create comprehensive practice materials for the given topic.",
-        "Use the SerpApi search tool to find example problems and real-world applications.",
-        "Include progressive exercises, quizzes, hands-on projects, and real-world application scenarios.",
-        "Ensure the materials align with the roadmap progression.",
-        "Provide detailed solutions and explanations for all practice materials.",
-    ],
-    show_tool_calls=True,
-    markdown=True,
+# Build the agent team once per session and API-key fingerprint; the HTTP pool is shared process-wide.
+# Agents keep this model unless a MODEL_ROUTES override sets one; the default routes only add fallbacks and timeouts.
+agent_team = get_team(
+    st.session_state['openai_api_key'],
+    st.session_state['serpapi_api_key'],
+    model_id="gpt-4o-mini",
+    store=st.session_state,
 )
+professor_agent = agent_team['professor']
+academic_advisor_agent = agent_team['academic_advisor']
+research_librarian_agent = agent_team['research_librarian']
+teaching_assistant_agent = agent_team['teaching_assistant']
 
 # Streamlit main UI
 st.title("👨‍🏫 AI Teaching Agent Team")
@@ -114,58 +73,31 @@ st.info("The agents will generate detailed learning content, roadmaps, resources
 st.session_state['topic'] = st.text_input("Enter the topic you want to learn about:", placeholder="e.g., Machine Learning, LoRA, etc.")
 
 # Start button
+force_refresh = st.checkbox("Force refresh (ignore cached answers)", key="force_refresh")
+show_run_stats()
 if st.button("Start"):
     if not st.session_state['topic']:
         st.error("Please enter a topic.")
     else:
-        # Display loading animations while generating responses
-        with st.spinner("Generating Knowledge Base..."):
-            professor_response: RunResponse = professor_agent.run(
-                f"the topic is: {st.session_state['topic']},Don't forget to add the Google Doc link in your response.",
-                stream=False
-            )
-            
-        with st.spinner("Generating Learning Roadmap..."):
-            academic_advisor_response: RunResponse = academic_advisor_agent.run(
-                f"the topic is: {st.session_state['topic']},Don't forget to add the Google Doc link in your response.",
-                stream=False
-            )
-            
-        with st.spinner("Curating Learning Resources..."):
-            research_librarian_response: RunResponse = research_librarian_agent.run(
-                f"the topic is: {st.session_state['topic']},Don't forget to add the Google Doc link in your response.",
-                stream=False
-            )
-            
-        with st.spinner("Creating Practice Materials..."):
-            teaching_assistant_response: RunResponse = teaching_assistant_agent.run(
-                f"the topic is: {st.session_state['topic']},Don't forget to add the Google Doc link in your response.",
-                stream=False
-            )
-
-
+        topic = st.session_state['topic']
+        topic_prompt = f"the topic is: {topic},Don't forget to add the Google Doc link in your response."
+        agent_results = run_start_flow(
+            agent_team,
+            topic,
+            topic_prompt,
+            force_refresh,
+            max_concurrency=AGENT_MAX_CONCURRENCY,
+            timeout=AGENT_TIMEOUT_SECONDS,
+            headings=True,
+            spinner="Generating Knowledge Base, Roadmap, Resources and Practice Materials...",
+        )
         # No Google Doc links to display
 
-        # Display responses in the Streamlit UI using pprint_run_response
-        st.markdown("### Professor Response:")
-        st.markdown(professor_response.content)
-        pprint_run_response(professor_response, markdown=True)
-        st.divider()
-        
-        st.markdown("### Academic Advisor Response:")
-        st.markdown(academic_advisor_response.content)
-        pprint_run_response(academic_advisor_response, markdown=True)
-        st.divider()
-
-        st.markdown("### Research Librarian Response:")
-        st.markdown(research_librarian_response.content)
-        pprint_run_response(research_librarian_response, markdown=True)
-        st.divider()
-
-        st.markdown("### Teaching Assistant Response:")
-        st.markdown(teaching_assistant_response.content)
-        pprint_run_response(teaching_assistant_response, markdown=True)
-        st.divider()
+        # Responses are already on the page; echo them to the terminal if REPORT_TERMINAL_LOG is set
+        for node in AGENT_LABELS:
+            result = agent_results.get(node)
+            if result is not None and result.ok:
+                echo_to_terminal(result.response)
 # Information about the agents
 st.markdown("---")
 st.markdown("### About the Agents:")
@@ -0,0 +1,159 @@
+import os
+from typing import Callable, Dict, Optional
+
+import streamlit as st
+
+from agent_orchestrator import AgentResult, DEFAULT_MAX_CONCURRENCY, DEFAULT_AGENT_TIMEOUT
+from job_queue import INTERRUPTED, QUEUED, Job, JobQueue
+from pipeline import run_teaching_pipeline
+from response_cache import get_response_cache
+from single_flight import agent_flights
+from streaming import CURSOR, StreamBuffer
+from topic_catalog import CatalogEntry, TopicCatalog
+
+# How often the progress of a background job is refreshed
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 1.0))
+
+# Pipeline node -> (agent name, what it is doing while it runs)
+AGENT_LABELS = {
+    'professor_response': ("Professor", "Generating Knowledge Base..."),
+    'academic_advisor_response': ("Academic Advisor", "Generating Learning Roadmap..."),
+    'research_librarian_response': ("Research Librarian", "Curating Learning Resources..."),
+    'teaching_assistant_response': ("Teaching Assistant", "Creating Practice Materials..."),
+}
+
+
+def show_run_stats() -> None:
+    """Response-cache and single-flight totals and the web-search stats of the last Start run."""
+    cache_stats = get_response_cache().stats()
+    flight_stats = agent_flights.stats()
+    st.caption(
+        f"Response cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, {cache_stats['entries']} stored answers; "
+        f"{flight_stats['coalesced']} agent runs shared with another learner's identical run"
+    )
+    if st.session_state.get('last_search_stats'):
+        search_stats = st.session_state['last_search_stats']
+        st.caption(f"Last run web search: {search_stats.calls} queries, {search_stats.hit_rate:.0%} served from cache or shared in-flight, avg SerpAPI latency {search_stats.avg_latency:.2f}s")
+
+
+
+def show_catalog_suggestions(catalog: TopicCatalog, text: str, on_pick: Callable[[CatalogEntry], None]) -> None:
+    """Catalog topics matching the topic box as pills (popular ones while it is empty); ⚡ marks ready-made reports."""
+    suggestions = {entry.key: entry for entry in catalog.suggest(text)}
+    if not suggestions:
+        return
+
+    def picked():
+        entry = suggestions.get(st.session_state.get('catalog_pick'))
+        if entry is not None:
+            on_pick(entry)
+
+    st.pills(
+        "Matching catalog topics" if text.strip() else "Popular topics",
+        list(suggestions),
+        format_func=lambda key: f"⚡ {suggestions[key].name}" if suggestions[key].ready else suggestions[key].name,
+        key="catalog_pick",
+        on_change=picked,
+    )
+
+def run_start_flow(
+    agent_team: dict,
+    topic: str,
+    base_prompt: str,
+    force_refresh: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    timeout: Optional[float] = DEFAULT_AGENT_TIMEOUT,
+    headings: bool = False,
+    spinner: str = "Your AI teaching team is working...",
+) -> Dict[str, AgentResult]:
+    """Run the teaching pipeline with a live status line and streamed output per agent.
+
+    With `headings` every agent gets a "### <name> Response:" section.
+    The web-search stats of the run are kept in `last_search_stats`.
+    """
+    # The event loop writes streamed tokens into buffers; the script thread renders them
+    stream_buffers = {node: StreamBuffer() for node in AGENT_LABELS}
+    status_boxes = {}
+    stream_boxes = {}
+    for node, (name, activity) in AGENT_LABELS.items():
+        if headings:
+            st.markdown(f"### {name} Response:")
+        status_boxes[node] = st.empty()
+        status_boxes[node].info(f"⏳ {name}: {activity}")
+        stream_boxes[node] = st.empty()
+        if headings:
+            st.divider()
+
+    def render_streams():
+        for node, buffer in stream_buffers.items():
+            buffer.render(stream_boxes[node])
+
+    def show_agent_status(result: AgentResult):
+        name = AGENT_LABELS[result.name][0]
+        if result.ok:
+            status_boxes[result.name].success(f"✅ {name} finished in {result.elapsed:.1f}s")
+            stream_boxes[result.name].markdown(result.response.content)
+        else:
+            status_boxes[result.name].error(f"❌ {name} failed: {result.error}")
+
+    # Search stats are shared by both search agents; keep the delta for this run
+    search_tools = agent_team['research_librarian'].tools[0]
+    search_before = search_tools.snapshot()
+    with st.spinner(spinner):
+        # Run the agents as a DAG: independent agents in parallel, dependent ones as soon as their inputs are done
+        agent_results = run_teaching_pipeline(
+            agent_team,
+            topic,
+            base_prompt,
+            force_refresh,
+            max_concurrency=max_concurrency,
+            timeout=timeout,
+            on_result=show_agent_status,
+            on_tick=render_streams,
+            on_chunk={node: buffer.append for node, buffer in stream_buffers.items()},
+        )
+    st.session_state['last_search_stats'] = search_tools.snapshot().since(search_before)
+    return agent_results
+
+
+def show_job_progress(job_queue: JobQueue, session_id: str, agent_team: dict, on_finished: Callable[[Job], None]) -> None:
+    """Live progress of the session's background Start job, refreshed every JOB_POLL_SECONDS.
+
+    Once the job is finished `on_finished(job)` runs (store the reports
+    there) and the whole page reruns. A job interrupted by a restart is
+    resumed with this session's team.
+    """
+    job = job_queue.active_job(session_id)
+    if job is None:
+        return
+    if job.status == INTERRUPTED:
+        job_queue.resume(job.id, agent_team)
+    _job_panel(job_queue, session_id, job.id, on_finished)
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _job_panel(job_queue: JobQueue, session_id: str, job_id: str, on_finished: Callable[[Job], None]) -> None:
+    job = job_queue.get(job_id)
+    if job is None:
+        return
+    if job.finished:
+        on_finished(job)
+        # Shown by show_run_stats with the collected reports
+        st.session_state['last_search_stats'] = job.search_stats
+        job_queue.collect(session_id, job.id)
+        st.rerun()
+    st.markdown(f"**Generating: {job.topic}** (keeps running if you switch tabs or reload the page)")
+    if job.status == QUEUED:
+        st.info(f"⏳ Waiting for a free worker ({job.position} job(s) ahead)...")
+    if job.refresh_queued:
+        st.info("🔄 This topic was already being generated; your forced refresh runs again without cached answers once it finishes.")
+    for node, (name, activity) in AGENT_LABELS.items():
+        if node in job.results:
+            st.success(f"✅ {name} finished in {job.elapsed.get(node, 0):.1f}s")
+        elif node in job.errors:
+            st.error(f"❌ {name} failed: {job.errors[node]}")
+        elif job.streams.get(node):
+            with st.expander(f"✍️ {name}: {activity}"):
+                st.markdown(job.streams[node] + CURSOR)
+        else:
+            st.info(f"⏳ {name}: waiting...")
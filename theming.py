@@ -0,0 +1,88 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Tuple
+
+from static_assets import BASE_DIR, GENERATED_DIR, STATIC_DIR
+
+STYLES_DIR = os.path.join(BASE_DIR, "styles")
+
+# Page -> stylesheets (styles/<name>.css) bundled into one fingerprinted file
+BUNDLES: Dict[str, Tuple[str, ...]] = {
+    'app': ("theme", "sidebar", "chat", "team"),
+    'main': ("chat", "team"),
+}
+
+_bundles: Dict[tuple, Tuple[str, str]] = {}
+_lock = threading.Lock()
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and insignificant whitespace; enough for hand-written stylesheets."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+def compile_bundle(name: str) -> Tuple[str, str]:
+    """(minified CSS, path of its fingerprinted copy under static/generated) for bundle `name`.
+
+    Memoized by the source files' mtimes, so reruns only pay for a few os.stat calls.
+    """
+    sources = [os.path.join(STYLES_DIR, f"{sheet}.css") for sheet in BUNDLES[name]]
+    memo_key = (name,) + tuple(os.path.getmtime(path) for path in sources)
+    with _lock:
+        if memo_key in _bundles:
+            return _bundles[memo_key]
+        parts = []
+        for path in sources:
+            with open(path, encoding="utf-8") as f:
+                parts.append(minify_css(f.read()))
+        css = "".join(parts)
+        digest = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+        target = os.path.join(GENERATED_DIR, f"{name}-{digest}.css")
+        if not os.path.exists(target):
+            os.makedirs(GENERATED_DIR, exist_ok=True)
+            tmp_path = target + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(css)
+            os.replace(tmp_path, target)
+        _bundles[memo_key] = (css, target)
+        return _bundles[memo_key]
+
+
+def stylesheet_html(name: str, static_serving: bool = True) -> str:
+    """Markup to send once per rerun for bundle `name`.
+
+    With static serving this is a ~70 byte <link> to the fingerprinted file,
+    which the browser caches; otherwise the minified CSS in one <style> block.
+    """
+    css, path = compile_bundle(name)
+    if static_serving:
+        href = "app/static/" + os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+        return f"<link rel='stylesheet' href='{href}'>"
+    return f"<style>{css}</style>"
+
+
+def payload_report(name: str) -> Dict[str, int]:
+    """Bytes of CSS sent per rerun: inline originals vs. minified inline vs. a static <link>."""
+    raw = 0
+    for sheet in BUNDLES[name]:
+        with open(os.path.join(STYLES_DIR, f"{sheet}.css"), encoding="utf-8") as f:
+            raw += len(f.read().encode("utf-8"))
+    return {
+        'inline_source': raw,
+        'inline_minified': len(stylesheet_html(name, static_serving=False).encode("utf-8")),
+        'static_link': len(stylesheet_html(name, static_serving=True).encode("utf-8")),
+    }
+
+
+if __name__ == "__main__":
+    # Run at deploy time: python theming.py
+    for bundle in BUNDLES:
+        report = payload_report(bundle)
+        print(f"{bundle}: {os.path.relpath(compile_bundle(bundle)[1], BASE_DIR)}  "
+              f"per rerun: source {report['inline_source']} B, minified {report['inline_minified']} B, link {report['static_link']} B")
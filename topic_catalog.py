@@ -0,0 +1,355 @@
+"""Precomputed catalog of popular topics: autocomplete and instant course packs.
+
+Each entry has a display name, aliases ("ML", "RAG") and the four agents'
+reports, stored in SQLite next to the other caches. Names and aliases come
+from catalog_topics.json; reports are generated ahead of time and kept
+fresh by a background task on the shared event loop, so a learner who picks
+a catalog topic gets its reports without waiting for the agents:
+
+    python topic_catalog.py build                              # generate missing and stale reports
+    python topic_catalog.py build --import course_packs.jsonl  # take reports from batch_generate.py
+    python topic_catalog.py suggest "mach lern"
+
+Packs are generated with the prompt of a new learner (CATALOG_LEARNING_STYLE,
+0% progress), so that learner's Start run on the same topic is answered by
+the response cache as well.
+
+Autocomplete matches the typed text against the start of any word of a name
+or alias (a sorted prefix index searched with bisect) and falls back to
+trigram similarity for typos.
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from agent_registry import DEFAULT_MODEL_ID, build_team
+from async_core import submit
+from fake_backend import fake_backend_config
+from pipeline import TEACHING_PIPELINE, arun_teaching_pipeline, topic_prompt
+from response_cache import cache_dir, normalize_topic
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SEED_PATH = os.getenv('TOPIC_CATALOG_SEED', os.path.join(HERE, "catalog_topics.json"))
+# Reports older than this are regenerated in the background; 0 turns the background refresh off
+CATALOG_REFRESH_SECONDS = float(os.getenv('CATALOG_REFRESH_SECONDS', 7 * 24 * 3600))
+# How often the background task looks for stale reports
+CATALOG_CHECK_SECONDS = float(os.getenv('CATALOG_CHECK_SECONDS', 3600))
+# The learning style of a new learner (the first option of the sidebar selectbox)
+CATALOG_LEARNING_STYLE = os.getenv('CATALOG_LEARNING_STYLE', "Visual")
+# Trigram similarity (Dice) a typo needs to still be suggested
+FUZZY_MIN_SIMILARITY = 0.35
+MAX_SUGGESTIONS = 5
+# Keys for the background refresh, read when the module is first imported: the pages later copy
+# a visitor's OpenAI key into os.environ, which must never pay for the shared reports
+SERVER_OPENAI_API_KEY = 'offline' if fake_backend_config() else os.getenv('OPENAI_API_KEY', '')
+SERVER_SERP_API_KEY = 'offline' if fake_backend_config() else os.getenv('SERP_API_KEY', '')
+
+
+@dataclass
+class CatalogEntry:
+    key: str
+    name: str
+    aliases: List[str] = field(default_factory=list)
+    # Pipeline node -> report
+    outputs: Dict[str, str] = field(default_factory=dict)
+    refreshed_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return all(node in self.outputs for node in TEACHING_PIPELINE)
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TopicIndex:
+    """Autocomplete over names and aliases: word-prefix matches first, then trigram similarity."""
+
+    def __init__(self, terms: Dict[str, str]):
+        # normalized name or alias -> entry key; equal matches rank in the order keys first appear
+        self._terms = terms
+        self._rank: Dict[str, int] = {}
+        for key in terms.values():
+            self._rank.setdefault(key, len(self._rank))
+        # (text from the start of each word of a term, term), sorted for bisect
+        self._prefixes = sorted(
+            (term[start:], term)
+            for term in terms
+            for start in range(len(term))
+            if start == 0 or term[start - 1] in " -/("
+        )
+        self._grams = {term: _trigrams(term) for term in terms}
+        self._postings: Dict[str, set] = defaultdict(set)
+        for term, grams in self._grams.items():
+            for gram in grams:
+                self._postings[gram].add(term)
+
+    def search(self, text: str, limit: int = MAX_SUGGESTIONS) -> List[str]:
+        """Entry keys best matching `text`, best first."""
+        query = normalize_topic(text)
+        if not query:
+            return []
+        scores: Dict[str, float] = {}
+        i = bisect.bisect_left(self._prefixes, (query,))
+        while i < len(self._prefixes) and self._prefixes[i][0].startswith(query):
+            suffix, term = self._prefixes[i]
+            # The start of a name or alias ranks above the start of a later word
+            score = 3.0 if suffix == term else 2.0
+            key = self._terms[term]
+            scores[key] = max(scores.get(key, 0.0), score)
+            i += 1
+        if len(scores) < limit:
+            query_grams = _trigrams(query)
+            shared = Counter(term for gram in query_grams for term in self._postings.get(gram, ()))
+            for term, count in shared.items():
+                similarity = 2 * count / (len(query_grams) + len(self._grams[term]))
+                if similarity >= FUZZY_MIN_SIMILARITY:
+                    key = self._terms[term]
+                    scores[key] = max(scores.get(key, 0.0), similarity)
+        return sorted(scores, key=lambda key: (-scores[key], self._rank[key]))[:limit]
+
+
+def load_seed(path: str = SEED_PATH) -> List[dict]:
+    """Catalog names and aliases: a JSON list of {'name', 'aliases'}."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [{'name': item['name'], 'aliases': list(item.get('aliases', []))} for item in json.load(f)]
+
+
+class TopicCatalog:
+    """Catalog entries in SQLite (WAL), with an in-memory copy and autocomplete index rebuilt on every change."""
+
+    def __init__(self, path: Optional[str] = None, seed: Optional[List[dict]] = None, refresh_seconds: float = CATALOG_REFRESH_SECONDS):
+        self.path = path or os.path.join(cache_dir(), "catalog.sqlite3")
+        self.refresh_seconds = refresh_seconds
+        self.refreshed = 0
+        self.last_error: Optional[str] = None
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._aliases: Dict[str, str] = {}
+        self._index = TopicIndex({})
+        self._refresher = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS topics ("
+            " key TEXT PRIMARY KEY, name TEXT, aliases TEXT, outputs TEXT DEFAULT '{}', refreshed_at REAL, position INTEGER)"
+        )
+        seed = load_seed() if seed is None else seed
+        with self._conn:
+            # The seed file owns names, aliases and order; reports already generated are kept
+            self._conn.executemany(
+                "INSERT INTO topics (key, name, aliases, position) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET name = excluded.name, aliases = excluded.aliases, position = excluded.position",
+                [(normalize_topic(item['name']), item['name'], json.dumps(item['aliases']), position) for position, item in enumerate(seed)],
+            )
+        self._load()
+
+    def _load(self) -> None:
+        rows = self._conn.execute("SELECT key, name, aliases, outputs, refreshed_at FROM topics ORDER BY position IS NULL, position, name").fetchall()
+        entries = {key: CatalogEntry(key, name, json.loads(aliases), json.loads(outputs), refreshed_at) for key, name, aliases, outputs, refreshed_at in rows}
+        aliases = {}
+        for entry in entries.values():
+            for alias in entry.aliases:
+                aliases.setdefault(normalize_topic(alias), entry.key)
+        # Names first, in catalog order, so equally good matches keep the seed file's order
+        terms = {key: key for key in entries}
+        for alias, key in aliases.items():
+            terms.setdefault(alias, key)
+        self._entries, self._aliases, self._index = entries, aliases, TopicIndex(terms)
+
+    def get(self, key: str) -> Optional[CatalogEntry]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def lookup(self, topic: str) -> Optional[CatalogEntry]:
+        """The entry whose name or alias is `topic` (after normalization)."""
+        key = normalize_topic(topic)
+        with self._lock:
+            return self._entries.get(key) or self._entries.get(self._aliases.get(key, ''))
+
+    def suggest(self, text: str, limit: int = MAX_SUGGESTIONS) -> List[CatalogEntry]:
+        """Autocomplete for `text`; with no text, the first catalog topics that have reports ready."""
+        with self._lock:
+            if not normalize_topic(text):
+                return [entry for entry in self._entries.values() if entry.ready][:limit]
+            return [self._entries[key] for key in self._index.search(text, limit)]
+
+    def store(self, topic: str, outputs: Dict[str, str], refreshed_at: Optional[float] = None) -> CatalogEntry:
+        """Save reports for a catalog topic (matched by name or alias), adding it if it is new."""
+        entry = self.lookup(topic)
+        key = entry.key if entry else normalize_topic(topic)
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO topics (key, name, aliases, outputs, refreshed_at) VALUES (?, ?, '[]', ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET outputs = excluded.outputs, refreshed_at = excluded.refreshed_at",
+                    (key, topic.strip(), json.dumps(outputs), refreshed_at or time.time()),
+                )
+            self._load()
+            return self._entries[key]
+
+    def entries(self) -> List[CatalogEntry]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def due(self, include_missing: bool = True) -> List[CatalogEntry]:
+        """Entries without a full set of reports (unless `include_missing` is False), then those older than `refresh_seconds`, oldest first."""
+        now = time.time()
+        with self._lock:
+            missing = [entry for entry in self._entries.values() if not entry.ready] if include_missing else []
+            stale = [
+                entry for entry in self._entries.values()
+                if entry.ready and self.refresh_seconds > 0 and now - (entry.refreshed_at or 0) > self.refresh_seconds
+            ]
+        return missing + sorted(stale, key=lambda entry: entry.refreshed_at or 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            ready = sum(entry.ready for entry in self._entries.values())
+            return {'topics': len(self._entries), 'ready': ready, 'refreshed': self.refreshed, 'last_error': self.last_error}
+
+    async def arefresh(self, team: dict, entries: Optional[List[CatalogEntry]] = None, timeout: Optional[float] = None) -> int:
+        """Generate reports for `entries` (default: everything `due`), one topic at a time; returns how many were stored.
+
+        Missing reports may come from the response cache; stale ones are
+        regenerated. A topic is only stored when all four agents succeeded.
+        """
+        stored = 0
+        for entry in self.due() if entries is None else entries:
+            results = await arun_teaching_pipeline(
+                team,
+                entry.name,
+                topic_prompt(entry.name, CATALOG_LEARNING_STYLE, 0),
+                force_refresh=entry.ready,
+                timeout=timeout,
+                call_site="batch",
+            )
+            outputs = {node: r.response.content for node, r in results.items() if r.ok and isinstance(r.response.content, str)}
+            if len(outputs) == len(TEACHING_PIPELINE):
+                self.store(entry.name, outputs)
+                stored += 1
+            else:
+                errors = [r.error for r in results.values() if not r.ok]
+                self.last_error = f"{entry.name}: {errors[0] if errors else 'no text response'}"
+        with self._lock:
+            self.refreshed += stored
+        return stored
+
+    def start_refresh(self, openai_api_key: str = '', serpapi_api_key: str = '') -> bool:
+        """Regenerate stale reports in the background with server-configured API keys.
+
+        Keys come from the arguments (e.g. Streamlit secrets) or from
+        OPENAI_API_KEY and SERP_API_KEY as the process started with; keys a
+        visitor typed in are never used for the shared reports. Topics that have no reports yet are left to `python
+        topic_catalog.py build`, so starting the app never generates the whole
+        catalog. The first call starts the task on the shared event loop;
+        later calls do nothing. Returns whether the task is running.
+        """
+        if self.refresh_seconds <= 0:
+            return False
+        openai_api_key = openai_api_key or SERVER_OPENAI_API_KEY
+        serpapi_api_key = serpapi_api_key or SERVER_SERP_API_KEY
+        if not openai_api_key or not serpapi_api_key:
+            return False
+        with self._lock:
+            if self._refresher is None:
+                team = build_team(openai_api_key, serpapi_api_key, DEFAULT_MODEL_ID, 0.1)
+                self._refresher = submit(self._refresh_loop(team))
+        return True
+
+    async def _refresh_loop(self, team: dict) -> None:
+        while True:
+            try:
+                await self.arefresh(team, self.due(include_missing=False))
+            except Exception as exc:
+                # Try again on the next check; the error is shown in the catalog stats
+                self.last_error = f"{type(exc).__name__}: {exc}"
+            await asyncio.sleep(CATALOG_CHECK_SECONDS)
+
+
+_catalog: Optional[TopicCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_topic_catalog() -> TopicCatalog:
+    """Process-wide catalog shared by all sessions."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = TopicCatalog()
+        return _catalog
+
+
+def import_course_packs(catalog: TopicCatalog, path: str) -> int:
+    """Store the successful records of a batch_generate.py output file; returns how many were taken."""
+    taken = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('status') == 'ok' and len(record.get('outputs', {})) == len(TEACHING_PIPELINE):
+                catalog.store(record['topic'], record['outputs'], record.get('created_at'))
+                taken += 1
+    return taken
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build and query the precomputed topic catalog.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="generate reports for catalog topics that are missing or stale")
+    build.add_argument("--import", dest="packs", help="take reports from a batch_generate.py JSONL file first")
+    build.add_argument("--timeout", type=float, default=300, help="per-agent timeout in seconds")
+    build.add_argument("--all", action="store_true", help="regenerate every topic, not only missing and stale ones")
+    suggest = commands.add_parser("suggest", help="show autocomplete suggestions for some text")
+    suggest.add_argument("text")
+    args = parser.parse_args(argv)
+
+    catalog = get_topic_catalog()
+    if args.command == "suggest":
+        for entry in catalog.suggest(args.text):
+            print(f"{entry.name}{' (ready)' if entry.ready else ''}")
+        return 0
+
+    if args.packs:
+        print(f"imported {import_course_packs(catalog, args.packs)} course packs")
+    entries = catalog.entries() if args.all else catalog.due()
+    if not entries:
+        print("catalog is up to date")
+        return 0
+
+    load_dotenv()
+    # The offline stand-in (FAKE_BACKEND) answers without real keys
+    offline = 'offline' if fake_backend_config() else ''
+    openai_api_key = os.getenv('OPENAI_API_KEY', offline)
+    serpapi_api_key = os.getenv('SERP_API_KEY', offline)
+    if not openai_api_key or not serpapi_api_key:
+        print("OPENAI_API_KEY and SERP_API_KEY must be set.", file=sys.stderr)
+        return 2
+    team = build_team(openai_api_key, serpapi_api_key, DEFAULT_MODEL_ID, 0.1)
+    print(f"generating reports for {len(entries)} topics")
+    stored = asyncio.run(catalog.arefresh(team, entries, timeout=args.timeout))
+    print(f"{stored} of {len(entries)} topics stored{f'; last error: {catalog.last_error}' if catalog.last_error else ''}")
+    return 0 if stored == len(entries) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())